@@ -138,6 +138,70 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# How rentals.serving hands media bytes to the client: None streams them from
+# Django, 'x-accel' emits nginx X-Accel-Redirect (to an `internal` location
+# aliased to MEDIA_ROOT at MEDIA_ACCEL_PREFIX), 'x-sendfile' emits X-Sendfile.
+MEDIA_ACCEL = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Chunks of resumable uploads (rentals.uploads) are assembled here; keep it on
+# the same filesystem as MEDIA_ROOT so finished files are moved, not copied.
+UPLOAD_STAGING_ROOT = BASE_DIR / 'upload_staging'
+
+# Background jobs (rentals.jobs) are executed by `python manage.py run_jobs`;
+# owner accounts and shop ratings are only updated once a worker runs them.
+# With JOBS_EAGER they run in-process right after each commit instead, which is
+# the default in development so nothing waits on a worker that isn't running.
+JOBS_EAGER = DEBUG
+
+# Delivery channels for rentals.notifications, in order.
+NOTIFICATION_CHANNELS = [
+    'rentals.notifications.InboxChannel',
+    'rentals.push.PushChannel',
+]
+
+# Lead time in minutes per booking reminder kind (rentals.reminders); None switches one off.
+BOOKING_REMINDER_LEADS = {
+    'start_24h': 24 * 60,
+    'start_2h': 2 * 60,
+    'end_1h': 60,
+    'payment_due': 24 * 60,
+}
+
+# Push providers by PushDevice.provider (rentals.push). Point 'expo' at
+# rentals.push.FakePushProvider to keep pushes in memory during tests.
+PUSH_PROVIDERS = {
+    'expo': 'rentals.push.ExpoPushProvider',
+}
+if DEBUG:
+    # Lets developers register 'fake' devices whose pushes stay in memory.
+    PUSH_PROVIDERS['fake'] = 'rentals.push.FakePushProvider'
+
+# Road graph for rentals.routing, built with `python manage.py build_routing_graph
+# <extract.osm>`. Without it routes fall back to straight-line estimates.
+ROUTING_GRAPH_PATH = BASE_DIR / 'routing_graph.npz'
+
+# Home delivery fees by distance from the shop (rentals.pricing): (up to km, fee),
+# nearest first. Addresses beyond the last tier are not delivered to.
+# DELIVERY_FEE_DEFAULT applies when the delivery address cannot be located.
+DELIVERY_FEE_TIERS = [(3, 10), (7, 20), (15, 35)]
+DELIVERY_FEE_DEFAULT = 10
+
+# Added to every booking's price (rentals.pricing). Surges, discounts and promo
+# codes are PricingRule and PromoCode rows, edited by shop owners.
+BOOKING_SERVICE_FEE = 5
+
+# How long a vehicle stays held for a customer in checkout (rentals.holds), in
+# seconds, how many holds a customer may have at once, and the longest rental
+# window (days) that can be held.
+BOOKING_HOLD_TTL = 10 * 60
+BOOKING_HOLDS_PER_USER = 3
+BOOKING_HOLD_MAX_DAYS = 30
+
+# Dotted path to a rentals.pricing.Geocoder used to locate delivery addresses
+# sent without coordinates, e.g. 'rentals.pricing.NominatimGeocoder'. None: no geocoding.
+GEOCODER = None
+
 LOGIN_URL = '/login.html'
 LOGIN_REDIRECT_URL = '/dashboard.html'
 LOGOUT_REDIRECT_URL = '/login.html'
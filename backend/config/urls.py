@@ -14,10 +14,11 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rentals import admin_views
+from rentals.serving import serve_media
 
 urlpatterns = [
     path('admin/profile/', admin_views.admin_profile, name='admin_profile'),
@@ -25,9 +26,11 @@ urlpatterns = [
     path('api/staff/', include('staff.urls')),
     path('', include('owner.urls')),
     path('api/', include('rentals.urls')),
+    # Uploaded media, in every environment: access checks, caching headers and
+    # X-Accel-Redirect/X-Sendfile offload live in rentals.serving.
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
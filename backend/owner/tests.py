@@ -1,3 +1,89 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from rentals.models import OwnerRegistrationRequest, RentalShop, Review
+
+
+# ── Reviews (user-026) ────────────────────────────────────────────────────────
+
+class ReviewStatsTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('owner', password='x')
+        owner.user_profile.role = 'owner'
+        owner.user_profile.save()
+        self.shop = RentalShop.objects.create(owner=owner.user_profile, name='Wheels', address='1 Main St',
+                                              latitude=12.97, longitude=77.59)
+        for i, rating in enumerate([5, 5, 4, 2]):
+            Review.objects.create(user=User.objects.create_user(f'customer{i}'), shop=self.shop, rating=rating,
+                                  comment='…', owner_reply='Thanks!' if i == 0 else '')
+        self.client.force_login(owner)
+
+    def test_summary_and_histogram(self):
+        response = self.client.get('/reviews/')
+        self.assertEqual(response.status_code, 200)
+        context = response.context
+        self.assertEqual((context['avg_rating'], context['total_reviews']), (4.0, 4))
+        self.assertEqual((context['replied_count'], context['pending_count']), (1, 3))
+        self.assertEqual(
+            [(row['stars'], row['count'], row['percent']) for row in context['rating_histogram']],
+            [(5, 2, 50), (4, 1, 25), (3, 0, 0), (2, 1, 25), (1, 0, 0)],
+        )
+
+    def test_empty_shop(self):
+        Review.objects.all().delete()
+        context = self.client.get('/reviews/').context
+        self.assertEqual((context['avg_rating'], context['total_reviews']), (0, 0))
+        self.assertEqual({row['percent'] for row in context['rating_histogram']}, {0})
+
+    def test_reply_only_to_own_reviews(self):
+        review = Review.objects.filter(owner_reply='').first()
+        self.client.post('/reviews/', {'action': 'reply', 'review_id': review.id, 'reply_text': 'Sorry about that'})
+        review.refresh_from_db()
+        self.assertEqual(review.owner_reply, 'Sorry about that')
+        self.assertEqual(self.client.get('/reviews/').context['pending_count'], 2)
+
+        other = Review.objects.create(
+            user=User.objects.create_user('elsewhere'), rating=3, comment='…',
+            shop=RentalShop.objects.create(name='Other', address='2 Main St', latitude=0, longitude=0),
+        )
+        self.client.post('/reviews/', {'action': 'reply', 'review_id': other.id, 'reply_text': 'Hi'})
+        other.refresh_from_db()
+        self.assertIsNone(other.owner_reply)
+
+
+# ── Registration (user-034) ───────────────────────────────────────────────────
+
+class RegistrationCertificateTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def register(self):
+        return self.client.post('/register/', {
+            'email': 'owner@example.com', 'password': 'secret-pass-123', 'shopName': 'Wheels',
+            'ownerName': 'Ravi Kumar', 'phone': '9000000000', 'certificateId': 'GST-1',
+            'licenseFile': SimpleUploadedFile('licence.pdf', b'%PDF-1.4 certificate', 'application/pdf'),
+        })
+
+    def test_multipart_certificate_is_stored_privately(self):
+        self.assertEqual(self.register().status_code, 200)
+        name = OwnerRegistrationRequest.objects.get(email='owner@example.com').certificate_file.name
+        self.assertTrue(name.startswith('kyc/cas/'), name)
+
+        url = f'/media/{name}'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(User.objects.create_user('applicant', password='x'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 certificate')
@@ -17,4 +17,6 @@ urlpatterns = [
     path('profile/', views.profile_view, name='owner_profile'),
     path('logout/', views.logout_view, name='owner_logout'),
     path('api/staff/', views.staff_api, name='owner_staff_api'),
+    path('api/assign/', views.assign_api, name='owner_assign_api'),
+    path('api/pricing/', views.pricing_api, name='owner_pricing_api'),
 ]
@@ -35,6 +35,40 @@ def get_owner_shop(user):
         )
     return shop
 
+
+def assign_booking(booking, staff_member):
+    """Give ``booking``'s delivery or pickup task to ``staff_member``; returns the task."""
+    # Delete any existing tasks for this booking to handle reassignments and orphaned tasks
+    StaffTask.objects.filter(booking=booking).delete()
+
+    # Create new Staff Task for the newly assigned staff member
+    task_type = 'pickup' if booking.status == 'pickup_requested' else 'delivery'
+    task = StaffTask.objects.create(
+        booking=booking,
+        staff=staff_member,
+        type=task_type,
+        scheduled_time=booking.start_date,
+        status='pending'
+    )
+
+    # Note: Booking status remains the same since assignment shouldn't make it active.
+    # It will be marked active or completed when staff completes the task.
+
+    from rentals.notifications import queue_notification
+    queue_notification(
+        'task_assigned', f'New {task_type} task',
+        f'{booking.vehicle.name} for booking #{booking.id}',
+        user_ids=[staff_member.id], data={'task_id': task.id, 'booking_id': booking.id},
+    )
+    return task
+
+
+def assign_complaint(complaint, staff_member):
+    complaint.assigned_to = staff_member
+    complaint.status = 'assigned'
+    complaint.save()
+    return complaint
+
 def index_view(request):
     if is_owner(request.user):
         return redirect('owner_dashboard')
@@ -89,6 +123,7 @@ def register_view(request):
             phone = request.POST.get('phone')
             certificate_id = request.POST.get('certificateId')
             certificate_file = request.FILES.get('licenseFile')
+            certificate_upload_id = request.POST.get('licenseUploadId')
 
             if not email or not password or not owner_name:
                 # Fallback for JSON requests if the frontend sends JSON instead of FormData
@@ -101,7 +136,8 @@ def register_view(request):
                     owner_name = data.get('ownerName')
                     phone = data.get('phone')
                     certificate_id = data.get('certificateId')
-                    # Cannot reliably get file from simple JSON without base64 decoding
+                    # Files can't travel in JSON; send a chunked upload id instead
+                    certificate_upload_id = data.get('licenseUploadId')
 
             if not email:
                 return JsonResponse({"error": "Email is required"}, status=400)
@@ -111,6 +147,16 @@ def register_view(request):
             if OwnerRegistrationRequest.objects.filter(email=email, status='pending').exists():
                 return JsonResponse({"error": "Registration request already pending for this email"}, status=400)
 
+            if certificate_upload_id and not certificate_file:
+                from rentals.uploads import UploadError, consume_upload, get_completed_upload, owns_upload
+                try:
+                    upload = get_completed_upload(certificate_upload_id, 'owner_certificate')
+                    if not owns_upload(request, upload):
+                        raise UploadError("Upload not found or not complete")
+                    certificate_file = consume_upload(upload)
+                except UploadError as e:
+                    return JsonResponse({"error": str(e)}, status=e.status)
+
             from django.contrib.auth.hashers import make_password
             hashed_password = make_password(password)
 
@@ -183,40 +229,49 @@ def booking_management_view(request):
             staff_id = request.POST.get('staff_id')
             
             try:
-                print("ASSIGN STAFF ACTION:", booking_id, staff_id)
                 booking = Booking.objects.get(id=booking_id, shop=shop)
-                staff_member = User.objects.get(id=staff_id, user_profile__role='staff')
-                
-                print("FOUND BOOKING AND STAFF", booking, staff_member)
-                
-                # Delete any existing tasks for this booking to handle reassignments and orphaned tasks
-                StaffTask.objects.filter(booking=booking).delete()
-                
-                # Create new Staff Task for the newly assigned staff member
-                task_type = 'pickup' if booking.status == 'pickup_requested' else ('delivery' if booking.delivery_option == 'home_delivery' else 'delivery')
-                task = StaffTask.objects.create(
-                    booking=booking,
-                    staff=staff_member,
-                    type=task_type,
-                    scheduled_time=booking.start_date,
-                    status='pending'
-                )
-                
-                # Note: Booking status remains the same since assignment shouldn't make it active.
-                # It will be marked active or completed when staff completes the task.
-                    
+                if staff_id == 'auto':
+                    from staff.workload import least_loaded
+                    staff_member = least_loaded(shop)
+                    if staff_member is None:
+                        raise User.DoesNotExist("No active staff member to assign")
+                else:
+                    staff_member = User.objects.get(id=staff_id, user_profile__role='staff')
+
+                assign_booking(booking, staff_member)
                 messages.success(request, f"Assigned {staff_member.first_name} to Booking #{booking.id}")
             except Exception as e:
                 messages.error(request, f"Error assigning staff: {str(e)}")
+
+        elif action == 'auto_assign':
+            from datetime import date
+            from django.utils import timezone
+            from staff.dispatch import apply_plan, plan_day, travel_minutes
+
+            try:
+                day = date.fromisoformat(request.POST.get('date') or timezone.localdate().isoformat())
+            except ValueError:
+                day = timezone.localdate()
+            staff_members = User.objects.filter(
+                user_profile__role='staff', user_profile__shop=shop, is_active=True,
+            ).order_by('id')
+            plan = plan_day(shop, day, staff_members)
+            if not plan.routes:
+                messages.info(request, f"Nothing to dispatch for {day:%b %d}.")
+            else:
+                assigned = apply_plan(plan)
+                messages.success(
+                    request,
+                    f"Auto-assigned {assigned} stop(s) to {len(plan.routes)} staff member(s) for {day:%b %d} "
+                    f"(~{plan.total_km:.1f} km, {travel_minutes(plan.total_km):.0f} min of driving).",
+                )
                 
         return redirect('owner_bookings')
 
+    from staff.workload import shop_workloads
+
     bookings = Booking.objects.filter(shop=shop).select_related('user', 'vehicle').prefetch_related('staff_tasks__staff')
-    staff_members = User.objects.filter(
-        user_profile__role='staff',
-        user_profile__shop=shop,
-        is_active=True
-    ).select_related('user_profile')
+    staff_members = shop_workloads(shop).filter(is_active=True)
     
     return render(request, 'owner/bookingManagement.html', {
         'bookings': bookings,
@@ -296,22 +351,10 @@ def staff_management_view(request):
                 
         return redirect('owner_staff')
 
-    # DEBUG: Print debug information
-    print(f"=== STAFF MANAGEMENT DEBUG ===")
-    print(f"Current User: {request.user.username}")
-    print(f"User ID: {request.user.id}")
-    print(f"Shop from get_owner_shop: {shop.name if shop else None} (ID: {shop.id if shop else None})")
-    
-    staff_users = User.objects.filter(
-        user_profile__role='staff',
-        user_profile__shop=shop
-    ).select_related('user_profile')
-    
-    print(f"Staff query result count: {staff_users.count()}")
-    for staff in staff_users:
-        print(f"  - {staff.username} (Shop: {staff.user_profile.shop.name if staff.user_profile.shop else 'None'})")
-    print(f"=== END DEBUG ===")
-    
+    from staff.workload import shop_workloads
+
+    staff_users = shop_workloads(shop)
+
     return render(request, 'owner/staffManagement.html', {'staff_users': staff_users})
 
 @login_required(login_url='owner_login')
@@ -581,6 +624,146 @@ def staff_api(request):
             return JsonResponse({'error': str(e)}, status=400)
 
 
+@login_required(login_url='owner_login')
+def assign_api(request):
+    """
+    POST {"booking_id": ...} or {"complaint_id": ...}, optionally with "exclude"
+    (staff ids to skip): assigns the shop's least-loaded active staff member.
+    Session-authenticated, so callers send the CSRF token as X-CSRFToken.
+    """
+    if not is_owner(request.user):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    from django.db import transaction
+    from staff.workload import least_loaded
+
+    shop = get_owner_shop(request.user)
+    try:
+        body = json.loads(request.body or '{}')
+        exclude = [int(staff_id) for staff_id in body.get('exclude') or []]
+    except (ValueError, TypeError):
+        return JsonResponse({'error': 'Invalid request body'}, status=400)
+
+    with transaction.atomic():
+        if body.get('booking_id'):
+            target = Booking.objects.select_related('vehicle').filter(id=body['booking_id'], shop=shop).first()
+            assign = assign_booking
+        elif body.get('complaint_id'):
+            target = Complaint.objects.filter(id=body['complaint_id'], shop=shop).first()
+            assign = assign_complaint
+        else:
+            return JsonResponse({'error': 'booking_id or complaint_id is required'}, status=400)
+        if target is None:
+            return JsonResponse({'error': 'Not found'}, status=404)
+
+        staff_member = least_loaded(shop, exclude=exclude)
+        if staff_member is None:
+            return JsonResponse({'error': 'No staff member available'}, status=409)
+        assign(target, staff_member)
+
+    workload = staff_member.workload
+    workload.refresh_from_db()
+    return JsonResponse({
+        'success': True,
+        'staff': {
+            'id': staff_member.id,
+            'name': f"{staff_member.first_name} {staff_member.last_name}".strip() or staff_member.username,
+            'open_tasks': workload.open_tasks,
+            'open_complaints': workload.open_complaints,
+            'load': workload.load,
+        },
+    })
+
+
+def _rule_data(rule):
+    return {
+        'id': rule.id,
+        'name': rule.name,
+        'kind': rule.kind,
+        'percent': str(rule.percent),
+        'booking_type': rule.booking_type,
+        'dates': rule.dates,
+        'min_duration': rule.min_duration,
+        'min_utilization': rule.min_utilization,
+        'is_active': rule.is_active,
+    }
+
+
+def _promo_data(promo):
+    return {
+        'id': promo.id,
+        'code': promo.code,
+        'percent_off': None if promo.percent_off is None else str(promo.percent_off),
+        'amount_off': None if promo.amount_off is None else str(promo.amount_off),
+        'valid_from': promo.valid_from.isoformat() if promo.valid_from else None,
+        'valid_until': promo.valid_until.isoformat() if promo.valid_until else None,
+        'max_uses': promo.max_uses,
+        'used_count': promo.used_count,
+        'is_active': promo.is_active,
+    }
+
+
+@login_required(login_url='owner_login')
+def pricing_api(request):
+    """
+    The shop's pricing rules and promo codes (rentals.pricing).
+    GET lists both; POST {"type": "rule"|"promo", ...fields, "id" to update}
+    saves one; DELETE {"type", "id"} removes one (send X-CSRFToken with both).
+    Prices use the change at once.
+    """
+    if not is_owner(request.user):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    from django.core.exceptions import ValidationError
+    from rentals.models import PricingRule, PromoCode
+
+    shop = get_owner_shop(request.user)
+    if request.method == 'GET':
+        return JsonResponse({
+            'rules': [_rule_data(rule) for rule in PricingRule.objects.filter(shop=shop)],
+            'promo_codes': [_promo_data(promo) for promo in PromoCode.objects.filter(shop=shop).order_by('code')],
+        })
+
+    try:
+        body = json.loads(request.body or '{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid request body'}, status=400)
+    if body.get('type') == 'rule':
+        model, fields, serialize = PricingRule, (
+            'name', 'kind', 'percent', 'booking_type', 'dates', 'min_duration', 'min_utilization', 'is_active',
+        ), _rule_data
+    elif body.get('type') == 'promo':
+        model, fields, serialize = PromoCode, (
+            'code', 'percent_off', 'amount_off', 'valid_from', 'valid_until', 'max_uses', 'is_active',
+        ), _promo_data
+    else:
+        return JsonResponse({'error': 'type must be "rule" or "promo"'}, status=400)
+
+    if request.method == 'DELETE':
+        model.objects.filter(id=body.get('id'), shop=shop).delete()
+        return JsonResponse({'success': True})
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    if body.get('id'):
+        obj = model.objects.filter(id=body['id'], shop=shop).first()
+        if obj is None:
+            return JsonResponse({'error': 'Not found'}, status=404)
+    else:
+        obj = model(shop=shop)
+    for field in fields:
+        if field in body:
+            setattr(obj, field, body[field])
+    try:
+        obj.full_clean(exclude=['shop'])
+        obj.save()
+    except ValidationError as e:
+        return JsonResponse({'error': e.message_dict}, status=400)
+    return JsonResponse({'success': True, 'item': serialize(obj)})
+
+
 # ── Chat View ──────────────────────────────────────────────────────────────────
 
 @login_required(login_url='owner_login')
@@ -653,7 +836,7 @@ def reviews_view(request):
                     review = Review.objects.get(id=review_id, shop=shop)
                     review.owner_reply = reply_text
                     review.replied_at = timezone.now()
-                    review.save()
+                    review.save(update_fields=['owner_reply', 'replied_at'])
                     messages.success(request, "Reply posted successfully!")
                 except Review.DoesNotExist:
                     messages.error(request, "Review not found.")
@@ -661,23 +844,43 @@ def reviews_view(request):
                     messages.error(request, f"Error posting reply: {e}")
         return redirect('owner_reviews')
 
-    all_reviews = Review.objects.filter(shop=shop).select_related('user')
-
-    # Compute average rating
-    total = all_reviews.count()
-    avg_rating = 0
-    if total:
-        avg_rating = round(sum(r.rating for r in all_reviews) / total, 1)
-
-    replied_count = all_reviews.filter(owner_reply__isnull=False).exclude(owner_reply='').count()
-    pending_count = all_reviews.filter(owner_reply__isnull=True).count() + all_reviews.filter(owner_reply='').count()
+    from django.core.paginator import Paginator
+    from django.db.models import Avg, Count, Q
+
+    all_reviews = Review.objects.filter(shop=shop)
+
+    # One aggregate query for the summary cards and the 1–5 star histogram
+    has_reply = Q(owner_reply__isnull=False) & ~Q(owner_reply='')
+    stats = all_reviews.aggregate(
+        avg=Avg('rating'),
+        total=Count('id'),
+        replied=Count('id', filter=has_reply),
+        pending=Count('id', filter=~has_reply),
+        **{f'star_{i}': Count('id', filter=Q(rating=i)) for i in range(1, 6)},
+    )
+    total = stats['total']
+    avg_rating = round(stats['avg'] or 0, 1)
+
+    rating_histogram = []
+    for i in range(5, 0, -1):
+        count = stats[f'star_{i}']
+        rating_histogram.append({
+            'stars': i,
+            'count': count,
+            'percent': round(count * 100 / total) if total else 0,
+        })
+
+    paginator = Paginator(all_reviews.select_related('user'), 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
 
     return render(request, 'owner/reviews.html', {
-        'reviews': all_reviews,
+        'reviews': page_obj,
+        'page_obj': page_obj,
         'avg_rating': avg_rating,
         'total_reviews': total,
-        'replied_count': replied_count,
-        'pending_count': pending_count,
+        'replied_count': stats['replied'],
+        'pending_count': stats['pending'],
+        'rating_histogram': rating_histogram,
     })
 
 
@@ -697,10 +900,14 @@ def complaints_view(request):
             staff_id = request.POST.get('staff_id')
             try:
                 complaint = Complaint.objects.get(id=complaint_id, shop=shop)
-                staff_member = User.objects.get(id=staff_id, user_profile__role='staff')
-                complaint.assigned_to = staff_member
-                complaint.status = 'assigned'
-                complaint.save()
+                if staff_id == 'auto':
+                    from staff.workload import least_loaded
+                    staff_member = least_loaded(shop)
+                    if staff_member is None:
+                        raise User.DoesNotExist
+                else:
+                    staff_member = User.objects.get(id=staff_id, user_profile__role='staff')
+                assign_complaint(complaint, staff_member)
                 messages.success(request, f"Complaint #{complaint_id} assigned to {staff_member.first_name}.")
             except Complaint.DoesNotExist:
                 messages.error(request, "Complaint not found.")
@@ -719,12 +926,10 @@ def complaints_view(request):
                 messages.error(request, f"Error resolving complaint: {e}")
         return redirect('owner_complaints')
 
+    from staff.workload import shop_workloads
+
     all_complaints = Complaint.objects.filter(shop=shop).select_related('user', 'booking', 'assigned_to')
-    staff_members = User.objects.filter(
-        user_profile__role='staff',
-        is_active=True,
-        assigned_tasks__booking__shop=shop
-    ).distinct().select_related('user_profile')
+    staff_members = shop_workloads(shop).filter(is_active=True)
 
     return render(request, 'owner/complaints.html', {
         'complaints': all_complaints,
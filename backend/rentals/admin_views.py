@@ -1,7 +1,7 @@
 import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Sum
+from django.db.models import Q, Sum
 from django.contrib.auth.models import User
 from django.contrib.auth import update_session_auth_hash
 from django.views.decorators.http import require_POST
@@ -236,25 +236,10 @@ def admin_staff(request, shop_id):
 
 @admin_required
 def admin_vehicles(request):
-    vehicles = Vehicle.objects.select_related("shop")
+    from .facets import apply_vehicle_filters, parse_vehicle_filters
 
-    # Filtering
-    vehicle_type = request.GET.get('type')
-    if vehicle_type:
-        vehicles = vehicles.filter(type=vehicle_type)
-
-    is_available = request.GET.get('is_available')
-    if is_available is not None and is_available != '':
-        is_available_bool = is_available.lower() in ('true', '1', 'yes')
-        vehicles = vehicles.filter(is_available=is_available_bool)
-
-    fuel_type = request.GET.get('fuel_type')
-    if fuel_type:
-        vehicles = vehicles.filter(fuel_type=fuel_type)
-
-    transmission = request.GET.get('transmission')
-    if transmission:
-        vehicles = vehicles.filter(transmission=transmission)
+    # Filtering (type, is_available, fuel_type, transmission, seating, price, features)
+    vehicles = apply_vehicle_filters(Vehicle.objects.select_related("shop"), parse_vehicle_filters(request.GET))
 
     # Sorting
     sort_by = request.GET.get('sort_by')
@@ -365,49 +350,26 @@ def admin_owner_action(request):
         reg_request = OwnerRegistrationRequest.objects.get(id=request_id)
         
         if action == 'approve':
-            if User.objects.filter(email=reg_request.email).exists():
+            if reg_request.status == 'approved':
+                messages.info(request, f"Owner {reg_request.owner_name} is already approved.")
+                return redirect('admin_owner_management')
+            if User.objects.filter(Q(username=reg_request.email) | Q(email__iexact=reg_request.email)).exists():
                 messages.error(request, "A user with this email already exists.")
                 return redirect('admin_owner_management')
             
-            # Extract names
-            name_parts = reg_request.owner_name.split(' ', 1) if reg_request.owner_name else ["", ""]
-            first_name = name_parts[0]
-            last_name = name_parts[1] if len(name_parts) > 1 else ''
-
-            # Create User
-            user = User.objects.create_user(
-                username=reg_request.email,
-                email=reg_request.email,
-                password='temp_password', # Wil be replaced
-                first_name=first_name,
-                last_name=last_name
-            )
-            # Override password hash with the stored hash
-            user.password = reg_request.password_hash
-            user.is_active = True
-            user.save()
-
-            # Create UserProfile
-            profile, created = UserProfile.objects.get_or_create(user=user)
-            profile.role = 'owner'
-            profile.phone = reg_request.phone
-            profile.save()
-
-            # Create RentalShop
-            RentalShop.objects.create(
-                owner=profile,
-                name=reg_request.shop_name, 
-                address="Pending Address", 
-                latitude=0, 
-                longitude=0
-            )
-
-            reg_request.status = 'approved'
-            reg_request.is_approved = True
-            reg_request.is_rejected = False
-            reg_request.resolved_at = timezone.now()
-            reg_request.save()
-            messages.success(request, f"Owner {reg_request.owner_name} approved successfully.")
+            # The account, profile and shop are created by the job worker;
+            # only the approval itself is written here.
+            from django.db import transaction
+            from .jobs import enqueue
+            with transaction.atomic():
+                reg_request.status = 'approved'
+                reg_request.is_approved = True
+                reg_request.is_rejected = False
+                reg_request.resolved_at = timezone.now()
+                reg_request.save()
+                enqueue('owners.provision_account', registration_id=reg_request.id)
+            messages.info(request, f"Owner {reg_request.owner_name} approved. Their account is queued and "
+                                   f"will be created by the job worker shortly.")
 
         elif action == 'reject':
             reg_request.status = 'rejected'
@@ -475,6 +437,14 @@ def admin_owner_detail(request, owner_id):
         }
         return render(request, 'admin/ownerdetails.html', context)
 
+def _notify_kyc_decision(kyc):
+    from .notifications import queue_notification
+    if kyc.status == 'verified':
+        title, message = 'KYC Approved', 'Your documents have been verified. You can now book vehicles.'
+    else:
+        title, message = 'KYC Rejected', f'Your KYC was rejected: {kyc.rejection_reason}. Please resubmit your documents.'
+    queue_notification('kyc_decision', title, message, user_ids=[kyc.user_id])
+
 @admin_required
 def admin_kyc_list(request):
     from django.utils import timezone
@@ -493,6 +463,7 @@ def admin_kyc_list(request):
                 kyc.rejection_reason = None
                 kyc.reviewed_by = request.user
                 kyc.save()
+                _notify_kyc_decision(kyc)
                 messages.success(request, f"KYC for {kyc.full_name} has been approved.")
 
             elif action == 'reject':
@@ -505,6 +476,7 @@ def admin_kyc_list(request):
                     kyc.verified_at = None
                     kyc.reviewed_by = request.user
                     kyc.save()
+                    _notify_kyc_decision(kyc)
                     messages.success(request, f"KYC for {kyc.full_name} has been rejected.")
 
         except KYCDocument.DoesNotExist:
@@ -554,6 +526,7 @@ def admin_kyc_detail(request, kyc_id):
             kyc.rejection_reason = None
             kyc.reviewed_by = request.user
             kyc.save()
+            _notify_kyc_decision(kyc)
             messages.success(request, f"KYC for {kyc.full_name} has been approved successfully.")
             return redirect('admin_kyc_management')
 
@@ -567,6 +540,7 @@ def admin_kyc_detail(request, kyc_id):
                 kyc.verified_at = None
                 kyc.reviewed_by = request.user
                 kyc.save()
+                _notify_kyc_decision(kyc)
                 messages.success(request, f"KYC for {kyc.full_name} has been rejected.")
                 return redirect('admin_kyc_management')
 
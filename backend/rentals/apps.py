@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class RentalsConfig(AppConfig):
     name = 'rentals'
+
+    def ready(self):
+        # Registers the signal receivers for the search index, the image
+        # pipeline, notifications, the inbox counter and delivery zones, and the
+        # background job handlers
+        from . import inbox, media, notifications, pricing, push, search, tasks  # noqa: F401
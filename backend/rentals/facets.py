@@ -0,0 +1,127 @@
+"""
+Faceted vehicle filtering shared by ``/api/vehicles/`` and the admin vehicle list.
+
+Filters arrive as query parameters; several values for one dimension are
+comma-separated and OR-ed (``?type=car,bike``), while different dimensions are
+AND-ed. Facet counts are disjunctive: the counts for a dimension ignore that
+dimension's own filter, so the client can show "how many if I also tick this".
+Every choice-facet count is one conditional ``COUNT`` in a single aggregate
+query; feature counts come from one grouped query.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q
+
+from .models import Vehicle, VehicleFeature
+
+CHOICE_FACETS = {
+    'type': Vehicle.VEHICLE_TYPES,
+    'fuel_type': Vehicle.FUEL_CHOICES,
+    'transmission': Vehicle.TRANSMISSION_CHOICES,
+    'seating': Vehicle.SEATING_CHOICES,
+    'is_available': [(True, 'Available'), (False, 'Unavailable')],
+}
+
+PRICE_FIELDS = ('price_per_hour', 'price_per_day')
+
+FEATURE_FACET_LIMIT = 20
+
+_TRUE_VALUES = ('true', '1', 'yes')
+
+
+def _split(value):
+    return [v.strip() for v in (value or '').split(',') if v.strip()]
+
+
+def _coerce(dimension, raw):
+    if dimension == 'seating':
+        return int(raw) if raw.isdigit() else None
+    if dimension == 'is_available':
+        return raw.lower() in _TRUE_VALUES
+    return raw
+
+
+def _decimal(raw):
+    try:
+        return Decimal(raw)
+    except (InvalidOperation, TypeError):
+        return None
+
+
+def parse_vehicle_filters(params):
+    """
+    Turn query parameters into ``{dimension: Q}``. Recognised parameters:
+    type, fuel_type, transmission, seating, is_available, features,
+    min_/max_price_per_hour, min_/max_price_per_day.
+    """
+    conditions = {}
+    for dimension in CHOICE_FACETS:
+        values = [_coerce(dimension, raw) for raw in _split(params.get(dimension))]
+        values = [v for v in values if v is not None]
+        if values:
+            conditions[dimension] = Q(**{f'{dimension}__in': values})
+
+    for field in PRICE_FIELDS:
+        q = Q()
+        low, high = _decimal(params.get(f'min_{field}')), _decimal(params.get(f'max_{field}'))
+        if low is not None:
+            q &= Q(**{f'{field}__gte': low})
+        if high is not None:
+            q &= Q(**{f'{field}__lte': high})
+        if q:
+            conditions[field] = q
+
+    # Every requested feature must be present; Exists avoids multiplying rows with joins.
+    features = _split(params.get('features'))
+    if features:
+        q = Q()
+        for name in features:
+            q &= Q(Exists(VehicleFeature.objects.filter(vehicle=OuterRef('pk'), feature_name__iexact=name)))
+        conditions['features'] = q
+
+    return conditions
+
+
+def _combined(conditions, exclude=None):
+    q = Q()
+    for dimension, condition in conditions.items():
+        if dimension != exclude:
+            q &= condition
+    return q
+
+
+def apply_vehicle_filters(queryset, conditions):
+    return queryset.filter(_combined(conditions))
+
+
+def vehicle_facets(queryset, conditions):
+    """Facet counts and price bounds for ``queryset`` under ``conditions``."""
+    aggregates = {}
+    for dimension, choices in CHOICE_FACETS.items():
+        others = _combined(conditions, exclude=dimension)
+        for i, (value, _label) in enumerate(choices):
+            aggregates[f'{dimension}__{i}'] = Count('id', filter=others & Q(**{dimension: value}))
+    for field in PRICE_FIELDS:
+        others = _combined(conditions, exclude=field)
+        aggregates[f'{field}__min'] = Min(field, filter=others)
+        aggregates[f'{field}__max'] = Max(field, filter=others)
+    row = queryset.aggregate(**aggregates)
+
+    facets = {}
+    for dimension, choices in CHOICE_FACETS.items():
+        facets[dimension] = [
+            {'value': value, 'label': label, 'count': row[f'{dimension}__{i}']}
+            for i, (value, label) in enumerate(choices)
+        ]
+    for field in PRICE_FIELDS:
+        facets[field] = {'min': row[f'{field}__min'], 'max': row[f'{field}__max']}
+
+    feature_rows = (
+        VehicleFeature.objects
+        .filter(vehicle__in=queryset.filter(_combined(conditions, exclude='features')))
+        .values('feature_name')
+        .annotate(count=Count('vehicle', distinct=True))
+        .order_by('-count', 'feature_name')[:FEATURE_FACET_LIMIT]
+    )
+    facets['features'] = [{'value': r['feature_name'], 'count': r['count']} for r in feature_rows]
+    return facets
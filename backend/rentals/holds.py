@@ -0,0 +1,153 @@
+"""
+Checkout holds.
+
+While a customer fills in the booking form the app places a hold on the
+vehicle for the window being booked (``place_hold``). For
+``settings.BOOKING_HOLD_TTL`` nobody else can book or hold that vehicle over an
+overlapping window: ``vehicle_conflict`` and ``unavailable_vehicle_ids`` — used
+by booking validation and the quote endpoints — count unexpired holds of other
+customers like bookings. A customer's own holds never block them. Holds are
+only for future windows of at most ``settings.BOOKING_HOLD_MAX_DAYS``.
+
+Holds and bookings of a vehicle are written after ``lock_vehicle`` has
+updated the vehicle row, as the first write of the transaction: that row lock
+(PostgreSQL, MySQL) or database write lock (SQLite, where SELECT ... FOR
+UPDATE does nothing) lasts until commit, so a hold is taken and turned into a
+booking (``take_hold``) in one transaction that nobody can slip into. Expired holds
+need no clean-up to stop counting; ``sweep_expired_holds`` deletes them in
+batches from the booking scheduler (rentals.lifecycle).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Booking, BookingHold, Vehicle
+
+BATCH_SIZE = 1000
+
+# Booking statuses that make a vehicle unavailable over the booking's window
+BLOCKING_STATUSES = ('active', 'upcoming')
+
+
+class HoldError(Exception):
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.status = status
+
+
+def hold_ttl():
+    return timedelta(seconds=getattr(settings, 'BOOKING_HOLD_TTL', 600))
+
+
+def max_hold_window():
+    return timedelta(days=getattr(settings, 'BOOKING_HOLD_MAX_DAYS', 30))
+
+
+def active_holds(now=None):
+    return BookingHold.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def overlapping(queryset, start_date, end_date):
+    return queryset.filter(start_date__lt=end_date, end_date__gt=start_date)
+
+
+def lock_vehicle(vehicle_id):
+    """
+    Lock the vehicle row until the end of the transaction; returns the vehicle
+    or None. The lock is taken by a no-op UPDATE rather than SELECT ... FOR
+    UPDATE so it also serialises writers on SQLite; call it before any other
+    query of the transaction, or SQLite may fail to upgrade a read lock.
+    """
+    if not Vehicle.objects.filter(pk=vehicle_id).update(is_available=F('is_available')):
+        return None
+    return Vehicle.objects.filter(pk=vehicle_id).first()
+
+
+def vehicle_conflict(vehicle_id, start_date, end_date, user=None, exclude_booking=None):
+    """Why ``vehicle_id`` cannot be booked by ``user`` over the window, or None."""
+    bookings = overlapping(Booking.objects.filter(vehicle_id=vehicle_id, status__in=BLOCKING_STATUSES),
+                           start_date, end_date)
+    if exclude_booking is not None:
+        bookings = bookings.exclude(pk=exclude_booking.pk)
+    if bookings.exists():
+        return "Vehicle is already booked for this time period"
+    holds = overlapping(active_holds().filter(vehicle_id=vehicle_id), start_date, end_date)
+    if user is not None:
+        holds = holds.exclude(user=user)
+    if holds.exists():
+        return "Vehicle is being booked by another customer; try again in a few minutes"
+    return None
+
+
+def unavailable_vehicle_ids(vehicle_ids, start_date, end_date, user=None):
+    """Which of ``vehicle_ids`` are booked or held by others over the window, in one query."""
+    bookings = overlapping(Booking.objects.filter(vehicle_id__in=vehicle_ids, status__in=BLOCKING_STATUSES),
+                           start_date, end_date)
+    holds = overlapping(active_holds().filter(vehicle_id__in=vehicle_ids), start_date, end_date)
+    if user is not None:
+        holds = holds.exclude(user=user)
+    return set(
+        bookings.order_by().values_list('vehicle_id', flat=True)
+        .union(holds.order_by().values_list('vehicle_id', flat=True))
+    )
+
+
+def place_hold(user, vehicle_id, start_date, end_date):
+    """
+    Hold ``vehicle_id`` for ``user`` over the window, replacing their other
+    holds on it. Raises HoldError if it cannot be held.
+    """
+    now = timezone.now()
+    if start_date <= now:
+        raise HoldError("The rental must start in the future", status=400)
+    if end_date - start_date > max_hold_window():
+        raise HoldError(f"Vehicles can be held for at most {max_hold_window().days} days", status=400)
+    with transaction.atomic():
+        vehicle = lock_vehicle(vehicle_id)
+        if vehicle is None:
+            raise HoldError("Vehicle not found", status=404)
+        if not vehicle.is_available:
+            raise HoldError("Vehicle is not available")
+        conflict = vehicle_conflict(vehicle.id, start_date, end_date, user)
+        if conflict:
+            raise HoldError(conflict)
+        active_holds(now).filter(user=user, vehicle=vehicle).delete()
+        if active_holds(now).filter(user=user).count() >= settings.BOOKING_HOLDS_PER_USER:
+            raise HoldError("You are already booking too many vehicles at once", status=429)
+        return BookingHold.objects.create(
+            user=user, vehicle=vehicle, start_date=start_date, end_date=end_date, expires_at=now + hold_ttl(),
+        )
+
+
+def release_hold(user, token):
+    """Drop ``user``'s hold ``token``; returns whether there was one."""
+    deleted, _ = BookingHold.objects.filter(user=user, token=token).delete()
+    return bool(deleted)
+
+
+def take_hold(user, token, vehicle_id, start_date, end_date):
+    """
+    Consume ``user``'s hold ``token`` for a booking of ``vehicle_id`` over the
+    window, which must lie within the held one. Must run inside the booking's
+    transaction, with the vehicle locked. Raises HoldError.
+    """
+    hold = BookingHold.objects.filter(user=user, token=token).first()
+    if hold is None or hold.expires_at <= timezone.now():
+        raise HoldError("Your hold on this vehicle has expired")
+    if hold.vehicle_id != vehicle_id or start_date < hold.start_date or end_date > hold.end_date:
+        raise HoldError("Your hold is for a different vehicle or time", status=400)
+    hold.delete()
+    return hold
+
+
+def sweep_expired_holds(now, batch_size=BATCH_SIZE):
+    """Delete expired holds ``batch_size`` at a time; returns how many."""
+    swept = 0
+    while True:
+        ids = list(BookingHold.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return swept
+        swept += BookingHold.objects.filter(id__in=ids).delete()[0]
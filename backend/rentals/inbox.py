@@ -0,0 +1,113 @@
+"""
+Notification inbox: unread counter, bulk state changes and retention.
+
+``NotificationCounter.unread`` mirrors each user's number of unread
+``Notification`` rows so badges never need a COUNT. Every write path goes
+through this module and moves the counter by exactly the number of rows its
+single UPDATE/DELETE statement touched; ``recount`` repairs drift.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Notification, NotificationCounter
+
+# Read notifications are kept this long, unread ones a while longer.
+READ_RETENTION = timedelta(days=30)
+UNREAD_RETENTION = timedelta(days=180)
+PRUNE_BATCH_SIZE = 1000
+
+
+def adjust_unread(deltas):
+    """Apply ``{user_id: delta}`` to the unread counters, creating missing rows."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in deltas], ignore_conflicts=True,
+    )
+    # One UPDATE per distinct delta; fan-out batches are all +1.
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(unread=F('unread') + delta)
+
+
+def unread_count(user):
+    return NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).first() or 0
+
+
+def notifications_delivered(user_ids):
+    """Counter bookkeeping for rows inserted with bulk_create (which sends no signals)."""
+    adjust_unread(Counter(user_ids))
+
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        adjust_unread({instance.user_id: 1})
+
+
+def mark_read(user, ids=None):
+    """Mark ``ids`` (default: all) of ``user``'s notifications read; returns how many changed."""
+    unread = Notification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        unread = unread.filter(id__in=ids)
+    with transaction.atomic():
+        changed = unread.update(is_read=True)
+        adjust_unread({user.id: -changed})
+    return changed
+
+
+def delete_notifications(user, ids=None, only_read=False):
+    """Delete ``ids`` (default: all) of ``user``'s notifications; returns how many were removed."""
+    rows = Notification.objects.filter(user=user)
+    if ids is not None:
+        rows = rows.filter(id__in=ids)
+    with transaction.atomic():
+        # Read and unread rows are deleted separately so the counter moves exactly.
+        removed, _ = rows.filter(is_read=True).delete()
+        if not only_read:
+            unread_removed, _ = rows.filter(is_read=False).delete()
+            adjust_unread({user.id: -unread_removed})
+            removed += unread_removed
+    return removed
+
+
+def prune(now=None, batch_size=PRUNE_BATCH_SIZE):
+    """Delete read notifications past READ_RETENTION and all past UNREAD_RETENTION."""
+    now = now or timezone.now()
+    expired = (
+        Notification.objects.filter(is_read=True, created_at__lt=now - READ_RETENTION)
+        | Notification.objects.filter(created_at__lt=now - UNREAD_RETENTION)
+    )
+    removed = 0
+    while True:
+        batch = list(expired.order_by().values_list('id', 'user_id', 'is_read')[:batch_size])
+        if not batch:
+            return removed
+        unread = Counter(user_id for _id, user_id, is_read in batch if not is_read)
+        with transaction.atomic():
+            Notification.objects.filter(id__in=[row[0] for row in batch]).delete()
+            adjust_unread({user_id: -n for user_id, n in unread.items()})
+        removed += len(batch)
+
+
+def recount():
+    """Rewrite every counter from the notification table."""
+    users_with_unread = Notification.objects.filter(is_read=False).order_by().values_list('user_id', flat=True).distinct()
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in users_with_unread], ignore_conflicts=True,
+    )
+    unread = (
+        Notification.objects.filter(user_id=OuterRef('user_id'), is_read=False)
+        .order_by().values('user_id').annotate(n=Count('id')).values('n')
+    )
+    return NotificationCounter.objects.update(unread=Coalesce(Subquery(unread), Value(0)))
@@ -0,0 +1,186 @@
+"""
+Database-backed background jobs.
+
+Side effects of a request (notifications, derived aggregates, image variants,
+account provisioning) are written as ``Job`` rows in the same transaction as
+the primary write — a transactional outbox — and executed later by
+``manage.py run_jobs`` workers:
+
+    with transaction.atomic():
+        reg_request.save()
+        enqueue('owners.provision_account', registration_id=reg_request.id)
+
+If the request's transaction rolls back, the job disappears with it; once it
+commits, the job is guaranteed to run. Handlers are registered with
+``@job('name')`` and receive the payload as keyword arguments, so payloads must
+be JSON-serialisable. A handler runs in one transaction that first removes its
+job — only if the worker still holds the job's lock — so handlers that only
+touch the database (e.g. the shop rating deltas) take effect exactly once even
+if a job was re-queued while running. Handlers doing slow outside work (HTTP
+calls, image rendering) are registered with ``atomic=False``: holding a
+transaction open around them would keep SQLite's write lock for seconds, so
+they run in autocommit after the worker's claim has committed and their job is
+removed once they return. They run at least once and must be idempotent.
+Workers refresh a job's lock as they start it. Failures are retried with
+exponential backoff and kept as ``failed`` after ``max_attempts``.
+
+With ``settings.JOBS_EAGER`` jobs run in-process as soon as the enqueuing
+transaction commits, for local development without a worker.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+
+# A job whose lock was not refreshed for this long belongs to a worker that died; it is re-queued.
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+_registry = {}
+
+
+def job(name, atomic=True):
+    """
+    Register the decorated function as the handler for jobs called ``name``.
+    With ``atomic=False`` it runs outside a transaction (see above).
+    """
+    def decorator(func):
+        _registry[name] = (func, atomic)
+        return func
+    return decorator
+
+
+def enqueue(name, delay=None, max_attempts=DEFAULT_MAX_ATTEMPTS, **payload):
+    """
+    Queue ``name`` with ``payload``. Call inside the transaction of the write the
+    job belongs to; the job becomes visible to workers when that commits.
+    """
+    if name not in _registry:
+        raise ValueError(f"Unknown job {name!r}")
+    record = Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + (delay or timedelta(0)),
+    )
+    if getattr(settings, 'JOBS_EAGER', False) and not delay:
+        transaction.on_commit(lambda: _run_eagerly(record.pk))
+    return record
+
+
+def _claim(ids, worker_id, now):
+    Job.objects.filter(id__in=ids, status='pending').update(
+        status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+    )
+    return list(Job.objects.filter(id__in=ids, status='running', locked_by=worker_id).order_by('run_at', 'id'))
+
+
+def claim_jobs(worker_id, limit=10):
+    """Atomically take up to ``limit`` due jobs for ``worker_id``."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = Job.objects.filter(status='pending', run_at__lte=now).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:limit])
+        # The status filter in _claim keeps two workers from taking the same job
+        # on databases without row locks (SQLite serialises the UPDATEs).
+        return _claim(ids, worker_id, now) if ids else []
+
+
+def lock_job(record):
+    """Refresh ``record``'s lock before running it; False if it was re-queued meanwhile."""
+    now = timezone.now()
+    locked = Job.objects.filter(pk=record.pk, status='running', locked_by=record.locked_by).update(locked_at=now)
+    record.locked_at = now
+    return bool(locked)
+
+
+def _remove(record):
+    """Delete ``record`` if its worker still holds it; False if it was taken over."""
+    return bool(Job.objects.filter(pk=record.pk, status='running', locked_by=record.locked_by).delete()[0])
+
+
+def run_job(record):
+    """Execute one claimed job; returns True on success."""
+    handler, atomic = _registry.get(record.name, (None, True))
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job {record.name!r}")
+        if not atomic:
+            handler(**record.payload)
+            if not _remove(record):
+                logger.warning("Job %s #%s was taken over by another worker while it ran", record.name, record.pk)
+            return True
+        with transaction.atomic():
+            # Removing the job first makes it the idempotency key: a worker whose
+            # job was re-queued and taken by another finds nothing to delete.
+            if not _remove(record):
+                logger.warning("Job %s #%s was taken over by another worker; skipping", record.name, record.pk)
+                return False
+            handler(**record.payload)
+        return True
+    except Exception:
+        logger.exception("Job %s #%s failed (attempt %s/%s)", record.name, record.pk,
+                         record.attempts, record.max_attempts)
+        if record.attempts >= record.max_attempts:
+            status, run_at = 'failed', record.run_at
+        else:
+            backoff = min(RETRY_BASE_SECONDS * 2 ** (record.attempts - 1), RETRY_MAX_SECONDS)
+            status, run_at = 'pending', timezone.now() + timedelta(seconds=backoff)
+        Job.objects.filter(pk=record.pk, locked_by=record.locked_by).update(
+            status=status, run_at=run_at, locked_by='', locked_at=None,
+            last_error=traceback.format_exc()[-4000:],
+        )
+        return False
+
+
+def _run_eagerly(pk):
+    for record in _claim([pk], 'eager', timezone.now()):
+        run_job(record)
+
+
+def release_stale_jobs(timeout=LOCK_TIMEOUT):
+    """Re-queue running jobs whose lock has not been refreshed (see lock_job) within ``timeout``."""
+    return Job.objects.filter(status='running', locked_at__lt=timezone.now() - timeout).update(
+        status='pending', locked_by='', locked_at=None,
+    )
+
+
+def run_worker(worker_id=None, batch_size=10, poll_interval=1.0, once=False):
+    """Process jobs until interrupted (or, with ``once``, until the queue is drained)."""
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+    processed = 0
+    last_sweep = 0.0
+    while True:
+        if time.monotonic() - last_sweep > 60:
+            release_stale_jobs()
+            last_sweep = time.monotonic()
+
+        records = claim_jobs(worker_id, batch_size)
+        for record in records:
+            # Later jobs of a batch wait for earlier ones; refresh the lock so
+            # release_stale_jobs does not hand them to another worker meanwhile.
+            if lock_job(record):
+                run_job(record)
+                processed += 1
+        close_old_connections()
+
+        if not records:
+            if once:
+                return processed
+            time.sleep(poll_interval)
@@ -0,0 +1,166 @@
+"""
+Time-driven booking transitions.
+
+Bookings otherwise only move when someone acts on them (staff task completion,
+cancel, pickup request). ``run_scheduler`` applies the transitions that are due
+purely because time has passed:
+
+* reminders and payment alerts before start and end (rentals.reminders);
+* no-shows: ``upcoming`` bookings whose start is more than NO_SHOW_GRACE in the
+  past are cancelled and their vehicles released. A booking only turns
+  ``active`` when staff complete its task, so bookings that still have an open
+  staff task are left alone — the customer may already have the vehicle;
+* overdue: ``active``/``pickup_requested`` bookings past ``end_date`` by more
+  than OVERDUE_GRACE are flagged (``overdue_at``) and customer and shop owner
+  are alerted. The booking stays open — the vehicle is still out;
+* expired checkout holds are deleted (rentals.holds);
+* shop rank scores are rescaled to the current time (rentals.ranking), so they
+  keep decaying for shops that get no new reviews. Only scores that drifted by
+  more than RANK_SCORE_TOLERANCE are rewritten, which with a half-life of months
+  is a few shops a day rather than every shop on every run.
+
+Each rule reads its candidates from the (status, start_date) / (status,
+end_date) indexes and handles them in batches. A batch is claimed with one
+conditional UPDATE that also stamps the run's timestamp, and only the rows
+carrying that stamp afterwards are processed — the same claim the job queue
+uses — so several nodes can run the scheduler at once and a re-run after a
+crash never repeats a transition. Side effects go through the job queue in the
+same transaction as the claim.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, ExpressionWrapper, F, FloatField, OuterRef
+from django.db.models.functions import Abs
+from django.utils import timezone
+
+from staff.models import StaffTask
+from staff.transitions import drop_open_tasks
+
+from .holds import sweep_expired_holds
+from .models import Booking, RentalShop, Vehicle
+from .ranking import rank_score
+from .notifications import BOOKING_STATUS_MESSAGES, queue_notification, queue_notifications
+from .reminders import send_due_reminders
+
+logger = logging.getLogger(__name__)
+
+NO_SHOW_GRACE = timedelta(hours=6)
+OVERDUE_GRACE = timedelta(minutes=30)
+BATCH_SIZE = 500
+# How far a stored rank_score may lag its value at the current time
+RANK_SCORE_TOLERANCE = 0.001
+
+# Statuses in which a booking holds its vehicle (see update_vehicle_availability)
+HOLDING_STATUSES = ('upcoming', 'active', 'pickup_requested')
+
+
+def _in_batches(due, changes, handle, batch_size):
+    """
+    Claim rows of ``due`` ``batch_size`` at a time by applying ``changes`` and pass
+    the ones this call claimed to ``handle``. ``changes`` must take a row out of
+    ``due`` and include the run's timestamp. Returns the number handled.
+    """
+    handled = 0
+    while True:
+        ids = list(due.order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return handled
+        with transaction.atomic():
+            due.filter(id__in=ids).update(**changes)
+            claimed = list(
+                Booking.objects.filter(id__in=ids, **changes)
+                .select_related('vehicle', 'shop__owner')
+            )
+            if claimed:
+                handle(claimed)
+        handled += len(claimed)
+
+
+def release_vehicles(vehicle_ids):
+    """Mark vehicles available again once no booking holds them."""
+    holding = Booking.objects.filter(vehicle=OuterRef('pk'), status__in=HOLDING_STATUSES)
+    return (
+        Vehicle.objects.filter(id__in=vehicle_ids, is_available=False)
+        .exclude(Exists(holding))
+        .update(is_available=True)
+    )
+
+
+def expire_no_shows(now, batch_size=BATCH_SIZE):
+    open_tasks = StaffTask.objects.filter(booking=OuterRef('pk'), status__in=('pending', 'in_progress'))
+    due = (
+        Booking.objects.filter(status='upcoming', start_date__lt=now - NO_SHOW_GRACE)
+        .exclude(Exists(open_tasks))
+    )
+    title, template = BOOKING_STATUS_MESSAGES['cancelled']
+
+    def handle(bookings):
+        release_vehicles({booking.vehicle_id for booking in bookings})
+        # A task assigned between the claim and now would otherwise be orphaned
+        drop_open_tasks([booking.id for booking in bookings])
+        for booking in bookings:
+            logger.info("Booking #%s expired as a no-show", booking.id)
+            queue_notification(
+                'booking_status', title, template.format(vehicle=booking.vehicle.name),
+                user_ids=[booking.user_id], data={'booking_id': booking.id},
+            )
+
+    return _in_batches(due, {'status': 'cancelled', 'updated_at': now}, handle, batch_size)
+
+
+def flag_overdue(now, batch_size=BATCH_SIZE):
+    due = Booking.objects.filter(
+        status__in=('active', 'pickup_requested'), end_date__lt=now - OVERDUE_GRACE, overdue_at__isnull=True,
+    )
+
+    def handle(bookings):
+        items = []
+        for booking in bookings:
+            data = {'booking_id': booking.id}
+            items.append((booking.user_id, 'Rental Overdue',
+                          f'Your rental of {booking.vehicle.name} was due back. Please return it or contact the shop.',
+                          data))
+            if booking.shop.owner is not None:
+                items.append((booking.shop.owner.user_id, 'Rental Overdue',
+                              f'{booking.vehicle.name} (booking #{booking.id}) has not been returned', data))
+        queue_notifications('booking_overdue', items)
+
+    return _in_batches(due, {'overdue_at': now}, handle, batch_size)
+
+
+def refresh_rank_scores(now, batch_size=BATCH_SIZE):
+    """
+    Rescale the rank_score of reviewed shops whose stored score drifted by more
+    than RANK_SCORE_TOLERANCE from its value at ``now``, ``batch_size`` at a time.
+    """
+    fresh = ExpressionWrapper(
+        rank_score(F('decayed_rating_sum'), F('decayed_review_weight'), now), output_field=FloatField(),
+    )
+    stale = (
+        RentalShop.objects.filter(decayed_review_weight__gt=0)
+        .alias(drift=Abs(F('rank_score') - fresh))
+        .filter(drift__gt=RANK_SCORE_TOLERANCE)
+    )
+    refreshed = 0
+    while True:
+        ids = list(stale.order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return refreshed
+        refreshed += RentalShop.objects.filter(id__in=ids).update(rank_score=fresh)
+
+
+RULES = [
+    ('reminders', send_due_reminders),
+    ('no_shows', expire_no_shows),
+    ('overdue', flag_overdue),
+    ('expired_holds', sweep_expired_holds),
+    ('rank_scores', refresh_rank_scores),
+]
+
+
+def run_scheduler(now=None, batch_size=BATCH_SIZE):
+    """Apply every due transition once; returns ``{rule: rows handled}``."""
+    now = now or timezone.now()
+    return {name: rule(now, batch_size) for name, rule in RULES}
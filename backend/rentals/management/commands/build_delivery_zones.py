@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from rentals.models import RentalShop
+from rentals.pricing import build_zones
+from rentals.routing import get_graph
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute shop delivery zones from DELIVERY_FEE_TIERS. "
+        "Run after changing the tiers or rebuilding the routing graph."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, action='append', help="Only this shop (repeatable).")
+
+    def handle(self, *args, **options):
+        shops = RentalShop.objects.all()
+        if options['shop']:
+            shops = shops.filter(id__in=options['shop'])
+        graph = get_graph()
+        count = 0
+        for shop in shops.iterator():
+            build_zones(shop, graph)
+            count += 1
+        kind = "road distance" if graph is not None else "straight-line distance"
+        self.stdout.write(self.style.SUCCESS(f"Built delivery zones for {count} shop(s) by {kind}."))
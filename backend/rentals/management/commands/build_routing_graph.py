@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from rentals.routing import build_graph, save_graph
+
+
+class Command(BaseCommand):
+    help = "Build the road graph used by rentals.routing from an OpenStreetMap XML extract (.osm)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('osm_file', help="OSM XML extract covering the shops' delivery area.")
+        parser.add_argument('--output', default=None,
+                            help="Where to write the graph (default settings.ROUTING_GRAPH_PATH).")
+
+    def handle(self, *args, **options):
+        output = options['output'] or getattr(settings, 'ROUTING_GRAPH_PATH', None)
+        if not output:
+            raise CommandError("Pass --output or set ROUTING_GRAPH_PATH.")
+        try:
+            graph = build_graph(options['osm_file'])
+        except (OSError, SyntaxError) as e:
+            raise CommandError(f"Could not read {options['osm_file']}: {e}")
+        if not len(graph['lat']):
+            raise CommandError("The extract contains no drivable roads.")
+        save_graph(graph, output)
+        self.stdout.write(self.style.SUCCESS(
+            f"Routing graph written to {output}: {len(graph['lat'])} nodes, {len(graph['targets'])} edges. "
+            "Restart the app servers to load it."
+        ))
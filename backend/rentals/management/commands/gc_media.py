@@ -0,0 +1,78 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from rentals.media import MEDIA_REFERENCES, variant_names
+from rentals.models import MediaBlob
+
+
+def live_references():
+    """Count how many rows point at each stored file name."""
+    counts = Counter()
+    for model, field in MEDIA_REFERENCES:
+        rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        counts.update(rows.values_list(field, flat=True).iterator())
+    return counts
+
+
+def is_referenced(name):
+    return any(model.objects.filter(**{field: name}).exists() for model, field in MEDIA_REFERENCES)
+
+
+class Command(BaseCommand):
+    help = "Delete media files (and their resized variants) that no row references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help="Only collect blobs unreferenced for at least this long (default 24).")
+        parser.add_argument('--reconcile', action='store_true',
+                            help="Recompute every reference count from the database first.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted.")
+
+    def handle(self, *args, **options):
+        if options['reconcile']:
+            self.reconcile()
+
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        candidates = MediaBlob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff)
+        deleted = 0
+        for blob in candidates.iterator():
+            # Counts are maintained by signals; bulk updates bypass them, so
+            # confirm against the referencing columns before deleting anything.
+            if is_referenced(blob.name):
+                continue
+            if options['dry_run']:
+                self.stdout.write(blob.name)
+                deleted += 1
+                continue
+            with transaction.atomic():
+                # Re-check under the row lock in case an upload just reused the blob.
+                if not MediaBlob.objects.select_for_update().filter(pk=blob.pk, ref_count__lte=0).exists():
+                    continue
+                for name in [blob.name, *variant_names(blob.name)]:
+                    if default_storage.exists(name):
+                        default_storage.delete(name)
+                blob.delete()
+            deleted += 1
+
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} unreferenced blob(s)."))
+
+    def reconcile(self):
+        counts = live_references()
+        now = timezone.now()
+        fixed = 0
+        for blob in MediaBlob.objects.iterator():
+            actual = counts.pop(blob.name, 0)
+            if blob.ref_count != actual:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=actual, updated_at=now)
+                fixed += 1
+        MediaBlob.objects.bulk_create(
+            [MediaBlob(name=name, ref_count=count) for name, count in counts.items()],
+            batch_size=500,
+        )
+        self.stdout.write(f"Reconciled {fixed} count(s), registered {len(counts)} untracked file(s).")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from rentals.media import IMAGE_FIELDS, process_image
+
+
+class Command(BaseCommand):
+    help = "Render missing resized image variants for vehicle, shop and profile images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Re-render variants that already exist.")
+
+    def handle(self, *args, **options):
+        rendered = 0
+        for model, field_name, variants_field in IMAGE_FIELDS:
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for pk, name, variants in rows.values_list('pk', field_name, variants_field).iterator():
+                if not options['force'] and (variants or {}).get('source') == name:
+                    continue
+                try:
+                    process_image(model._meta.label, pk, field_name, variants_field, name)
+                except Exception as e:
+                    self.stderr.write(f"{model._meta.label} #{pk} ({name}): {e}")
+                    continue
+                rendered += 1
+        self.stdout.write(self.style.SUCCESS(f"Rendered variants for {rendered} image(s)."))
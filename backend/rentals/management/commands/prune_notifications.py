@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from rentals.inbox import prune, recount
+
+
+class Command(BaseCommand):
+    help = "Delete notifications past their retention period and optionally rebuild unread counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true', help="Recompute every user's unread counter.")
+
+    def handle(self, *args, **options):
+        removed = prune()
+        self.stdout.write(f"Pruned {removed} notification(s).")
+        if options['recount']:
+            self.stdout.write(f"Recounted {recount()} unread counter(s).")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from rentals.uploads import STALE_AFTER, purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Remove abandoned chunked uploads and their staging files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=int(STALE_AFTER.total_seconds() // 3600),
+                            help="Age after which an idle upload is considered abandoned.")
+
+    def handle(self, *args, **options):
+        removed = purge_stale_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} stale upload(s)."))
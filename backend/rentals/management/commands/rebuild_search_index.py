@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rentals.search import get_search_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the shop/vehicle full-text search index from scratch."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_index()
+        backend = type(get_search_backend()).__name__
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt ({backend})."))
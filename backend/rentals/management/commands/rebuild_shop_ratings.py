@@ -0,0 +1,43 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from rentals.models import RentalShop, Review
+from rentals.ranking import rank_score, review_weight
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild RentalShop rating totals and rank_score from the review table, e.g. after "
+        "changing the decay settings. Routine decay is applied by run_booking_scheduler."
+    )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        # shop_id -> [rating_sum, review_count, decayed_rating_sum, decayed_review_weight]
+        totals = defaultdict(lambda: [0, 0, 0.0, 0.0])
+        for shop_id, rating, created_at in Review.objects.values_list('shop_id', 'rating', 'created_at').iterator():
+            weight = review_weight(created_at)
+            row = totals[shop_id]
+            row[0] += rating
+            row[1] += 1
+            row[2] += rating * weight
+            row[3] += weight
+
+        fields = ['rating_sum', 'review_count', 'rating', 'decayed_rating_sum', 'decayed_review_weight', 'rank_score']
+        changed = []
+        with transaction.atomic():
+            for shop in RentalShop.objects.select_for_update().only('id', *fields):
+                rating_sum, review_count, decayed_sum, decayed_weight = totals.get(shop.id, (0, 0, 0.0, 0.0))
+                shop.rating_sum = rating_sum
+                shop.review_count = review_count
+                shop.rating = round(rating_sum / review_count, 1) if review_count else 0.0
+                shop.decayed_rating_sum = decayed_sum
+                shop.decayed_review_weight = decayed_weight
+                shop.rank_score = rank_score(decayed_sum, decayed_weight, now)
+                changed.append(shop)
+            RentalShop.objects.bulk_update(changed, fields, batch_size=500)
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled ratings for {len(changed)} shop(s)."))
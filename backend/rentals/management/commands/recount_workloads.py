@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from staff.workload import recount
+
+
+class Command(BaseCommand):
+    help = "Recompute staff workload counters (open tasks and complaints) from the task and complaint tables."
+
+    def handle(self, *args, **options):
+        count = recount()
+        self.stdout.write(self.style.SUCCESS(f"Recounted workloads of {count} staff member(s)."))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from rentals.lifecycle import BATCH_SIZE, run_scheduler
+
+
+class Command(BaseCommand):
+    help = ("Apply time-driven booking transitions (reminders, no-shows, overdue, expired holds, rank score decay). "
+            "Safe to run on several nodes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep running instead of exiting after one pass.")
+        parser.add_argument('--interval', type=float, default=60.0,
+                            help="Seconds between passes with --loop (default 60).")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f"Bookings claimed per batch (default {BATCH_SIZE}).")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                counts = run_scheduler(batch_size=options['batch_size'])
+                self.stdout.write(", ".join(f"{rule}: {n}" for rule, n in counts.items()))
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS("Done."))
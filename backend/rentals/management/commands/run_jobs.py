@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from rentals.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run a background job worker. Start several for more throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty.")
+        parser.add_argument('--batch-size', type=int, default=10, help="Jobs claimed per poll (default 10).")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty (default 1).")
+        parser.add_argument('--worker-id', help="Name recorded on claimed jobs (default host:pid).")
+
+    def handle(self, *args, **options):
+        try:
+            processed = run_worker(
+                worker_id=options['worker_id'],
+                batch_size=options['batch_size'],
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+            )
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from rentals.notifications import AUDIENCES, queue_notification
+
+
+class Command(BaseCommand):
+    help = "Queue a promotional notification to every user in an audience who accepts promotions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('title')
+        parser.add_argument('message')
+        parser.add_argument('--audience', choices=sorted(AUDIENCES), default='customers')
+
+    def handle(self, *args, **options):
+        queue_notification('promo', options['title'], options['message'], audience=options['audience'])
+        self.stdout.write(self.style.SUCCESS(f"Queued promotion for audience '{options['audience']}'."))
@@ -0,0 +1,225 @@
+"""
+Image upload pipeline.
+
+Uploads are stored untouched in the request, which also queues a
+``media.render_variants`` job (rentals.jobs). The worker writes resized WebP and JPEG
+variants at fixed widths next to it (``<dir>/variants/<stem>_<width>w.<ext>``)
+and records them in the owning row's ``*_variants`` JSON field:
+
+    {"source": "vehicles_img/a.jpg",
+     "jpeg": {"320": "vehicles_img/variants/a_320w.jpg", ...},
+     "webp": {"320": "vehicles_img/variants/a_320w.webp", ...}}
+
+Serializers turn that into ``srcset`` strings, so list endpoints can ship small
+thumbnails instead of multi-megabyte originals.
+
+Every stored file is also reference-counted in ``MediaBlob`` so that replaced or
+deleted uploads can be garbage-collected (``manage.py gc_media``).
+"""
+import io
+import os
+import re
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .jobs import enqueue, job
+from .models import KYCDocument, MediaBlob, OwnerRegistrationRequest, RentalShop, UserProfile, VehicleImage
+from .storage import public_media_storage
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = {
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+}
+
+# (model, image field, variants field) for every image that goes through the pipeline
+IMAGE_FIELDS = [
+    (VehicleImage, 'image', 'variants'),
+    (RentalShop, 'image', 'image_variants'),
+    (UserProfile, 'profile_picture', 'profile_picture_variants'),
+]
+
+# (model, file field) for every column whose files are reference-counted in MediaBlob
+MEDIA_REFERENCES = [
+    (VehicleImage, 'image'),
+    (RentalShop, 'image'),
+    (UserProfile, 'profile_picture'),
+    (KYCDocument, 'driving_license_photo'),
+    (KYCDocument, 'secondary_doc_photo'),
+    (OwnerRegistrationRequest, 'certificate_file'),
+]
+
+def variant_name(source_name, width, ext):
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}_{width}w.{ext}')
+
+
+def render_variants(source_name, storage=default_storage):
+    """Write every variant of ``source_name`` and return the variants mapping."""
+    from PIL import Image, ImageOps
+
+    # Variants of a content-addressed blob are themselves immutable, so a
+    # re-upload of the same photo reuses them instead of rendering again.
+    reuse = public_media_storage.is_blob(source_name)
+
+    with storage.open(source_name, 'rb') as fh:
+        original = ImageOps.exif_transpose(Image.open(fh))
+        original.load()
+
+    variants = {'source': source_name}
+    for fmt in VARIANT_FORMATS:
+        variants[fmt] = {}
+
+    # Never upscale: widths above the original collapse into one original-width variant.
+    for width in sorted({min(w, original.width) for w in VARIANT_WIDTHS}):
+        resized = None
+        for fmt, (ext, options) in VARIANT_FORMATS.items():
+            name = variant_name(source_name, width, ext)
+            if storage.exists(name):
+                if reuse:
+                    variants[fmt][str(width)] = name
+                    continue
+                storage.delete(name)
+            if resized is None:
+                height = max(1, round(original.height * width / original.width))
+                resized = original.resize((width, height), Image.LANCZOS)
+            image = resized.convert('RGB') if fmt == 'jpeg' and resized.mode != 'RGB' else resized
+            buffer = io.BytesIO()
+            image.save(buffer, format=fmt.upper(), **options)
+            variants[fmt][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def variant_names(source_name, storage=default_storage):
+    """Names of the variant files currently stored for ``source_name``."""
+    directory, filename = os.path.split(source_name)
+    variants_dir = os.path.join(directory, 'variants')
+    pattern = re.compile(re.escape(os.path.splitext(filename)[0]) + r'_\d+w\.\w+$')
+    try:
+        _dirs, files = storage.listdir(variants_dir)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(variants_dir, f) for f in files if pattern.match(f)]
+
+
+@job('media.render_variants', atomic=False)
+def process_image(model_label, pk, field_name, variants_field, source_name):
+    """Job handler: render variants and attach them if the image hasn't changed since."""
+    model = apps.get_model(model_label)
+    variants = render_variants(source_name)
+    model.objects.filter(pk=pk, **{field_name: source_name}).update(**{variants_field: variants})
+
+
+def schedule_variants(instance, field_name, variants_field):
+    """Queue variant rendering for ``instance.<field_name>`` with the current transaction."""
+    source_name = getattr(instance, field_name).name
+    if not source_name:
+        return
+    enqueue('media.render_variants', model_label=instance._meta.label, pk=instance.pk,
+            field_name=field_name, variants_field=variants_field, source_name=source_name)
+
+
+def srcset(variants, fmt='jpeg'):
+    """``"url 320w, url 640w"`` for one format of a variants mapping ('' when not rendered yet)."""
+    renditions = (variants or {}).get(fmt) or {}
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w'
+        for width, name in sorted(renditions.items(), key=lambda item: int(item[0]))
+    )
+
+
+def image_sources(field_file, variants):
+    """Serializer helper: original URL plus srcsets and the smallest thumbnail."""
+    if not field_file:
+        return None
+    current = variants if (variants or {}).get('source') == field_file.name else {}
+    thumbnails = (current or {}).get('jpeg') or {}
+    smallest = min(thumbnails, key=int) if thumbnails else None
+    return {
+        'src': field_file.url,
+        'thumbnail': default_storage.url(thumbnails[smallest]) if smallest else field_file.url,
+        'srcset': srcset(current, 'jpeg'),
+        'webp_srcset': srcset(current, 'webp'),
+    }
+
+
+# ── Upload hooks ──────────────────────────────────────────────────────────────
+
+def _needs_variants(instance, field_name, variants_field, update_fields):
+    if update_fields is not None and field_name not in update_fields:
+        return False
+    name = getattr(instance, field_name).name
+    return bool(name) and (getattr(instance, variants_field) or {}).get('source') != name
+
+
+def _connect(model, field_name, variants_field):
+    @receiver(post_save, sender=model, weak=False,
+              dispatch_uid=f'media-variants-{model._meta.label}-{field_name}')
+    def queue_variants(sender, instance, update_fields=None, **kwargs):
+        if _needs_variants(instance, field_name, variants_field, update_fields):
+            schedule_variants(instance, field_name, variants_field)
+
+
+for _model, _field, _variants in IMAGE_FIELDS:
+    _connect(_model, _field, _variants)
+
+
+# ── Reference counting ────────────────────────────────────────────────────────
+
+def adjust_blob_refs(name, delta):
+    """Atomically add ``delta`` to the reference count of the blob stored as ``name``."""
+    if not name:
+        return
+    now = timezone.now()
+    updated = MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + delta, updated_at=now)
+    if not updated:
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, ref_count=max(delta, 0))
+        except IntegrityError:
+            # Created concurrently; apply the delta to that row instead.
+            MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + delta, updated_at=now)
+
+
+def _track_references(model, fields):
+    uid = f'media-refs-{model._meta.label}'
+
+    @receiver(post_init, sender=model, weak=False, dispatch_uid=uid)
+    def remember_files(sender, instance, **kwargs):
+        instance._media_names = {f: instance.__dict__.get(f) for f in fields}
+
+    @receiver(post_save, sender=model, weak=False, dispatch_uid=uid)
+    def count_file_changes(sender, instance, created, update_fields=None, **kwargs):
+        known = getattr(instance, '_media_names', {})
+        for field in fields:
+            if update_fields is not None and field not in update_fields:
+                continue
+            new = getattr(instance, field).name or None
+            old = None if created else (known.get(field) or None)
+            if hasattr(old, 'name'):
+                old = old.name or None
+            if new != old:
+                adjust_blob_refs(new, 1)
+                adjust_blob_refs(old, -1)
+                known[field] = new
+        instance._media_names = known
+
+    @receiver(post_delete, sender=model, weak=False, dispatch_uid=uid)
+    def release_files(sender, instance, **kwargs):
+        for field in fields:
+            adjust_blob_refs(getattr(instance, field).name, -1)
+
+
+_tracked = {}
+for _model, _field in MEDIA_REFERENCES:
+    _tracked.setdefault(_model, []).append(_field)
+for _model, _fields in _tracked.items():
+    _track_references(_model, _fields)
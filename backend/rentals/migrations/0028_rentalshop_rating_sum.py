@@ -0,0 +1,32 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:23
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    RentalShop = apps.get_model('rentals', 'RentalShop')
+    Review = apps.get_model('rentals', 'Review')
+    totals = Review.objects.values('shop_id').annotate(total=Sum('rating'), count=Count('id'))
+    for row in totals:
+        RentalShop.objects.filter(pk=row['shop_id']).update(
+            rating_sum=row['total'],
+            review_count=row['count'],
+            rating=round(row['total'] / row['count'], 1),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0027_alter_booking_delivery_option'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalshop',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
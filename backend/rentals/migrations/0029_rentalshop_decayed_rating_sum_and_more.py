@@ -0,0 +1,49 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:24
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+from rentals.ranking import rank_score, review_weight
+
+
+def backfill_rank_scores(apps, schema_editor):
+    RentalShop = apps.get_model('rentals', 'RentalShop')
+    Review = apps.get_model('rentals', 'Review')
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for shop_id, rating, created_at in Review.objects.values_list('shop_id', 'rating', 'created_at').iterator():
+        weight = review_weight(created_at)
+        totals[shop_id][0] += rating * weight
+        totals[shop_id][1] += weight
+    for shop_id, (decayed_sum, decayed_weight) in totals.items():
+        RentalShop.objects.filter(pk=shop_id).update(
+            decayed_rating_sum=decayed_sum,
+            decayed_review_weight=decayed_weight,
+            rank_score=rank_score(decayed_sum, decayed_weight),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0028_rentalshop_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalshop',
+            name='decayed_rating_sum',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='rentalshop',
+            name='decayed_review_weight',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='rentalshop',
+            name='rank_score',
+            field=models.FloatField(db_index=True, default=3.5),
+        ),
+        migrations.RunPython(backfill_rank_scores, migrations.RunPython.noop),
+    ]
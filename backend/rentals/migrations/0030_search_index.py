@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Create and fill the FTS5 index on SQLite; other databases use a pluggable backend."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    RentalShop = apps.get_model('rentals', 'RentalShop')
+    Vehicle = apps.get_model('rentals', 'Vehicle')
+
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index_vocab USING fts5vocab(search_index, 'row')"
+    )
+
+    # Row ids encode the document kind in the low bit: shop = 2n, vehicle = 2n + 1.
+    rows = [(shop.id * 2, shop.name or '', shop.address or '') for shop in RentalShop.objects.all()]
+    for vehicle in Vehicle.objects.prefetch_related('feature_set'):
+        title = ' '.join(filter(None, [vehicle.name, vehicle.brand, vehicle.model]))
+        body = ' '.join(f.feature_name for f in vehicle.feature_set.all())
+        rows.append((vehicle.id * 2 + 1, title, body))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany('INSERT INTO search_index (rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS search_index_vocab')
+    schema_editor.execute('DROP TABLE IF EXISTS search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0029_rentalshop_decayed_rating_sum_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0030_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalshop',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='vehicleimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:30
+
+from collections import Counter
+
+from django.db import migrations, models
+import rentals.storage
+
+REFERENCES = [
+    ('VehicleImage', 'image'),
+    ('RentalShop', 'image'),
+    ('UserProfile', 'profile_picture'),
+    ('KYCDocument', 'driving_license_photo'),
+    ('KYCDocument', 'secondary_doc_photo'),
+]
+
+
+def backfill_blob_refs(apps, schema_editor):
+    # Files uploaded before content addressing keep their names; register them
+    # too so gc_media can reclaim them once nothing points at them.
+    MediaBlob = apps.get_model('rentals', 'MediaBlob')
+    counts = Counter()
+    for model_name, field in REFERENCES:
+        model = apps.get_model('rentals', model_name)
+        names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        counts.update(names.values_list(field, flat=True).iterator())
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, ref_count=count) for name, count in counts.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0031_rentalshop_image_variants_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.IntegerField(db_index=True, default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'media_blob',
+            },
+        ),
+        migrations.AlterField(
+            model_name='kycdocument',
+            name='driving_license_photo',
+            field=models.FileField(blank=True, null=True, storage=rentals.storage.get_kyc_media_storage, upload_to='kyc/driving_license/'),
+        ),
+        migrations.AlterField(
+            model_name='kycdocument',
+            name='secondary_doc_photo',
+            field=models.FileField(blank=True, null=True, storage=rentals.storage.get_kyc_media_storage, upload_to='kyc/secondary_doc/'),
+        ),
+        migrations.AlterField(
+            model_name='rentalshop',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=rentals.storage.get_public_media_storage, upload_to='owner_img/'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=rentals.storage.get_public_media_storage, upload_to='user_img/'),
+        ),
+        migrations.AlterField(
+            model_name='vehicleimage',
+            name='image',
+            field=models.ImageField(storage=rentals.storage.get_public_media_storage, upload_to='vehicles_img/'),
+        ),
+        migrations.RunPython(backfill_blob_refs, migrations.RunPython.noop),
+    ]
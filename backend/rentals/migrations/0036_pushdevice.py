@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rentals', '0035_notificationcounter_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PushDevice',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=255, unique=True)),
+                ('provider', models.CharField(choices=[('expo', 'Expo'), ('fake', 'Fake (testing)')], default='expo', max_length=20)),
+                ('platform', models.CharField(blank=True, choices=[('ios', 'iOS'), ('android', 'Android'), ('web', 'Web')], max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='push_devices', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'push_device',
+                'indexes': [models.Index(fields=['user', 'is_active'], name='push_device_user_active')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_start_reminders(apps, schema_editor):
+    """Carry reminders already sent by the lifecycle scheduler over to the ledger."""
+    Booking = apps.get_model('rentals', 'Booking')
+    BookingReminder = apps.get_model('rentals', 'BookingReminder')
+    sent = Booking.objects.filter(start_reminder_sent_at__isnull=False).values_list('id', 'start_date', 'start_reminder_sent_at')
+    BookingReminder.objects.bulk_create(
+        [BookingReminder(booking_id=pk, kind='start_2h', due_at=start, sent_at=sent_at) for pk, start, sent_at in sent],
+        batch_size=1000, ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0037_booking_lifecycle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingReminder',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('due_at', models.DateTimeField()),
+                ('sent_at', models.DateTimeField()),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='rentals.booking')),
+            ],
+            options={
+                'db_table': 'booking_reminder',
+                'unique_together': {('booking', 'kind', 'due_at')},
+            },
+        ),
+        migrations.RunPython(copy_start_reminders, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='booking',
+            name='start_reminder_sent_at',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0038_booking_reminder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='delivery_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='delivery_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='return_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='return_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
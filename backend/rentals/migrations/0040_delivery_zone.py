@@ -0,0 +1,34 @@
+# Generated by Django 4.2.27 on 2026-10-19 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0039_booking_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryZone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_distance_km', models.FloatField()),
+                ('fee', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('polygon', models.JSONField(default=list)),
+                ('min_latitude', models.FloatField()),
+                ('max_latitude', models.FloatField()),
+                ('min_longitude', models.FloatField()),
+                ('max_longitude', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_zones', to='rentals.rentalshop')),
+            ],
+            options={
+                'db_table': 'delivery_zone',
+                'ordering': ['shop', 'max_distance_km'],
+                'unique_together': {('shop', 'max_distance_km')},
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.27 on 2026-10-19 19:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0040_delivery_zone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='adjustments',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='PromoCode',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=30, unique=True)),
+                ('percent_off', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('amount_off', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('valid_from', models.DateTimeField(blank=True, null=True)),
+                ('valid_until', models.DateTimeField(blank=True, null=True)),
+                ('max_uses', models.PositiveIntegerField(blank=True, null=True)),
+                ('used_count', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promo_codes', to='rentals.rentalshop')),
+            ],
+            options={
+                'db_table': 'promo_code',
+            },
+        ),
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('weekend', 'Weekend surge'), ('holiday', 'Holiday surge'), ('long_rental', 'Long rental discount'), ('utilization', 'Utilization surge')], max_length=20)),
+                ('percent', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('booking_type', models.CharField(blank=True, choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=10)),
+                ('dates', models.JSONField(blank=True, default=list, help_text='ISO dates, for holiday rules')),
+                ('min_duration', models.PositiveIntegerField(blank=True, help_text='Hours or days', null=True)),
+                ('min_utilization', models.FloatField(blank=True, help_text='Booked share of the fleet, 0-1', null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='rentals.rentalshop')),
+            ],
+            options={
+                'db_table': 'pricing_rule',
+                'ordering': ['shop', 'kind', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='promo_code',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='rentals.promocode'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0042_booking_hold'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chunkedupload',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'Uploading'), ('writing', 'Writing'), ('complete', 'Complete'), ('consumed', 'Consumed')], default='uploading', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0043_chunkedupload_writing'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pushdevice',
+            name='provider',
+            field=models.CharField(choices=[('expo', 'Expo')], default='expo', max_length=20),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.27 on 2026-10-19 19:51
+
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+import rentals.storage
+
+
+def move_certificates(apps, schema_editor):
+    # Certificates uploaded as multipart files were stored under the public
+    # owner_certificates/ directory; move them into the KYC store.
+    OwnerRegistrationRequest = apps.get_model('rentals', 'OwnerRegistrationRequest')
+    MediaBlob = apps.get_model('rentals', 'MediaBlob')
+    storage = rentals.storage.kyc_media_storage
+    requests = (
+        OwnerRegistrationRequest.objects.exclude(certificate_file='').exclude(certificate_file__isnull=True)
+        .exclude(certificate_file__startswith='kyc/')
+    )
+    for request in requests.iterator():
+        old_name = request.certificate_file.name
+        path = os.path.join(settings.MEDIA_ROOT, old_name)
+        if not os.path.isfile(path):
+            continue
+        new_name = storage.adopt(path, old_name)
+        OwnerRegistrationRequest.objects.filter(pk=request.pk).update(certificate_file=new_name)
+        MediaBlob.objects.filter(name=old_name).delete()
+        if not MediaBlob.objects.filter(name=new_name).update(ref_count=F('ref_count') + 1):
+            MediaBlob.objects.create(name=new_name, ref_count=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0045_cache_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ownerregistrationrequest',
+            name='certificate_file',
+            field=models.FileField(blank=True, null=True, storage=rentals.storage.get_kyc_media_storage, upload_to='owner_certificates/'),
+        ),
+        migrations.RunPython(move_certificates, migrations.RunPython.noop),
+    ]
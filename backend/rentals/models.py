@@ -1,5 +1,11 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .ranking import PRIOR_MEAN, rank_score, review_weight
+from .storage import get_kyc_media_storage, get_public_media_storage
 
 class RentalShop(models.Model):
     owner = models.ForeignKey('UserProfile', on_delete=models.CASCADE, related_name='shops', null=True, blank=True)
@@ -8,9 +14,15 @@ class RentalShop(models.Model):
     latitude = models.FloatField()
     longitude = models.FloatField()
     phone = models.CharField(max_length=20, blank=True, null=True)
-    image = models.ImageField(upload_to='owner_img/', blank=True, null=True)
+    image = models.ImageField(upload_to='owner_img/', storage=get_public_media_storage, blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True)  # Resized renditions; see rentals.media
     rating = models.FloatField(default=0.0)
+    rating_sum = models.IntegerField(default=0)  # Running total of review ratings; see Review.save
     review_count = models.IntegerField(default=0)
+    # Time-decayed review totals and the Bayesian ranking score derived from them; see rentals.ranking
+    decayed_rating_sum = models.FloatField(default=0.0)
+    decayed_review_weight = models.FloatField(default=0.0)
+    rank_score = models.FloatField(default=PRIOR_MEAN, db_index=True)
     operating_hours = models.CharField(max_length=100, blank=True, null=True)
     is_open = models.BooleanField(default=True)
 
@@ -70,7 +82,8 @@ class Vehicle(models.Model):
 
 class VehicleImage(models.Model):
     vehicle = models.ForeignKey(Vehicle, related_name='image_set', on_delete=models.CASCADE)
-    image = models.ImageField(upload_to='vehicles_img/')
+    image = models.ImageField(upload_to='vehicles_img/', storage=get_public_media_storage)
+    variants = models.JSONField(default=dict, blank=True)  # Resized renditions; see rentals.media
 
     class Meta:
         db_table = 'vehicle_image'
@@ -133,7 +146,11 @@ class Booking(models.Model):
     # Delivery details
     delivery_option = models.CharField(max_length=15, choices=DELIVERY_OPTIONS, default='self_pickup')
     delivery_address = models.TextField(blank=True, null=True)
+    delivery_latitude = models.FloatField(null=True, blank=True)
+    delivery_longitude = models.FloatField(null=True, blank=True)
     return_location = models.TextField(blank=True, null=True)
+    return_latitude = models.FloatField(null=True, blank=True)
+    return_longitude = models.FloatField(null=True, blank=True)
     
     # Payment details
     payment_method = models.CharField(max_length=10, choices=PAYMENT_METHODS)
@@ -144,13 +161,156 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Set by the lifecycle scheduler (rentals.lifecycle)
+    overdue_at = models.DateTimeField(null=True, blank=True)
+
+    # Surcharges and discounts on base_price (rentals.pricing), as
+    # [{"label", "kind", "amount"}]; total_price includes them
+    adjustments = models.JSONField(default=list, blank=True)
+    promo_code = models.ForeignKey('PromoCode', null=True, blank=True, on_delete=models.SET_NULL,
+                                   related_name='bookings')
+
     class Meta:
         db_table = 'booking'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'start_date'], name='booking_status_start'),
+            models.Index(fields=['status', 'end_date'], name='booking_status_end'),
+        ]
 
     def __str__(self):
         return f"Booking {self.id} - {self.vehicle.name} ({self.user.username})"
 
+class BookingHold(models.Model):
+    """
+    ``vehicle`` held for ``user`` over [start_date, end_date) during checkout,
+    until ``expires_at`` (see rentals.holds). Expired rows are ignored and swept
+    in bulk.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_holds')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='holds')
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'booking_hold'
+        indexes = [
+            models.Index(fields=['vehicle', 'expires_at'], name='booking_hold_vehicle_expires'),
+            models.Index(fields=['expires_at'], name='booking_hold_expires'),
+        ]
+
+    def __str__(self):
+        return f"Hold on {self.vehicle_id} for user {self.user_id} until {self.expires_at:%H:%M}"
+
+class BookingReminder(models.Model):
+    """
+    A reminder sent for a booking (see rentals.reminders). ``due_at`` is the
+    booking time the reminder was about, so rescheduling a booking re-arms it.
+    """
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='reminders')
+    kind = models.CharField(max_length=20)
+    due_at = models.DateTimeField()
+    sent_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'booking_reminder'
+        unique_together = ('booking', 'kind', 'due_at')
+
+    def __str__(self):
+        return f"{self.kind} reminder for booking #{self.booking_id}"
+
+
+class DeliveryZone(models.Model):
+    """
+    Area a shop delivers to for ``fee``, precomputed by rentals.pricing from
+    settings.DELIVERY_FEE_TIERS. ``polygon`` is a list of [lat, lng] vertices.
+    """
+    shop = models.ForeignKey(RentalShop, on_delete=models.CASCADE, related_name='delivery_zones')
+    max_distance_km = models.FloatField()
+    fee = models.DecimalField(max_digits=10, decimal_places=2)
+    polygon = models.JSONField(default=list)
+    # Bounding box of the polygon, checked before the polygon itself
+    min_latitude = models.FloatField()
+    max_latitude = models.FloatField()
+    min_longitude = models.FloatField()
+    max_longitude = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'delivery_zone'
+        unique_together = ('shop', 'max_distance_km')
+        ordering = ['shop', 'max_distance_km']
+
+    def __str__(self):
+        return f"{self.shop.name}: up to {self.max_distance_km:g} km for {self.fee}"
+
+
+class PricingRule(models.Model):
+    """
+    A surcharge or discount applied by rentals.pricing. ``percent`` is of the
+    rental price: added for weekend, holiday and utilization rules, taken off
+    for long rental rules. A rule without a shop applies to every shop.
+    """
+    KIND_CHOICES = [
+        ('weekend', 'Weekend surge'),             # Saturdays and Sundays
+        ('holiday', 'Holiday surge'),             # The dates in ``dates``
+        ('long_rental', 'Long rental discount'),  # Bookings of at least ``min_duration``
+        ('utilization', 'Utilization surge'),     # At least ``min_utilization`` of the fleet booked
+    ]
+
+    shop = models.ForeignKey(RentalShop, null=True, blank=True, on_delete=models.CASCADE,
+                             related_name='pricing_rules')
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    percent = models.DecimalField(max_digits=5, decimal_places=2)
+    # Hourly or daily bookings only; blank for both
+    booking_type = models.CharField(max_length=10, choices=Booking.BOOKING_TYPES, blank=True)
+    dates = models.JSONField(default=list, blank=True, help_text="ISO dates, for holiday rules")
+    min_duration = models.PositiveIntegerField(null=True, blank=True, help_text="Hours or days")
+    min_utilization = models.FloatField(null=True, blank=True, help_text="Booked share of the fleet, 0-1")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'pricing_rule'
+        ordering = ['shop', 'kind', 'id']
+
+    def __str__(self):
+        return f"{self.name} ({self.get_kind_display()}, {self.percent}%)"
+
+
+class PromoCode(models.Model):
+    """A code customers enter at booking for ``percent_off`` or ``amount_off`` the rental price."""
+    code = models.CharField(max_length=30, unique=True)
+    shop = models.ForeignKey(RentalShop, null=True, blank=True, on_delete=models.CASCADE,
+                             related_name='promo_codes')
+    percent_off = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    amount_off = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    valid_from = models.DateTimeField(null=True, blank=True)
+    valid_until = models.DateTimeField(null=True, blank=True)
+    max_uses = models.PositiveIntegerField(null=True, blank=True)
+    used_count = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'promo_code'
+
+    def clean(self):
+        self.code = self.code.strip().upper()
+
+    def save(self, *args, **kwargs):
+        self.clean()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.code
+
+
 class UserSettings(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='settings')
     push_notifications = models.BooleanField(default=True)
@@ -231,10 +391,10 @@ class KYCDocument(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='kyc_document')
     date_of_birth = models.DateField(null=True, blank=True)
     driving_license_number = models.CharField(max_length=50, blank=True, null=True)
-    driving_license_photo = models.FileField(upload_to='kyc/driving_license/', blank=True, null=True)
+    driving_license_photo = models.FileField(upload_to='kyc/driving_license/', storage=get_kyc_media_storage, blank=True, null=True)
     secondary_doc_type = models.CharField(max_length=20, choices=DOC_TYPES, blank=True, null=True)
     secondary_doc_number = models.CharField(max_length=50, blank=True, null=True)
-    secondary_doc_photo = models.FileField(upload_to='kyc/secondary_doc/', blank=True, null=True)
+    secondary_doc_photo = models.FileField(upload_to='kyc/secondary_doc/', storage=get_kyc_media_storage, blank=True, null=True)
     status = models.CharField(max_length=20, choices=KYC_STATUS, default='not_submitted')
     submitted_at = models.DateTimeField(auto_now_add=True)
     verified_at = models.DateTimeField(null=True, blank=True)
@@ -344,7 +504,8 @@ class UserProfile(models.Model):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='user')
     address = models.TextField(blank=True, null=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
-    profile_picture = models.ImageField(upload_to='user_img/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='user_img/', storage=get_public_media_storage, blank=True, null=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True)  # Resized renditions; see rentals.media
     shop = models.ForeignKey('RentalShop', on_delete=models.CASCADE, null=True, blank=True, related_name='staff_members')
     
     class Meta:
@@ -353,7 +514,6 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
-from django.db.models import Avg
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
@@ -421,30 +581,73 @@ class Review(models.Model):
     def __str__(self):
         return f"Review by {self.user.username} — {self.rating}★"
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self._recalculate_shop_rating()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted rating so save() can apply a delta instead of recomputing
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
 
-    def _recalculate_shop_rating(self):
-        """Recalculate shop rating and review_count from remaining reviews."""
-        shop = self.shop
-        agg = Review.objects.filter(shop=shop).aggregate(avg=Avg('rating'))
-        shop.rating = round(agg['avg'] or 0, 1)
-        shop.review_count = Review.objects.filter(shop=shop).count()
-        shop.save(update_fields=['rating', 'review_count'])
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        old_rating = getattr(self, '_loaded_rating', None)
+        from django.db import transaction
+        from .jobs import enqueue
+
+        # The shop totals are updated by the job worker; the delta job commits
+        # atomically with the review so it is applied exactly once.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if adding:
+                weight = review_weight(self.created_at)
+                enqueue('shops.apply_rating_delta', shop_id=self.shop_id, sum_delta=self.rating, count_delta=1,
+                        decayed_sum_delta=self.rating * weight, weight_delta=weight)
+            elif (update_fields is None or 'rating' in update_fields) and old_rating is not None \
+                    and old_rating != self.rating:
+                delta = self.rating - old_rating
+                enqueue('shops.apply_rating_delta', shop_id=self.shop_id, sum_delta=delta, count_delta=0,
+                        decayed_sum_delta=delta * review_weight(self.created_at))
+        # Reply-only saves (owner_reply / replied_at) leave the shop row untouched.
+        self._loaded_rating = self.rating
+
+
+def apply_shop_rating_delta(shop_id, sum_delta, count_delta, decayed_sum_delta=0.0, weight_delta=0.0):
+    """
+    Atomically shift a shop's running rating totals and refresh the denormalised
+    rating and rank_score in the same UPDATE, so concurrent reviews never race.
+    """
+    from django.db.models import F, FloatField
+    from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('review_count') + count_delta
+    new_decayed_sum = F('decayed_rating_sum') + decayed_sum_delta
+    new_weight = F('decayed_review_weight') + weight_delta
+    RentalShop.objects.filter(pk=shop_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        rating=Coalesce(Round(Cast(new_sum, FloatField()) / NullIf(new_count, 0), 1), 0.0),
+        decayed_rating_sum=new_decayed_sum,
+        decayed_review_weight=new_weight,
+        rank_score=rank_score(new_decayed_sum, new_weight),
+    )
 
 
 @receiver(post_delete, sender=Review)
 def recalculate_shop_rating_on_review_delete(sender, instance, **kwargs):
     """
-    When a review is deleted, update the shop's rating and review_count in rental_shop table.
-    The deleted review is already removed from DB, so remaining reviews are used for calculation.
+    When a review is deleted, queue subtracting its rating from the shop's
+    running totals instead of re-aggregating every remaining review.
     """
-    shop = instance.shop
-    agg = Review.objects.filter(shop=shop).aggregate(avg=Avg('rating'))
-    shop.rating = round(agg['avg'] or 0, 1)
-    shop.review_count = Review.objects.filter(shop=shop).count()
-    shop.save(update_fields=['rating', 'review_count'])
+    from .jobs import enqueue
+
+    rating = getattr(instance, '_loaded_rating', None) or instance.rating
+    weight = review_weight(instance.created_at)
+    # Runs inside the delete's transaction, so the job is queued only if the delete commits.
+    enqueue('shops.apply_rating_delta', shop_id=instance.shop_id, sum_delta=-rating, count_delta=-1,
+            decayed_sum_delta=-rating * weight, weight_delta=-weight)
 
 
 class Complaint(models.Model):
@@ -517,10 +720,51 @@ class Notification(models.Model):
         db_table = 'notification'
         app_label = 'rentals'
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', 'is_read'], name='notification_user_is_read')]
         
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
+
+class PushDevice(models.Model):
+    """A device that receives push notifications for a user (see rentals.push)."""
+    # Providers configured only for development (the DEBUG 'fake' one) are not listed.
+    PROVIDER_CHOICES = [
+        ('expo', 'Expo'),
+    ]
+    PLATFORM_CHOICES = [
+        ('ios', 'iOS'),
+        ('android', 'Android'),
+        ('web', 'Web'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='push_devices')
+    token = models.CharField(max_length=255, unique=True)
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES, default='expo')
+    platform = models.CharField(max_length=10, choices=PLATFORM_CHOICES, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'push_device'
+        indexes = [models.Index(fields=['user', 'is_active'], name='push_device_user_active')]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.provider} ({self.platform or 'unknown'})"
+
+
+class NotificationCounter(models.Model):
+    """A user's number of unread notifications, maintained by rentals.inbox."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'notification_counter'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
 class OwnerRegistrationRequest(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -534,7 +778,8 @@ class OwnerRegistrationRequest(models.Model):
     phone = models.CharField(max_length=20)
     password_hash = models.CharField(max_length=128) # Store hashed password
     certificate_id = models.CharField(max_length=100, blank=True, null=True)
-    certificate_file = models.FileField(upload_to='owner_certificates/', blank=True, null=True)
+    # Kept with the KYC documents: only admins may download it (see rentals.serving)
+    certificate_file = models.FileField(upload_to='owner_certificates/', storage=get_kyc_media_storage, blank=True, null=True)
     is_approved = models.BooleanField(default=False)
     is_rejected = models.BooleanField(default=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -547,3 +792,99 @@ class OwnerRegistrationRequest(models.Model):
     def __str__(self):
         return f"{self.shop_name} - {self.owner_name} ({self.status})"
 
+
+class MediaBlob(models.Model):
+    """
+    A stored media file and how many rows reference it. Maintained by the hooks
+    in rentals.media; blobs whose count drops to zero are removed by gc_media.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.IntegerField(default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'media_blob'
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class CacheVersion(models.Model):
+    """
+    Version number of an in-process cache (e.g. rentals.pricing's zone index),
+    bumped to make every process drop its copy.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'cache_version'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A file uploaded in pieces through /api/uploads/ (see rentals.uploads). Chunks
+    are appended to a staging file; once complete it is moved into storage and
+    forms reference it by ``id`` instead of sending the file inline.
+    """
+    PURPOSE_CHOICES = [
+        ('kyc', 'KYC Document'),
+        ('owner_certificate', 'Owner Certificate'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('writing', 'Writing'),  # A request is splicing a chunk in
+        ('complete', 'Complete'),
+        ('consumed', 'Consumed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='chunked_uploads')
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)  # Bytes received so far
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    file_name = models.CharField(max_length=255, blank=True)  # Storage name once complete
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'chunked_upload'
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size}, {self.status})"
+
+
+class Job(models.Model):
+    """
+    A unit of background work, written in the same transaction as the request's
+    primary write (transactional outbox) and executed by ``manage.py run_jobs``.
+    See rentals.jobs.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'job_queue'
+        indexes = [models.Index(fields=['status', 'run_at'], name='job_queue_status_run_at')]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,237 @@
+"""
+Notification fan-out.
+
+An event (booking status change, new chat message, staff task assignment, KYC
+decision, promotion…) is expanded into one delivery per recipient and handed
+to every configured channel:
+
+    queue_notification('kyc_decision', 'KYC Approved', '…', user_ids=[user.id])
+    queue_notification('promo', 'Weekend offer', '…', audience='customers')
+
+Schedulers that send a different text to each recipient (reminders, overdue
+alerts) use ``queue_notifications(event, items)`` instead, one job per batch.
+
+Fan-out runs in the job worker (``notifications.fan_out``). Recipients are read
+in one query that also resolves their ``UserSettings`` (users without a
+settings row get the model defaults), so opted-out users are filtered in SQL;
+deliveries are then passed to channels in batches of ``BATCH_SIZE``, which the
+inbox channel writes with ``bulk_create``.
+
+Channels are listed in ``settings.NOTIFICATION_CHANNELS`` (dotted paths to
+``NotificationChannel`` subclasses). ``FakeChannel`` records deliveries in
+memory for tests.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .jobs import enqueue, job
+from .models import Booking, Notification, UserSettings
+
+BATCH_SIZE = 500
+
+# event → (Notification.type, UserSettings flag the recipient must have on, or None)
+EVENT_TYPES = {
+    'booking_status': ('booking', 'booking_updates'),
+    'booking_overdue': ('booking', None),
+    'payment': ('payment', 'payment_alerts'),
+    'reminder': ('alert', 'reminders'),
+    'promo': ('promo', 'promotions'),
+    'new_message': ('alert', None),
+    'task_assigned': ('alert', None),
+    'kyc_decision': ('alert', None),
+    'system': ('system', None),
+}
+
+# Named groups of recipients for broadcasts
+AUDIENCES = {
+    'all': {},
+    'customers': {'user_profile__role': 'user'},
+    'owners': {'user_profile__role': 'owner'},
+    'staff': {'user_profile__role': 'staff'},
+}
+
+DEFAULT_CHANNELS = ['rentals.notifications.InboxChannel']
+
+Delivery = namedtuple('Delivery', 'user_id event type title message data')
+
+
+class NotificationChannel:
+    """A way of delivering notifications. Subclasses implement ``deliver``."""
+
+    # UserSettings flag a recipient must have on to receive this channel (None: everyone)
+    preference = None
+
+    def deliver(self, deliveries):
+        raise NotImplementedError
+
+
+class InboxChannel(NotificationChannel):
+    """The in-app notification list (``Notification`` rows)."""
+
+    def deliver(self, deliveries):
+        from .inbox import notifications_delivered
+
+        with transaction.atomic():
+            Notification.objects.bulk_create(
+                [Notification(user_id=d.user_id, title=d.title, message=d.message, type=d.type, is_read=False)
+                 for d in deliveries],
+                batch_size=BATCH_SIZE,
+            )
+            notifications_delivered([d.user_id for d in deliveries])
+
+
+class FakeChannel(NotificationChannel):
+    """Collects deliveries in ``FakeChannel.outbox`` instead of sending them."""
+
+    outbox = []
+
+    def deliver(self, deliveries):
+        FakeChannel.outbox.extend(deliveries)
+
+
+def get_channels():
+    return [import_string(path)() for path in getattr(settings, 'NOTIFICATION_CHANNELS', DEFAULT_CHANNELS)]
+
+
+def _preference_default(flag):
+    return UserSettings._meta.get_field(flag).default
+
+
+def recipients(event, user_ids=None, audience=None, flags=()):
+    """
+    ``(user_id, {flag: bool})`` for every active recipient of ``event`` who has not
+    opted out, resolving UserSettings (or their defaults) in the same query.
+    """
+    _type, setting = EVENT_TYPES[event]
+    users = User.objects.filter(is_active=True)
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+    else:
+        users = users.filter(**AUDIENCES[audience])
+
+    wanted = sorted(set(flags) | ({setting} if setting else set()))
+    users = users.annotate(**{
+        f'pref_{flag}': Coalesce(f'settings__{flag}', Value(_preference_default(flag)), output_field=BooleanField())
+        for flag in wanted
+    })
+    if setting:
+        users = users.filter(**{f'pref_{setting}': True})
+
+    for row in users.order_by('id').values_list('id', *[f'pref_{flag}' for flag in wanted]).iterator(chunk_size=BATCH_SIZE):
+        yield row[0], dict(zip(wanted, row[1:]))
+
+
+def notify(event, title, message, user_ids=None, audience=None, data=None):
+    """Deliver ``event`` to its recipients through every channel; returns the number of recipients."""
+    if (user_ids is None) == (audience is None):
+        raise ValueError("Pass exactly one of user_ids or audience")
+    notification_type = EVENT_TYPES[event][0]
+    channels = get_channels()
+    pending = {channel: [] for channel in channels}
+    flags = {channel.preference for channel in channels if channel.preference}
+
+    count = 0
+    for user_id, prefs in recipients(event, user_ids, audience, flags):
+        delivery = Delivery(user_id, event, notification_type, title, message, data or {})
+        for channel, batch in pending.items():
+            if channel.preference and not prefs[channel.preference]:
+                continue
+            batch.append(delivery)
+            if len(batch) >= BATCH_SIZE:
+                channel.deliver(batch)
+                pending[channel] = batch = []
+        count += 1
+
+    for channel, batch in pending.items():
+        if batch:
+            channel.deliver(batch)
+    return count
+
+
+def notify_each(event, items):
+    """
+    Deliver a different message to each recipient: ``items`` are ``(user_id,
+    title, message, data)``. Preferences are resolved for all of them in one
+    query. Returns the number of deliveries made.
+    """
+    notification_type = EVENT_TYPES[event][0]
+    channels = get_channels()
+    flags = {channel.preference for channel in channels if channel.preference}
+    by_user = {}
+    for user_id, title, message, data in items:
+        by_user.setdefault(user_id, []).append(Delivery(user_id, event, notification_type, title, message, data or {}))
+
+    pending = {channel: [] for channel in channels}
+    count = 0
+    for user_id, prefs in recipients(event, list(by_user), flags=flags):
+        for channel, batch in pending.items():
+            if not channel.preference or prefs[channel.preference]:
+                batch.extend(by_user[user_id])
+        count += len(by_user[user_id])
+
+    for channel, batch in pending.items():
+        for start in range(0, len(batch), BATCH_SIZE):
+            channel.deliver(batch[start:start + BATCH_SIZE])
+    return count
+
+
+@job('notifications.fan_out')
+def fan_out(event, title, message, user_ids=None, audience=None, data=None):
+    notify(event, title, message, user_ids=user_ids, audience=audience, data=data)
+
+
+@job('notifications.deliver_each')
+def deliver_each(event, items):
+    notify_each(event, items)
+
+
+def queue_notification(event, title, message, user_ids=None, audience=None, data=None):
+    """Queue a fan-out with the current transaction (see rentals.jobs)."""
+    if event not in EVENT_TYPES:
+        raise ValueError(f"Unknown notification event {event!r}")
+    return enqueue('notifications.fan_out', event=event, title=title, message=message,
+                   user_ids=list(user_ids) if user_ids is not None else None, audience=audience, data=data)
+
+
+def queue_notifications(event, items):
+    """Queue per-recipient messages (see ``notify_each``) as a single job."""
+    if event not in EVENT_TYPES:
+        raise ValueError(f"Unknown notification event {event!r}")
+    items = [list(item) for item in items]
+    return enqueue('notifications.deliver_each', event=event, items=items) if items else None
+
+
+# ── Booking status events ─────────────────────────────────────────────────────
+
+BOOKING_STATUS_MESSAGES = {
+    'upcoming': ('Booking Confirmed', 'Your booking for {vehicle} has been confirmed'),
+    'active': ('Rental Started', 'Your rental of {vehicle} is now active'),
+    'pickup_requested': ('Pickup Requested', 'We have received your return request for {vehicle}'),
+    'completed': ('Booking Completed', 'Your rental of {vehicle} is complete. Thank you!'),
+    'cancelled': ('Booking Cancelled', 'Your booking for {vehicle} has been cancelled'),
+}
+
+
+@receiver(post_init, sender=Booking)
+def remember_booking_status(sender, instance, **kwargs):
+    instance._notified_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Booking)
+def notify_booking_status(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    previous = None if created else instance._notified_status
+    if instance.status != previous and instance.status in BOOKING_STATUS_MESSAGES:
+        title, template = BOOKING_STATUS_MESSAGES[instance.status]
+        queue_notification('booking_status', title, template.format(vehicle=instance.vehicle.name),
+                           user_ids=[instance.user_id], data={'booking_id': instance.id})
+    instance._notified_status = instance.status
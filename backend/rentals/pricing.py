@@ -0,0 +1,597 @@
+"""
+Booking pricing: delivery fees and the rental price.
+
+A home delivery costs the fee of the innermost delivery zone of the shop that
+contains the delivery point; points outside every zone are not delivered to.
+The zones follow ``settings.DELIVERY_FEE_TIERS`` ((up to km, fee), ...) and are
+precomputed per shop as polygons (``DeliveryZone``) by ``build_zones``. With a
+road graph (rentals.routing) a zone reaches, in each of ZONE_SECTORS bearings,
+the farthest point that is within the tier's distance by road; without one it
+is a circle of that radius. Zones are rebuilt in the background when a shop
+is created or moved, and by ``manage.py build_delivery_zones`` after the tiers
+or the road graph change.
+
+``ZoneIndex`` keeps each shop's polygons in memory with their bounding boxes,
+so a quote is a bounding-box check plus a ray-casting test over a few dozen
+vertices per zone, with no query. A shop's zones are loaded on first use and
+dropped for every process when any zone changes, through a version number in
+the database (``CacheVersion``) that each process checks at most every
+VERSION_CHECK_INTERVAL seconds. Shops without zones are not cached, so zones
+built later are picked up at once.
+
+The delivery point comes from coordinates, a ``SavedLocation`` or, for a bare
+address, the geocoder in ``settings.GEOCODER``. When it cannot be located the
+flat ``settings.DELIVERY_FEE_DEFAULT`` applies.
+
+The rental price is the vehicle's hourly or daily rate times the duration,
+adjusted by the shop's ``PricingRule``s in this order:
+
+1. weekend and holiday surges, per hour or day of the rental that falls on
+   such a day (the highest one when several apply);
+2. a utilization surge, from the share of the shop's fleet booked over the
+   rental window (cached for UTILIZATION_CACHE_TIMEOUT);
+3. the long rental discount with the highest ``min_duration`` reached;
+4. a ``PromoCode``.
+
+The booking adds the delivery fee and ``settings.BOOKING_SERVICE_FEE``. Each
+shop's rules are compiled into a ``RuleSet`` kept in memory like the zones
+and dropped when a rule is edited. ``RentalPricer`` does the per-window work
+once, so pricing several vehicles of a shop for the same window is cheap;
+``price_vehicles`` prices a whole fleet that way.
+"""
+import hashlib
+import json
+import logging
+import math
+import time
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .jobs import enqueue, job
+from .models import (
+    Booking, CacheVersion, DeliveryZone, PricingRule, PromoCode, RentalShop, SavedLocation, Vehicle,
+)
+from .routing import EARTH_RADIUS_M, get_graph, haversine_m
+
+logger = logging.getLogger(__name__)
+
+ZONE_SECTORS = 72
+ZONES_VERSION_KEY = 'pricing:zones-version'
+RULES_VERSION_KEY = 'pricing:rules-version'
+VERSION_CHECK_INTERVAL = 1.0  # seconds
+GEOCODE_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+UTILIZATION_CACHE_TIMEOUT = 60
+WEEKEND_DAYS = (5, 6)
+CENT = Decimal('0.01')
+
+DeliveryQuote = namedtuple('DeliveryQuote', 'fee deliverable zone_km distance_km located')
+Adjustment = namedtuple('Adjustment', 'label kind amount')
+PriceBreakdown = namedtuple(
+    'PriceBreakdown', 'base_price adjustments delivery_fee service_fee total_price promo_code',
+)
+
+
+class PricingError(Exception):
+    pass
+
+
+def fee_tiers():
+    return sorted((float(km), Decimal(str(fee))) for km, fee in settings.DELIVERY_FEE_TIERS)
+
+
+def default_fee():
+    return Decimal(str(getattr(settings, 'DELIVERY_FEE_DEFAULT', 0)))
+
+
+def money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def service_fee():
+    return money(Decimal(str(getattr(settings, 'BOOKING_SERVICE_FEE', 0))))
+
+
+# ── Zone polygons ─────────────────────────────────────────────────────────────
+
+def _destination(lat, lng, bearings, metres):
+    """Points ``metres`` away from (lat, lng) along ``bearings`` (radians), as [lat, lng] lists."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    angular = np.asarray(metres, dtype=float) / EARTH_RADIUS_M
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(angular) + np.cos(lat1) * np.sin(angular) * np.cos(bearings))
+    lng2 = lng1 + np.arctan2(np.sin(bearings) * np.sin(angular) * np.cos(lat1),
+                             np.cos(angular) - np.sin(lat1) * np.sin(lat2))
+    return [[round(a, 6), round(b, 6)] for a, b in zip(np.degrees(lat2).tolist(), np.degrees(lng2).tolist())]
+
+
+def _sector_bearings():
+    return (np.arange(ZONE_SECTORS) + 0.5) * (2 * math.pi / ZONE_SECTORS)
+
+
+def circle_polygon(lat, lng, km):
+    return _destination(lat, lng, _sector_bearings(), np.full(ZONE_SECTORS, km * 1000))
+
+
+def _reach(shop, graph, max_km):
+    """(straight-line metres, bearing, road metres) of the graph nodes within ``max_km`` by road."""
+    source = graph.nearest_node(shop.latitude, shop.longitude)
+    if source is None:
+        return None
+    reached = graph.within(source, max_km * 1000)
+    nodes = np.fromiter(reached.keys(), dtype=np.int64, count=len(reached))
+    road = np.fromiter(reached.values(), dtype=float, count=len(reached))
+    # Getting from the shop onto the road counts towards the distance
+    road += haversine_m(shop.latitude, shop.longitude, graph.lat[source], graph.lng[source])
+    lat1, lng1 = math.radians(shop.latitude), math.radians(shop.longitude)
+    lat2, lng2 = np.radians(graph.lat_array[nodes]), np.radians(graph.lng_array[nodes])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    straight = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    bearing = np.arctan2(np.sin(lng2 - lng1) * np.cos(lat2),
+                         math.cos(lat1) * np.sin(lat2) - math.sin(lat1) * np.cos(lat2) * np.cos(lng2 - lng1))
+    return straight, np.mod(bearing, 2 * math.pi), road
+
+
+def road_polygon(shop, reach, km):
+    straight, bearing, road = reach
+    inside = road <= km * 1000
+    radius = np.zeros(ZONE_SECTORS)
+    sectors = (bearing[inside] / (2 * math.pi / ZONE_SECTORS)).astype(int) % ZONE_SECTORS
+    np.maximum.at(radius, sectors, straight[inside])
+    return _destination(shop.latitude, shop.longitude, _sector_bearings(), radius)
+
+
+def build_zones(shop, graph=None):
+    """Recompute ``shop``'s delivery zones; returns them."""
+    tiers = fee_tiers()
+    graph = graph or get_graph()
+    reach = _reach(shop, graph, tiers[-1][0]) if graph is not None and tiers else None
+    zones = []
+    for km, fee in tiers:
+        if reach is not None:
+            polygon = road_polygon(shop, reach, km)
+        else:
+            polygon = circle_polygon(shop.latitude, shop.longitude, km)
+        lats, lngs = [p[0] for p in polygon], [p[1] for p in polygon]
+        zones.append(DeliveryZone(
+            shop=shop, max_distance_km=km, fee=fee, polygon=polygon,
+            min_latitude=min(lats), max_latitude=max(lats), min_longitude=min(lngs), max_longitude=max(lngs),
+        ))
+    with transaction.atomic():
+        DeliveryZone.objects.filter(shop=shop).delete()
+        DeliveryZone.objects.bulk_create(zones)
+        transaction.on_commit(invalidate_zones)
+    return zones
+
+
+@job('pricing.build_zones', atomic=False)
+def build_zones_job(shop_id):
+    shop = RentalShop.objects.filter(pk=shop_id).first()
+    if shop is not None:
+        build_zones(shop)
+
+
+# ── Zone index ────────────────────────────────────────────────────────────────
+
+def point_in_polygon(lat, lng, polygon):
+    """Ray casting over the polygon's [lat, lng] vertices."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lng_i > lng) != (lng_j > lng) and lat < (lat_j - lat_i) * (lng - lng_i) / (lng_j - lng_i) + lat_i:
+            inside = not inside
+        j = i
+    return inside
+
+
+class ShopCache:
+    """
+    Per-shop values built by ``load`` and kept in process memory. ``invalidate``
+    bumps the ``version_key`` row of ``CacheVersion``, which drops them in every
+    process. The version is kept in the database, not the Django cache: without
+    a shared cache backend that is per process and the web workers would never
+    see a bump made by the job worker.
+    """
+    version_key = None
+    # Whether an empty ``load`` result is kept, or loaded again on the next get
+    cache_empty = True
+
+    def __init__(self):
+        self._shops = {}
+        self._version = None
+        self._checked_at = -math.inf
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        version = CacheVersion.objects.filter(name=self.version_key).values_list('version', flat=True).first()
+        self._checked_at = now
+        if version != self._version:
+            self._shops, self._version = {}, version
+
+    def get(self, shop_id):
+        self._check_version()
+        value = self._shops.get(shop_id)
+        if value is None:
+            value = self.load(shop_id)
+            if value or self.cache_empty:
+                self._shops[shop_id] = value
+        return value
+
+    def load(self, shop_id):
+        raise NotImplementedError
+
+    def invalidate(self):
+        if not CacheVersion.objects.filter(name=self.version_key).update(version=F('version') + 1):
+            try:
+                with transaction.atomic():
+                    CacheVersion.objects.create(name=self.version_key, version=1)
+            except IntegrityError:
+                # Created concurrently; bump that row instead.
+                CacheVersion.objects.filter(name=self.version_key).update(version=F('version') + 1)
+        # This process sees the change at once, without waiting for the next check.
+        self._shops, self._checked_at = {}, -math.inf
+
+
+class ZoneIndex(ShopCache):
+    version_key = ZONES_VERSION_KEY
+    cache_empty = False
+
+    def load(self, shop_id):
+        return [
+            (zone.max_distance_km, zone.fee,
+             (zone.min_latitude, zone.max_latitude, zone.min_longitude, zone.max_longitude),
+             [tuple(vertex) for vertex in zone.polygon])
+            for zone in DeliveryZone.objects.filter(shop_id=shop_id).order_by('max_distance_km')
+        ]
+
+    def zones(self, shop_id):
+        """``shop_id``'s zones, innermost first, as (km, fee, bbox, polygon) tuples."""
+        return self.get(shop_id)
+
+    def locate(self, shop_id, lat, lng):
+        """(km, fee) of the innermost zone containing the point; None outside; False if the shop has no zones."""
+        zones = self.zones(shop_id)
+        if not zones:
+            return False
+        for km, fee, (min_lat, max_lat, min_lng, max_lng), polygon in zones:
+            if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng and point_in_polygon(lat, lng, polygon):
+                return km, fee
+        return None
+
+
+zone_index = ZoneIndex()
+
+
+def invalidate_zones():
+    zone_index.invalidate()
+
+
+# ── Quotes ────────────────────────────────────────────────────────────────────
+
+def delivery_quote(shop, point):
+    """What a home delivery from ``shop`` to ``point`` ((lat, lng) or None if unknown) costs."""
+    if point is None:
+        return DeliveryQuote(default_fee(), True, None, None, False)
+    lat, lng = point
+    distance_km = round(haversine_m(shop.latitude, shop.longitude, lat, lng) / 1000, 2)
+    zone = zone_index.locate(shop.id, lat, lng)
+    if zone is False:
+        # Zones not built yet: the tiers as circles
+        zone = next(((km, fee) for km, fee in fee_tiers() if distance_km <= km), None)
+    if zone is None:
+        return DeliveryQuote(None, False, None, distance_km, True)
+    return DeliveryQuote(zone[1], True, zone[0], distance_km, True)
+
+
+# ── Rental pricing ────────────────────────────────────────────────────────────
+
+def rental_end(start_date, booking_type, duration):
+    return start_date + (timedelta(hours=duration) if booking_type == 'hour' else timedelta(days=duration))
+
+
+class RuleSet:
+    """A shop's active pricing rules, compiled per booking type."""
+
+    def __init__(self, rules):
+        types = [booking_type for booking_type, _ in Booking.BOOKING_TYPES]
+        self.weekdays = {t: [None] * 7 for t in types}  # weekday → (percent, name)
+        self.holidays = {t: {} for t in types}  # date → (percent, name)
+        self.utilization = {t: [] for t in types}  # (min utilization, percent, name), highest first
+        self.long_rental = {t: [] for t in types}  # (min duration, percent, name), longest first
+        for rule in rules:
+            for t in ([rule.booking_type] if rule.booking_type else types):
+                entry = (rule.percent, rule.name)
+                if rule.kind == 'weekend':
+                    for day in WEEKEND_DAYS:
+                        self.weekdays[t][day] = max(self.weekdays[t][day] or entry, entry)
+                elif rule.kind == 'holiday':
+                    for value in rule.dates:
+                        try:
+                            day = date.fromisoformat(value)
+                        except (TypeError, ValueError):
+                            continue
+                        self.holidays[t][day] = max(self.holidays[t].get(day, entry), entry)
+                elif rule.kind == 'utilization' and rule.min_utilization is not None:
+                    self.utilization[t].append((rule.min_utilization, rule.percent, rule.name))
+                elif rule.kind == 'long_rental' and rule.min_duration:
+                    self.long_rental[t].append((rule.min_duration, rule.percent, rule.name))
+        for t in types:
+            self.utilization[t].sort(reverse=True)
+            self.long_rental[t].sort(reverse=True)
+
+    def calendar(self, booking_type, start_date, duration):
+        """{rule name: (kind, summed percent)} over the rental's hours or days on surge days."""
+        weekdays, holidays = self.weekdays[booking_type], self.holidays[booking_type]
+        if not holidays and not any(weekdays):
+            return {}
+        start = timezone.localtime(start_date)
+        surges = {}
+        for unit in range(duration):
+            if booking_type == 'hour':
+                day = timezone.localtime(start + timedelta(hours=unit)).date()
+            else:
+                day = start.date() + timedelta(days=unit)
+            holiday, weekend = holidays.get(day), weekdays[day.weekday()]
+            if holiday is None and weekend is None:
+                continue
+            kind, (percent, name) = max(
+                (item for item in (('holiday', holiday), ('weekend', weekend)) if item[1] is not None),
+                key=lambda item: item[1],
+            )
+            surges[name] = (kind, surges.get(name, (kind, 0))[1] + percent)
+        return surges
+
+    def utilization_rule(self, booking_type, utilization):
+        return next((rule for rule in self.utilization[booking_type] if utilization >= rule[0]), None)
+
+    def long_rental_rule(self, booking_type, duration):
+        return next((rule for rule in self.long_rental[booking_type] if duration >= rule[0]), None)
+
+
+class RuleCache(ShopCache):
+    version_key = RULES_VERSION_KEY
+
+    def load(self, shop_id):
+        return RuleSet(PricingRule.objects.filter(Q(shop_id=shop_id) | Q(shop__isnull=True), is_active=True))
+
+
+rule_sets = RuleCache()
+
+
+def shop_utilization(shop_id, start_date, end_date):
+    """Share of ``shop_id``'s vehicles booked at some point between the two dates."""
+    key = f'pricing:utilization:{shop_id}:{start_date:%Y%m%d%H%M}:{end_date:%Y%m%d%H%M}'
+    utilization = cache.get(key)
+    if utilization is None:
+        counts = Vehicle.objects.filter(shop_id=shop_id).aggregate(
+            total=Count('id', distinct=True),
+            booked=Count('id', distinct=True, filter=Q(
+                bookings__status__in=('active', 'upcoming'),
+                bookings__start_date__lt=end_date, bookings__end_date__gt=start_date,
+            )),
+        )
+        utilization = counts['booked'] / counts['total'] if counts['total'] else 0.0
+        cache.set(key, utilization, UTILIZATION_CACHE_TIMEOUT)
+    return utilization
+
+
+def find_promo(code, shop, now=None):
+    """The usable PromoCode ``code`` for a booking at ``shop``; raises PricingError otherwise."""
+    now = now or timezone.now()
+    promo = PromoCode.objects.filter(code=(code or '').strip().upper(), is_active=True).first()
+    if (promo is None or (promo.shop_id and promo.shop_id != shop.id)
+            or (promo.valid_from and now < promo.valid_from)
+            or (promo.valid_until and now > promo.valid_until)):
+        raise PricingError("This promo code is not valid")
+    if promo.max_uses is not None and promo.used_count >= promo.max_uses:
+        raise PricingError("This promo code has been used up")
+    return promo
+
+
+def redeem_promo(promo):
+    """Count a use of ``promo``; False if it was used up in the meantime."""
+    return bool(
+        PromoCode.objects.filter(pk=promo.pk)
+        .filter(Q(max_uses__isnull=True) | Q(used_count__lt=F('max_uses')))
+        .update(used_count=F('used_count') + 1)
+    )
+
+
+def release_promo(promo_id):
+    PromoCode.objects.filter(pk=promo_id, used_count__gt=0).update(used_count=F('used_count') - 1)
+
+
+class RentalPricer:
+    """
+    Prices rentals of ``shop_id``'s vehicles for one window. ``promo`` is a
+    PromoCode checked with ``find_promo``.
+    """
+
+    def __init__(self, shop_id, booking_type, start_date, duration, promo=None):
+        self.booking_type, self.duration, self.promo = booking_type, duration, promo
+        rules = rule_sets.get(shop_id)
+        self.calendar = rules.calendar(booking_type, start_date, duration)
+        self.long_rental = rules.long_rental_rule(booking_type, duration)
+        self.utilization = None
+        if rules.utilization[booking_type]:
+            utilization = shop_utilization(shop_id, start_date, rental_end(start_date, booking_type, duration))
+            self.utilization = rules.utilization_rule(booking_type, utilization)
+
+    def price(self, vehicle, delivery_fee=0):
+        rate = vehicle.price_per_hour if self.booking_type == 'hour' else vehicle.price_per_day
+        base = money(rate * self.duration)
+        adjustments = [
+            Adjustment(name, kind, money(rate * percent / 100)) for name, (kind, percent) in self.calendar.items()
+        ]
+        if self.utilization is not None:
+            _, percent, name = self.utilization
+            adjustments.append(Adjustment(name, 'utilization', money(base * percent / 100)))
+        rental = base + sum(adjustment.amount for adjustment in adjustments)
+        if self.long_rental is not None:
+            _, percent, name = self.long_rental
+            discount = min(money(rental * percent / 100), rental)
+            adjustments.append(Adjustment(name, 'long_rental', -discount))
+            rental -= discount
+        if self.promo is not None:
+            if self.promo.percent_off is not None:
+                discount = money(rental * self.promo.percent_off / 100)
+            else:
+                discount = money(self.promo.amount_off or 0)
+            discount = min(discount, rental)
+            adjustments.append(Adjustment(self.promo.code, 'promo', -discount))
+            rental -= discount
+        delivery_fee, fee = money(Decimal(str(delivery_fee))), service_fee()
+        return PriceBreakdown(base, adjustments, delivery_fee, fee, rental + delivery_fee + fee, self.promo)
+
+
+def price_rental(vehicle, booking_type, start_date, duration, delivery_fee=0, promo=None):
+    """PriceBreakdown of one booking of ``vehicle``."""
+    return RentalPricer(vehicle.shop_id, booking_type, start_date, duration, promo).price(vehicle, delivery_fee)
+
+
+def price_vehicles(vehicles, booking_type, start_date, duration, home_delivery=False, point=None, promo_code=None):
+    """
+    Price one window for many ``vehicles`` (with their shops loaded), with one
+    RentalPricer and delivery quote per shop. Returns ({vehicle id:
+    (PriceBreakdown, deliverable)}, promo error message or None); a promo code
+    that is not valid at a shop is left out of that shop's prices.
+    """
+    shops = {}
+    promo_error = None
+    for vehicle in vehicles:
+        if vehicle.shop_id in shops:
+            continue
+        promo = None
+        if promo_code:
+            try:
+                promo = find_promo(promo_code, vehicle.shop)
+            except PricingError as e:
+                promo_error = str(e)
+        quote = delivery_quote(vehicle.shop, point) if home_delivery else None
+        shops[vehicle.shop_id] = (RentalPricer(vehicle.shop_id, booking_type, start_date, duration, promo), quote)
+
+    prices = {}
+    for vehicle in vehicles:
+        pricer, quote = shops[vehicle.shop_id]
+        deliverable = quote is None or quote.deliverable
+        fee = quote.fee if quote is not None and quote.deliverable else 0
+        prices[vehicle.id] = (pricer.price(vehicle, fee), deliverable)
+    return prices, promo_error
+
+
+def adjustments_data(adjustments):
+    return [{'label': label, 'kind': kind, 'amount': str(amount)} for label, kind, amount in adjustments]
+
+
+def breakdown_data(breakdown):
+    return {
+        'base_price': str(breakdown.base_price),
+        'adjustments': adjustments_data(breakdown.adjustments),
+        'delivery_fee': str(breakdown.delivery_fee),
+        'service_fee': str(breakdown.service_fee),
+        'total_price': str(breakdown.total_price),
+        'promo_code': breakdown.promo_code.code if breakdown.promo_code else None,
+    }
+
+
+# ── Locating addresses ────────────────────────────────────────────────────────
+
+class Geocoder:
+    def geocode(self, address):
+        """(lat, lng) of ``address``, or None."""
+        raise NotImplementedError
+
+
+class NominatimGeocoder(Geocoder):
+    """OpenStreetMap Nominatim; point ``url`` at a self-hosted instance for production volumes."""
+    url = 'https://nominatim.openstreetmap.org/search'
+    user_agent = 'vehicle-rental-service'
+    timeout = 5
+
+    def geocode(self, address):
+        query = urllib.parse.urlencode({'q': address, 'format': 'json', 'limit': 1})
+        request = urllib.request.Request(f'{self.url}?{query}', headers={'User-Agent': self.user_agent})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                results = json.loads(response.read())
+        except (OSError, ValueError):
+            logger.warning("Geocoding failed for %r", address, exc_info=True)
+            return None
+        if not results:
+            return None
+        return float(results[0]['lat']), float(results[0]['lon'])
+
+
+def geocode(address):
+    """Locate ``address`` with settings.GEOCODER, caching results; None if unknown or disabled."""
+    path = getattr(settings, 'GEOCODER', None)
+    address = (address or '').strip()
+    if not path or not address:
+        return None
+    # Hashed: addresses hold spaces and can be long, neither of which memcached keys allow
+    key = f"geocode:{hashlib.sha1(' '.join(address.lower().split()).encode()).hexdigest()}"
+    cached = cache.get(key)
+    if cached is not None:
+        return tuple(cached) if cached else None
+    point = import_string(path)().geocode(address)
+    cache.set(key, list(point) if point else [], GEOCODE_CACHE_TIMEOUT)
+    return point
+
+
+def delivery_location(user, address=None, latitude=None, longitude=None, saved_location_id=None):
+    """
+    Resolve a delivery location to (address, (lat, lng) or None). Raises
+    SavedLocation.DoesNotExist for a saved location that is not ``user``'s.
+    Addresses are only geocoded for signed-in users (``user`` not None), so
+    anonymous requests cannot run the geocoder on our behalf.
+    """
+    if saved_location_id:
+        location = SavedLocation.objects.get(pk=saved_location_id, user=user)
+        address = address or location.address
+        if location.latitude is not None and location.longitude is not None:
+            return address, (location.latitude, location.longitude)
+    if latitude is not None and longitude is not None:
+        return address, (latitude, longitude)
+    return address, geocode(address) if user is not None else None
+
+
+# ── Signals ───────────────────────────────────────────────────────────────────
+
+@receiver(post_init, sender=RentalShop)
+def remember_shop_position(sender, instance, **kwargs):
+    instance._zone_position = (instance.__dict__.get('latitude'), instance.__dict__.get('longitude'))
+
+
+@receiver(post_save, sender=RentalShop)
+def rebuild_moved_shop_zones(sender, instance, created, **kwargs):
+    position = (instance.latitude, instance.longitude)
+    if created or position != instance._zone_position:
+        enqueue('pricing.build_zones', shop_id=instance.pk)
+        instance._zone_position = position
+
+
+@receiver(post_save, sender=DeliveryZone)
+@receiver(post_delete, sender=DeliveryZone)
+def zone_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_zones)
+
+
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+def rule_changed(sender, **kwargs):
+    transaction.on_commit(rule_sets.invalidate)
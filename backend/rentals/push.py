@@ -0,0 +1,169 @@
+"""
+Push notifications to registered devices.
+
+``PushChannel`` is a notification channel (see rentals.notifications): for each
+batch of deliveries it queues one ``push.dispatch`` job, so the in-app inbox is
+committed independently and a failing push provider is retried on its own.
+The dispatcher loads the recipients' active devices in one query, groups them
+by provider and sends each provider's messages in chunks of the provider's
+batch size. Tokens a provider reports as unregistered are deactivated. The job
+itself never fails: a chunk the provider rejects is queued again on its own,
+addressed to its devices, so a retry never repeats a push that already went out.
+
+Providers are configured in ``settings.PUSH_PROVIDERS`` (provider name →
+dotted path); devices can only be registered for configured providers.
+``ExpoPushProvider`` talks to the Expo push service used by the mobile app;
+``FakePushProvider`` records messages in memory and is only configured with
+DEBUG (and in tests).
+
+Payloads carry ``event`` plus the event's data (booking_id, conversation_id,
+task_id…) so the app can refresh the affected screen instead of polling.
+"""
+import json
+import logging
+import urllib.request
+from collections import defaultdict
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .jobs import DEFAULT_MAX_ATTEMPTS, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS, enqueue, job
+from .models import PushDevice
+from .notifications import NotificationChannel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDERS = {
+    'expo': 'rentals.push.ExpoPushProvider',
+}
+
+
+class PushProvider:
+    """Sends push messages for one provider. Subclasses implement ``send``."""
+
+    batch_size = 100
+
+    def send(self, messages):
+        """
+        Send ``messages`` (dicts with token, title, body, data). Returns the tokens
+        the provider reported as no longer registered.
+        """
+        raise NotImplementedError
+
+
+class ExpoPushProvider(PushProvider):
+    """Expo push service (https://docs.expo.dev/push-notifications/sending-notifications/)."""
+
+    url = 'https://exp.host/--/api/v2/push/send'
+    batch_size = 100
+    timeout = 10
+
+    def send(self, messages):
+        body = json.dumps([
+            {'to': m['token'], 'title': m['title'], 'body': m['body'], 'data': m['data'], 'sound': 'default'}
+            for m in messages
+        ]).encode()
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        access_token = getattr(settings, 'EXPO_ACCESS_TOKEN', None)
+        if access_token:
+            headers['Authorization'] = f'Bearer {access_token}'
+        request = urllib.request.Request(self.url, data=body, headers=headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            tickets = json.load(response).get('data', [])
+
+        # Tickets come back in the order the messages were sent.
+        invalid = []
+        for message, ticket in zip(messages, tickets):
+            if ticket.get('status') == 'error':
+                if (ticket.get('details') or {}).get('error') == 'DeviceNotRegistered':
+                    invalid.append(message['token'])
+                else:
+                    logger.warning("Expo push to %s failed: %s", message['token'], ticket.get('message'))
+        return invalid
+
+
+class FakePushProvider(PushProvider):
+    """Collects messages in ``FakePushProvider.outbox`` instead of sending them."""
+
+    outbox = []
+
+    def send(self, messages):
+        FakePushProvider.outbox.extend(messages)
+        return []
+
+
+def provider_names():
+    return set(getattr(settings, 'PUSH_PROVIDERS', DEFAULT_PROVIDERS))
+
+
+def get_provider(name):
+    providers = getattr(settings, 'PUSH_PROVIDERS', DEFAULT_PROVIDERS)
+    return import_string(providers[name])() if name in providers else None
+
+
+def register_device(user, token, provider='expo', platform=''):
+    """Attach ``token`` to ``user`` (moving it from whoever had it before)."""
+    device, _ = PushDevice.objects.update_or_create(
+        token=token,
+        defaults={'user': user, 'provider': provider, 'platform': platform, 'is_active': True},
+    )
+    return device
+
+
+def unregister_device(user, token):
+    return PushDevice.objects.filter(user=user, token=token).update(is_active=False)
+
+
+class PushChannel(NotificationChannel):
+    """Push to the recipients' devices, for users with push notifications enabled."""
+
+    preference = 'push_notifications'
+
+    def deliver(self, deliveries):
+        enqueue('push.dispatch', messages=[
+            {'user_id': d.user_id, 'title': d.title, 'body': d.message, 'data': {'event': d.event, **d.data}}
+            for d in deliveries
+        ])
+
+
+@job('push.dispatch', atomic=False)
+def dispatch(messages=None, device_messages=None, attempt=1):
+    """
+    Push ``messages`` (per user) to the users' devices. Retries carry
+    ``device_messages`` instead: the messages, already addressed to the
+    devices that did not get them.
+    """
+    by_provider = defaultdict(list)
+    for message in device_messages or []:
+        by_provider[message.pop('provider')].append(message)
+    if messages:
+        by_user = defaultdict(list)
+        for message in messages:
+            by_user[message['user_id']].append({k: v for k, v in message.items() if k != 'user_id'})
+        devices = PushDevice.objects.filter(user_id__in=list(by_user), is_active=True).values_list('user_id', 'provider', 'token')
+        for user_id, provider, token in devices:
+            by_provider[provider].extend({'token': token, **message} for message in by_user[user_id])
+
+    invalid, unsent = [], []
+    for name, messages in by_provider.items():
+        provider = get_provider(name)
+        if provider is None:
+            logger.warning("No push provider configured for %r; dropping %d message(s)", name, len(messages))
+            continue
+        for start in range(0, len(messages), provider.batch_size):
+            batch = messages[start:start + provider.batch_size]
+            try:
+                invalid += provider.send(batch)
+            except Exception:
+                logger.exception("Push provider %r failed for %d message(s) (attempt %s)", name, len(batch), attempt)
+                unsent.extend({'provider': name, **message} for message in batch)
+
+    if invalid:
+        PushDevice.objects.filter(token__in=invalid).update(is_active=False)
+    if unsent and attempt < DEFAULT_MAX_ATTEMPTS:
+        backoff = min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
+        enqueue('push.dispatch', delay=timedelta(seconds=backoff), device_messages=unsent, attempt=attempt + 1)
+    elif unsent:
+        logger.error("Giving up on %d push message(s) after %s attempts", len(unsent), attempt)
@@ -0,0 +1,62 @@
+"""
+Shop ranking score used by ``/api/shops/?ordering=rank``.
+
+The score is a Bayesian average of review ratings in which every review is
+weighted by exponential time decay, so a shop with one fresh 5★ review does not
+outrank a shop with hundreds of 4.8★ reviews.
+
+Decay uses "forward" weights: a review written at time t contributes
+``exp(DECAY_RATE * (t - DECAY_EPOCH))``. Older reviews never need rewriting; the
+stored sums are rescaled to the current time whenever the score is refreshed.
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+from django.utils import timezone
+
+# Prior belief about an unreviewed shop and how many reviews it is worth.
+PRIOR_MEAN = 3.5
+PRIOR_WEIGHT = 5.0
+
+HALF_LIFE_DAYS = 180
+DECAY_RATE = math.log(2) / HALF_LIFE_DAYS  # per day
+DECAY_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+# Distance at which a shop's score is halved when the client sends its location.
+DISTANCE_SCALE_KM = 10.0
+EARTH_RADIUS_KM = 6371.0
+
+
+def _days_since_epoch(moment):
+    return (moment - DECAY_EPOCH).total_seconds() / 86400
+
+
+def review_weight(created_at):
+    """Forward-decay weight of a review written at ``created_at``."""
+    return math.exp(DECAY_RATE * _days_since_epoch(created_at))
+
+
+def decay_scale(now=None):
+    """Factor that rescales forward-decay sums to their value at ``now``."""
+    return math.exp(-DECAY_RATE * _days_since_epoch(now or timezone.now()))
+
+
+def rank_score(decayed_sum, decayed_weight, now=None):
+    """
+    Bayesian average of the decayed ratings. Works on plain floats as well as on
+    F-expressions, so the same formula is used in Python and inside an UPDATE.
+    """
+    scale = decay_scale(now)
+    return (PRIOR_WEIGHT * PRIOR_MEAN + decayed_sum * scale) / (PRIOR_WEIGHT + decayed_weight * scale)
+
+
+def distance_km_expression(lat, lng):
+    """Haversine distance in km from (lat, lng) to each shop, as a DB expression."""
+    lat = Value(float(lat), output_field=FloatField())
+    lng = Value(float(lng), output_field=FloatField())
+    half_dlat = (Radians(F('latitude')) - Radians(lat)) / 2
+    half_dlng = (Radians(F('longitude')) - Radians(lng)) / 2
+    a = Power(Sin(half_dlat), 2) + Cos(Radians(lat)) * Cos(Radians(F('latitude'))) * Power(Sin(half_dlng), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
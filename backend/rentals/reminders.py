@@ -0,0 +1,115 @@
+"""
+Booking reminders and payment alerts.
+
+Each entry of REMINDERS fires once for every booking in its statuses whose
+``start_date``/``end_date`` falls within its lead time. When a booking is
+inside the windows of several reminders of the same field and event (booked
+an hour before pickup), only the closest one is sent. Lead times can be tuned
+or switched off with ``settings.BOOKING_REMINDER_LEADS`` (kind → minutes, or
+None).
+
+Sent reminders are recorded in ``BookingReminder`` keyed by (booking, kind,
+due_at), which is also how a batch is claimed: candidates are read from the
+(status, date) indexes with the ledger excluded in SQL, ledger rows are bulk
+inserted (conflicts ignored) stamped with the run's timestamp, and only the
+bookings whose rows carry that stamp are notified — one
+``notifications.deliver_each`` job per batch. Concurrent runs therefore never
+send a reminder twice, and each batch costs a handful of queries however many
+bookings are active. Whether a user gets the reminder is decided by their
+``UserSettings.reminders`` / ``payment_alerts`` flags at delivery.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import Booking, BookingReminder
+from .notifications import queue_notifications
+
+BATCH_SIZE = 1000
+
+Reminder = namedtuple('Reminder', 'kind event statuses field lead filters title template')
+
+REMINDERS = [
+    Reminder('start_24h', 'reminder', ('upcoming',), 'start_date', timedelta(hours=24), {},
+             'Upcoming Rental', 'Your rental of {vehicle} starts tomorrow at {time}'),
+    Reminder('start_2h', 'reminder', ('upcoming',), 'start_date', timedelta(hours=2), {},
+             'Rental Starting Soon', 'Your rental of {vehicle} starts at {time}'),
+    Reminder('end_1h', 'reminder', ('active',), 'end_date', timedelta(hours=1), {},
+             'Rental Ending Soon', 'Your rental of {vehicle} ends at {time}. Please plan your return.'),
+    Reminder('payment_due', 'payment', ('upcoming',), 'start_date', timedelta(hours=24), {'payment_status': 'pending'},
+             'Payment Pending', 'Payment for your rental of {vehicle} ({time}) is still pending'),
+]
+
+
+def active_reminders():
+    """REMINDERS with lead times from settings, disabled ones dropped."""
+    leads = getattr(settings, 'BOOKING_REMINDER_LEADS', {})
+    reminders = []
+    for reminder in REMINDERS:
+        minutes = leads.get(reminder.kind, reminder.lead.total_seconds() / 60)
+        if minutes:
+            reminders.append(reminder._replace(lead=timedelta(minutes=minutes)))
+    return reminders
+
+
+def _window_start(reminder, reminders):
+    """Lead of the next closer reminder of the same field and event (0 if none)."""
+    closer = [r.lead for r in reminders
+              if (r.field, r.event) == (reminder.field, reminder.event) and r.lead < reminder.lead]
+    return max(closer, default=timedelta(0))
+
+
+def due_bookings(reminder, now, window_start=timedelta(0)):
+    sent = BookingReminder.objects.filter(booking=OuterRef('pk'), kind=reminder.kind, due_at=OuterRef(reminder.field))
+    return (
+        Booking.objects.filter(
+            status__in=reminder.statuses,
+            **{f'{reminder.field}__gt': now + window_start, f'{reminder.field}__lte': now + reminder.lead},
+            **reminder.filters,
+        )
+        .exclude(Exists(sent))
+    )
+
+
+def send_reminder(reminder, now, window_start=timedelta(0), batch_size=BATCH_SIZE):
+    """Send ``reminder`` for every due booking; returns how many were sent."""
+    due = due_bookings(reminder, now, window_start).order_by(reminder.field)
+    sent = 0
+    while True:
+        batch = list(due.values_list('id', reminder.field)[:batch_size])
+        if not batch:
+            return sent
+        # Walk the index forward instead of re-scanning rows claimed by earlier batches.
+        due = due.filter(**{f'{reminder.field}__gte': batch[-1][1]})
+        with transaction.atomic():
+            BookingReminder.objects.bulk_create(
+                [BookingReminder(booking_id=pk, kind=reminder.kind, due_at=due_at, sent_at=now) for pk, due_at in batch],
+                ignore_conflicts=True,
+            )
+            rows = list(
+                Booking.objects.filter(
+                    id__in=[pk for pk, _ in batch], reminders__kind=reminder.kind,
+                    reminders__due_at=F(reminder.field), reminders__sent_at=now,
+                ).values_list('id', 'user_id', 'vehicle__name', reminder.field)
+            )
+            queue_notifications(reminder.event, [
+                (user_id, reminder.title,
+                 reminder.template.format(vehicle=vehicle, time=timezone.localtime(at).strftime('%H:%M')),
+                 {'booking_id': pk, 'reminder': reminder.kind})
+                for pk, user_id, vehicle, at in rows
+            ])
+        sent += len(rows)
+
+
+def send_due_reminders(now=None, batch_size=BATCH_SIZE):
+    """Send every due reminder; returns the total sent."""
+    now = now or timezone.now()
+    reminders = active_reminders()
+    return sum(
+        send_reminder(reminder, now, _window_start(reminder, reminders), batch_size)
+        for reminder in reminders
+    )
@@ -0,0 +1,361 @@
+"""
+Road routing for shop ↔ customer trips.
+
+The road graph is built from an OpenStreetMap extract with ``python manage.py
+build_routing_graph <extract.osm>`` and saved as a NumPy ``.npz`` at
+``settings.ROUTING_GRAPH_PATH``. It is stored in compressed sparse row form:
+the edges leaving node ``i`` are ``targets[offsets[i]:offsets[i + 1]]``, with
+their lengths (m) and travel times (s) at the same positions, and node
+coordinates are two float arrays. Each process loads the graph once, on first
+use, into flat ``array.array`` buffers; restart the workers after rebuilding.
+
+``route`` snaps both ends to the nearest graph node through a uniform grid
+over the node coordinates and runs A* on travel time. The heuristic is the
+great-circle distance at the graph's top speed, which never overestimates, so
+the route found is the fastest. Only the search is cached (Django cache): the
+node path with its metres and seconds per (source node, target node), so
+requests from around the same spot reuse one search. The legs between the
+actual points and the road are added per call, so a cached entry holds nothing
+of the requester's exact position and live ETAs stay exact. Without a graph,
+or when the ends are not connected, ``route`` falls back to the haversine
+distance at AVERAGE_SPEED_KMH.
+"""
+import heapq
+import logging
+import math
+import os
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .ranking import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+AVERAGE_SPEED_KMH = 25.0
+ROUTE_CACHE_TIMEOUT = 6 * 60 * 60
+GRID_DEGREES = 0.01  # snapping grid, ~1 km
+MAX_SNAP_RINGS = 3
+
+# Drivable OSM highway types and their default speeds (km/h) when a way has no maxspeed
+HIGHWAY_SPEEDS = {
+    'motorway': 100, 'motorway_link': 60,
+    'trunk': 80, 'trunk_link': 50,
+    'primary': 60, 'primary_link': 40,
+    'secondary': 50, 'secondary_link': 35,
+    'tertiary': 40, 'tertiary_link': 30,
+    'unclassified': 30, 'residential': 25,
+    'living_street': 10, 'service': 15, 'road': 25,
+}
+ONEWAY_VALUES = ('yes', 'true', '1')
+
+Route = namedtuple('Route', 'distance_km duration_s coordinates source')
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _haversine_m_arrays(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = (np.radians(x) for x in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+# ── Building the graph ────────────────────────────────────────────────────────
+
+def _speed_kmh(tags):
+    default = HIGHWAY_SPEEDS[tags['highway']]
+    raw = tags.get('maxspeed', '').strip().lower()
+    try:
+        if raw.endswith('mph'):
+            return float(raw[:-3]) * 1.609
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
+def _largest_component(n, sources, targets):
+    """Mask of the nodes in the largest weakly connected component."""
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(sources.tolist(), targets.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[ra] = rb
+    roots = np.fromiter((find(x) for x in range(n)), dtype=np.int64, count=n)
+    return roots == np.bincount(roots).argmax()
+
+
+def build_graph(osm_file):
+    """
+    Parse an OSM XML extract into the graph arrays saved by ``save_graph``.
+    Only drivable ways are kept, and only the largest connected part of them
+    so every snapped point can reach every other.
+    """
+    coordinates = {}
+    ways = []
+    for _, element in ET.iterparse(osm_file, events=('end',)):
+        if element.tag == 'node':
+            coordinates[int(element.get('id'))] = (float(element.get('lat')), float(element.get('lon')))
+        elif element.tag == 'way':
+            tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+            if tags.get('highway') in HIGHWAY_SPEEDS and tags.get('access') not in ('no', 'private'):
+                nodes = [int(nd.get('ref')) for nd in element.iter('nd')]
+                oneway = tags.get('oneway', '').lower()
+                if tags.get('junction') == 'roundabout' and not oneway:
+                    oneway = 'yes'
+                ways.append((nodes, _speed_kmh(tags), oneway))
+        if element.tag in ('node', 'way', 'relation'):
+            element.clear()
+
+    index = {}
+    sources, targets, speeds = array('q'), array('q'), array('d')
+    for nodes, speed, oneway in ways:
+        nodes = [node for node in nodes if node in coordinates]
+        for a, b in zip(nodes, nodes[1:]):
+            if a == b:
+                continue
+            a, b = index.setdefault(a, len(index)), index.setdefault(b, len(index))
+            if oneway != '-1':
+                sources.append(a), targets.append(b), speeds.append(speed)
+            if oneway not in ONEWAY_VALUES:
+                sources.append(b), targets.append(a), speeds.append(speed)
+
+    lat = np.empty(len(index))
+    lng = np.empty(len(index))
+    for osm_id, i in index.items():
+        lat[i], lng[i] = coordinates[osm_id]
+    sources, targets, speeds = (np.frombuffer(x, dtype=x.typecode) for x in (sources, targets, speeds))
+
+    keep = _largest_component(len(index), sources, targets)
+    renumber = np.cumsum(keep) - 1
+    edges = keep[sources]
+    sources, targets, speeds = renumber[sources[edges]], renumber[targets[edges]], speeds[edges]
+    lat, lng = lat[keep], lng[keep]
+
+    order = np.argsort(sources, kind='stable')
+    sources, targets, speeds = sources[order], targets[order], speeds[order]
+    lengths = _haversine_m_arrays(lat[sources], lng[sources], lat[targets], lng[targets])
+    return {
+        'lat': lat,
+        'lng': lng,
+        'offsets': np.searchsorted(sources, np.arange(len(lat) + 1)).astype(np.int64),
+        'targets': targets.astype(np.int32),
+        'lengths': lengths.astype(np.float32),
+        'times': (lengths / (speeds / 3.6)).astype(np.float32),
+        'max_speed': np.array(speeds.max() / 3.6 if len(speeds) else 1.0),
+    }
+
+
+def save_graph(graph, path):
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, **graph)
+
+
+# ── Loaded graph ──────────────────────────────────────────────────────────────
+
+def _packed(typecode, values):
+    """A NumPy array as an ``array.array``: just as compact, but much faster to index from Python."""
+    packed = array(typecode)
+    packed.frombytes(np.ascontiguousarray(values, dtype=np.dtype(typecode)).tobytes())
+    return packed
+
+
+class RoadGraph:
+    def __init__(self, data, version=''):
+        self.version = version
+        self.lat = _packed('d', data['lat'])
+        self.lng = _packed('d', data['lng'])
+        self.offsets = _packed('q', data['offsets'])
+        self.targets = _packed('i', data['targets'])
+        self.lengths = _packed('f', data['lengths'])
+        self.times = _packed('f', data['times'])
+        self.max_speed = float(data['max_speed'])
+        self._build_grid(np.asarray(data['lat']), np.asarray(data['lng']))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files}, version=str(int(os.path.getmtime(path))))
+
+    def __len__(self):
+        return len(self.lat)
+
+    @staticmethod
+    def _cell(lat, lng):
+        return math.floor(lat / GRID_DEGREES), math.floor(lng / GRID_DEGREES)
+
+    def _build_grid(self, lat, lng):
+        rows = np.floor(lat / GRID_DEGREES).astype(np.int64)
+        cols = np.floor(lng / GRID_DEGREES).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        self._grid_nodes = order
+        keys, starts = np.unique(np.stack([rows[order], cols[order]], axis=1), axis=0, return_index=True)
+        ends = np.append(starts[1:], len(order))
+        self._grid = {(int(r), int(c)): (int(s), int(e)) for (r, c), s, e in zip(keys, starts, ends)}
+        self.lat_array, self.lng_array = lat, lng
+
+    def nearest_node(self, lat, lng):
+        """Closest node within MAX_SNAP_RINGS grid cells of the point, or None."""
+        row, col = self._cell(lat, lng)
+        best = None
+        for ring in range(MAX_SNAP_RINGS + 1):
+            candidates = [
+                self._grid_nodes[slice(*self._grid[(row + dr, col + dc)])]
+                for dr in range(-ring, ring + 1) for dc in range(-ring, ring + 1)
+                if max(abs(dr), abs(dc)) == ring and (row + dr, col + dc) in self._grid
+            ]
+            if candidates:
+                nodes = np.concatenate(candidates)
+                distances = _haversine_m_arrays(lat, lng, self.lat_array[nodes], self.lng_array[nodes])
+                i = int(distances.argmin())
+                if best is None or distances[i] < best[1]:
+                    best = (int(nodes[i]), float(distances[i]))
+            # A node found in ring r can still be beaten by one in ring r + 1
+            if best is not None and best[1] <= ring * GRID_DEGREES * 111_000 * math.cos(math.radians(lat)):
+                break
+        return best[0] if best else None
+
+    def shortest_path(self, source, target):
+        """A* on travel time; returns (nodes, metres, seconds) or None if unreachable."""
+        lat, lng, offsets, targets, times = self.lat, self.lng, self.offsets, self.targets, self.times
+        target_lat, target_lng, speed = lat[target], lng[target], self.max_speed
+
+        def estimate(node):
+            return haversine_m(lat[node], lng[node], target_lat, target_lng) / speed
+
+        best = {source: 0.0}
+        previous = {}
+        heap = [(estimate(source), 0.0, source)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if cost > best[node]:
+                continue
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbour = targets[edge]
+                new_cost = cost + times[edge]
+                if new_cost < best.get(neighbour, math.inf):
+                    best[neighbour] = new_cost
+                    previous[neighbour] = (node, edge)
+                    heapq.heappush(heap, (new_cost + estimate(neighbour), new_cost, neighbour))
+        else:
+            return None
+
+        nodes, metres = [target], 0.0
+        while nodes[-1] != source:
+            node, edge = previous[nodes[-1]]
+            metres += self.lengths[edge]
+            nodes.append(node)
+        nodes.reverse()
+        return nodes, metres, best[target]
+
+
+    def within(self, source, max_metres):
+        """Road distance (m) from ``source`` to every node at most ``max_metres`` away."""
+        offsets, targets, lengths = self.offsets, self.targets, self.lengths
+        best = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            metres, node = heapq.heappop(heap)
+            if metres > best[node]:
+                continue
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbour = targets[edge]
+                new_metres = metres + lengths[edge]
+                if new_metres <= max_metres and new_metres < best.get(neighbour, math.inf):
+                    best[neighbour] = new_metres
+                    heapq.heappush(heap, (new_metres, neighbour))
+        return best
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """The graph at settings.ROUTING_GRAPH_PATH, loaded once per process; None if not configured."""
+    global _graph
+    path = getattr(settings, 'ROUTING_GRAPH_PATH', None)
+    if not path:
+        return None
+    with _graph_lock:
+        if _graph is None and not os.path.exists(path):
+            logger.warning("No routing graph at %s; using straight-line estimates", path)
+            _graph = False
+        if _graph is None:
+            try:
+                _graph = RoadGraph.load(path)
+                logger.info("Loaded routing graph %s (%d nodes)", path, len(_graph))
+            except (OSError, KeyError, ValueError):
+                logger.exception("Could not load routing graph %s; using straight-line estimates", path)
+                _graph = False
+    return _graph or None
+
+
+# ── Routing ───────────────────────────────────────────────────────────────────
+
+def straight_line(origin, destination):
+    metres = haversine_m(*origin, *destination)
+    return Route(
+        metres / 1000, metres / (AVERAGE_SPEED_KMH / 3.6),
+        [[origin[1], origin[0]], [destination[1], destination[0]]], 'haversine',
+    )
+
+
+def _shortest_path(graph, source, target):
+    """``graph.shortest_path``, cached per node pair; None if unreachable."""
+    key = f'route:{graph.version}:{source}:{target}'
+    cached = cache.get(key)
+    if cached is None:
+        path = graph.shortest_path(source, target)
+        # An empty tuple records "unreachable" (None would read as a cache miss).
+        cached = (list(path[0]), float(path[1]), float(path[2])) if path is not None else ()
+        cache.set(key, cached, ROUTE_CACHE_TIMEOUT)
+    return cached or None
+
+
+def _route_on_graph(graph, origin, destination):
+    source = graph.nearest_node(*origin)
+    target = graph.nearest_node(*destination)
+    if source is None or target is None:
+        return None
+    path = _shortest_path(graph, source, target)
+    if path is None:
+        return None
+    nodes, metres, seconds = path
+    # Legs between the points and the road, at the average speed
+    access = haversine_m(*origin, graph.lat[source], graph.lng[source]) + \
+        haversine_m(graph.lat[target], graph.lng[target], *destination)
+    coordinates = [[origin[1], origin[0]]]
+    coordinates += [[round(graph.lng[n], 6), round(graph.lat[n], 6)] for n in nodes]
+    coordinates.append([destination[1], destination[0]])
+    return Route(
+        (metres + access) / 1000, seconds + access / (AVERAGE_SPEED_KMH / 3.6), coordinates, 'graph',
+    )
+
+
+def route(origin, destination):
+    """Fastest road route between two (lat, lng) points, or the straight-line estimate."""
+    graph = get_graph()
+    if graph is None:
+        return straight_line(origin, destination)
+    return _route_on_graph(graph, origin, destination) or straight_line(origin, destination)
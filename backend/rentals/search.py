@@ -0,0 +1,248 @@
+"""
+Full-text search over rental shops and vehicles.
+
+Each shop and each vehicle is one document in an inverted index:
+
+    shop    → title: name              body: address
+    vehicle → title: name brand model  body: features
+
+The default backend on SQLite is an FTS5 virtual table (created by migration
+0030) ranked with BM25. Query terms that do not appear in the index vocabulary
+are corrected to the closest indexed terms, so "hunda" still finds "Honda".
+Other databases fall back to ``LikeSearchBackend``; a server-side engine can be
+plugged in through ``settings.SEARCH_BACKEND`` (a dotted path to a
+``SearchBackend`` subclass).
+
+The index is kept in sync by the signal receivers at the bottom of this module.
+"""
+import difflib
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import RentalShop, Vehicle, VehicleFeature
+
+FTS_TABLE = 'search_index'
+FTS_VOCAB_TABLE = 'search_index_vocab'
+
+SHOP = 'shop'
+VEHICLE = 'vehicle'
+_KIND_BITS = {SHOP: 0, VEHICLE: 1}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    return [t.lower() for t in _TOKEN_RE.findall(query or '')][:8]
+
+
+def _doc_id(kind, object_id):
+    # Shops and vehicles share one index; the low bit of the rowid says which.
+    return object_id * 2 + _KIND_BITS[kind]
+
+
+def _split_doc_id(rowid):
+    return (VEHICLE if rowid & 1 else SHOP), rowid >> 1
+
+
+def shop_document(shop):
+    return shop.name or '', shop.address or ''
+
+
+def vehicle_document(vehicle):
+    title = ' '.join(filter(None, [vehicle.name, vehicle.brand, vehicle.model]))
+    return title, ' '.join(vehicle.features)
+
+
+class SearchBackend:
+    """Interface every search backend implements."""
+
+    def index(self, kind, object_id, title, body):
+        raise NotImplementedError
+
+    def remove(self, kind, object_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, limit=20):
+        """Return ``(hits, corrections)``; hits are ``(kind, object_id)`` best first."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """FTS5 index with BM25 ranking (name/title weighted over address/features)."""
+
+    TITLE_WEIGHT = 10.0
+    BODY_WEIGHT = 3.0
+    MAX_CORRECTIONS = 3
+
+    def index(self, kind, object_id, title, body):
+        rowid = _doc_id(kind, object_id)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [rowid])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+                [rowid, title, body],
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [_doc_id(kind, object_id)])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def _expand(self, cursor, term):
+        """Alternatives for one query term: itself as a prefix, plus close vocabulary terms."""
+        cursor.execute(f'SELECT 1 FROM {FTS_VOCAB_TABLE} WHERE term >= %s AND term < %s LIMIT 1', [term, term + '\uffff'])
+        if cursor.fetchone() or len(term) < 3:
+            return [f'"{term}"*'], []
+
+        # Unknown term: compare against vocabulary words that share its first letter
+        # and have a similar length, which keeps the candidate set small.
+        cursor.execute(
+            f'SELECT term FROM {FTS_VOCAB_TABLE} WHERE term >= %s AND term < %s '
+            f'AND length(term) BETWEEN %s AND %s',
+            [term[0], term[0] + '\uffff', len(term) - 2, len(term) + 2],
+        )
+        candidates = [row[0] for row in cursor.fetchall()]
+        corrected = difflib.get_close_matches(term, candidates, n=self.MAX_CORRECTIONS, cutoff=0.7)
+        return [f'"{term}"*'] + [f'"{c}"' for c in corrected], corrected
+
+    def search(self, query, limit=20):
+        terms = tokenize(query)
+        if not terms:
+            return [], {}
+
+        corrections = {}
+        with connection.cursor() as cursor:
+            groups = []
+            for term in terms:
+                alternatives, corrected = self._expand(cursor, term.replace('"', ''))
+                if corrected:
+                    corrections[term] = corrected
+                groups.append('(' + ' OR '.join(alternatives) + ')')
+
+            sql = (
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s'
+            )
+            # All terms must match; if nothing does, fall back to any term matching.
+            for joiner in (' AND ', ' OR '):
+                cursor.execute(sql, [joiner.join(groups), self.TITLE_WEIGHT, self.BODY_WEIGHT, limit])
+                rows = cursor.fetchall()
+                if rows or len(groups) == 1:
+                    break
+
+        return [_split_doc_id(row[0]) for row in rows], corrections
+
+
+class LikeSearchBackend(SearchBackend):
+    """
+    Portable fallback for databases without a configured full-text engine.
+    Writes are no-ops; queries run ``icontains`` over the source tables.
+    """
+
+    def index(self, kind, object_id, title, body):
+        pass
+
+    def remove(self, kind, object_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query, limit=20):
+        from django.db.models import Q
+
+        terms = tokenize(query)
+        if not terms:
+            return [], {}
+        shop_q, vehicle_q = Q(), Q()
+        for term in terms:
+            shop_q &= Q(name__icontains=term) | Q(address__icontains=term)
+            vehicle_q &= (
+                Q(name__icontains=term) | Q(brand__icontains=term) | Q(model__icontains=term)
+                | Q(feature_set__feature_name__icontains=term)
+            )
+        shops = RentalShop.objects.filter(shop_q).values_list('id', flat=True)[:limit]
+        vehicles = Vehicle.objects.filter(vehicle_q).distinct().values_list('id', flat=True)[:limit]
+        return [(SHOP, pk) for pk in shops] + [(VEHICLE, pk) for pk in vehicles], {}
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            _backend = SQLiteFTSBackend()
+        else:
+            # Not cached: the FTS table is picked up as soon as it has been migrated.
+            return LikeSearchBackend()
+    return _backend
+
+
+def index_shop(shop):
+    get_search_backend().index(SHOP, shop.pk, *shop_document(shop))
+
+
+def index_vehicle(vehicle):
+    get_search_backend().index(VEHICLE, vehicle.pk, *vehicle_document(vehicle))
+
+
+def rebuild_index():
+    backend = get_search_backend()
+    backend.clear()
+    for shop in RentalShop.objects.only('id', 'name', 'address').iterator():
+        backend.index(SHOP, shop.pk, *shop_document(shop))
+    for vehicle in Vehicle.objects.prefetch_related('feature_set').iterator(chunk_size=500):
+        backend.index(VEHICLE, vehicle.pk, *vehicle_document(vehicle))
+
+
+# ── Index sync ────────────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=RentalShop)
+def index_shop_on_save(sender, instance, update_fields=None, **kwargs):
+    # Rating/rank updates go through queryset.update(), but skip explicit
+    # update_fields saves that don't touch indexed columns as well.
+    if update_fields is not None and not {'name', 'address'} & set(update_fields):
+        return
+    index_shop(instance)
+
+
+@receiver(post_delete, sender=RentalShop)
+def remove_shop_from_index(sender, instance, **kwargs):
+    get_search_backend().remove(SHOP, instance.pk)
+
+
+@receiver(post_save, sender=Vehicle)
+def index_vehicle_on_save(sender, instance, update_fields=None, **kwargs):
+    # Availability flips (update_fields=['is_available']) don't change the document.
+    if update_fields is not None and not {'name', 'brand', 'model'} & set(update_fields):
+        return
+    index_vehicle(instance)
+
+
+@receiver(post_delete, sender=Vehicle)
+def remove_vehicle_from_index(sender, instance, **kwargs):
+    get_search_backend().remove(VEHICLE, instance.pk)
+
+
+@receiver(post_save, sender=VehicleFeature)
+@receiver(post_delete, sender=VehicleFeature)
+def reindex_vehicle_on_feature_change(sender, instance, **kwargs):
+    vehicle = Vehicle.objects.filter(pk=instance.vehicle_id).first()
+    if vehicle is not None:
+        index_vehicle(vehicle)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth.models import User
+from .holds import vehicle_conflict
+from .media import image_sources
 from .models import (
     RentalShop, Vehicle, Booking, Conversation, Message,
     UserSettings, PaymentMethod, SavedLocation, KYCDocument, UserProfile, Notification, Review
@@ -32,10 +34,20 @@ class UserSerializer(serializers.ModelSerializer):
 
 class RentalShopSerializer(serializers.ModelSerializer):
     vehicleCount = serializers.SerializerMethodField()
+    image_sources = serializers.SerializerMethodField()
 
     class Meta:
         model = RentalShop
         fields = '__all__'
+        # Maintained by Review.save/delete (apply_shop_rating_delta) and the
+        # scheduler (rentals.lifecycle), never by clients
+        read_only_fields = [
+            'rating_sum', 'review_count', 'decayed_rating_sum', 'decayed_review_weight', 'rank_score',
+        ]
+
+    def get_image_sources(self, obj):
+        """Original URL plus resized srcsets (see rentals.media)."""
+        return image_sources(obj.image, obj.image_variants)
 
     def get_vehicleCount(self, obj):
         cars = obj.vehicles.filter(type='car').count()
@@ -74,12 +86,17 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 class VehicleSerializer(serializers.ModelSerializer):
     images = serializers.ListField(child=serializers.CharField(), read_only=True)
+    image_sources = serializers.SerializerMethodField()
     features = serializers.ListField(child=serializers.CharField(), read_only=True)
 
     class Meta:
         model = Vehicle
         fields = '__all__'
 
+    def get_image_sources(self, obj):
+        """Per image: original URL, smallest thumbnail and JPEG/WebP srcsets."""
+        return [image_sources(img.image, img.variants) for img in obj.image_set.all() if img.image]
+
 class BookingSerializer(serializers.ModelSerializer):
     """Serializer for booking model with validation"""
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -89,11 +106,12 @@ class BookingSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'vehicle', 'shop', 'booking_type', 
             'start_date', 'end_date', 'duration',
-            'base_price', 'delivery_fee', 'service_fee', 'total_price',
-            'delivery_option', 'delivery_address', 'payment_method', 
-            'payment_status', 'status', 'created_at', 'updated_at'
+            'base_price', 'adjustments', 'delivery_fee', 'service_fee', 'total_price',
+            'delivery_option', 'delivery_address', 'delivery_latitude', 'delivery_longitude',
+            'payment_method', 'payment_status', 'status', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'total_price', 'payment_status', 'status', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'adjustments', 'total_price', 'payment_status', 'status',
+                            'created_at', 'updated_at']
     
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -163,13 +181,21 @@ class BookingCreateSerializer(serializers.ModelSerializer):
     duration = serializers.IntegerField(min_value=1)
     delivery_option = serializers.ChoiceField(choices=Booking.DELIVERY_OPTIONS, default='self_pickup')
     delivery_address = serializers.CharField(required=False, allow_blank=True)
+    delivery_latitude = serializers.FloatField(required=False, allow_null=True, min_value=-90, max_value=90)
+    delivery_longitude = serializers.FloatField(required=False, allow_null=True, min_value=-180, max_value=180)
+    # A SavedLocation of the user to deliver to, instead of address and coordinates
+    saved_location_id = serializers.IntegerField(required=False, allow_null=True, write_only=True)
+    promo_code = serializers.CharField(required=False, allow_blank=True, allow_null=True, write_only=True)
+    # The checkout hold (rentals.holds) this booking converts
+    hold_token = serializers.UUIDField(required=False, allow_null=True, write_only=True)
     payment_method = serializers.ChoiceField(choices=Booking.PAYMENT_METHODS)
     
     class Meta:
         model = Booking
         fields = [
             'vehicle_id', 'booking_type', 'start_date', 'duration',
-            'delivery_option', 'delivery_address', 'payment_method'
+            'delivery_option', 'delivery_address', 'delivery_latitude', 'delivery_longitude',
+            'saved_location_id', 'promo_code', 'hold_token', 'payment_method'
         ]
     
     def validate_vehicle_id(self, value):
@@ -180,61 +206,136 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         except Vehicle.DoesNotExist:
             raise serializers.ValidationError("Vehicle not found or not available")
     
+    def delivery(self, data, shop):
+        """
+        Delivery fields and fee for ``data``: the address and coordinates
+        resolved (see rentals.pricing.delivery_location) and the zone fee for
+        home delivery.
+        """
+        from .models import SavedLocation
+        from .pricing import delivery_location, delivery_quote
+
+        if data.get('delivery_option') != 'home_delivery':
+            return {
+                'delivery_fee': 0,
+                'delivery_address': data.get('delivery_address'),
+                'delivery_latitude': data.get('delivery_latitude'),
+                'delivery_longitude': data.get('delivery_longitude'),
+            }
+        try:
+            address, point = delivery_location(
+                getattr(self.context.get('request'), 'user', None), data.get('delivery_address'),
+                data.get('delivery_latitude'), data.get('delivery_longitude'), data.get('saved_location_id'),
+            )
+        except SavedLocation.DoesNotExist:
+            raise serializers.ValidationError({'saved_location_id': "Saved location not found"})
+        if not address:
+            raise serializers.ValidationError("Delivery address is required for home delivery")
+        quote = delivery_quote(shop, point)
+        if not quote.deliverable:
+            raise serializers.ValidationError(
+                f"The delivery address is {quote.distance_km:g} km away, outside the shop's delivery area"
+            )
+        return {
+            'delivery_fee': quote.fee,
+            'delivery_address': address,
+            'delivery_latitude': point[0] if point else None,
+            'delivery_longitude': point[1] if point else None,
+        }
+
+    def price(self, data, vehicle, delivery_fee):
+        """The PriceBreakdown of the booking in ``data`` (see rentals.pricing), its promo code checked."""
+        from .pricing import PricingError, find_promo, price_rental
+
+        promo = None
+        code = (data.get('promo_code') or '').strip().upper()
+        if code:
+            current = getattr(self.instance, 'promo_code', None)
+            if current is not None and current.code == code:
+                # Already redeemed for this booking
+                promo = current
+            else:
+                try:
+                    promo = find_promo(code, vehicle.shop)
+                except PricingError as e:
+                    raise serializers.ValidationError({'promo_code': str(e)})
+        return price_rental(
+            vehicle, data.get('booking_type'), data.get('start_date'), data.get('duration'), delivery_fee, promo,
+        )
+
+    def booking_data(self, data, vehicle, end_date, delivery, price):
+        from .pricing import adjustments_data
+
+        return {
+            'vehicle': vehicle,
+            'shop': vehicle.shop,
+            'booking_type': data.get('booking_type'),
+            'start_date': data.get('start_date'),
+            'end_date': end_date,
+            'duration': data.get('duration'),
+            'base_price': price.base_price,
+            'adjustments': adjustments_data(price.adjustments),
+            'delivery_fee': price.delivery_fee,
+            'service_fee': price.service_fee,
+            'total_price': price.total_price,
+            'promo_code': price.promo_code,
+            'delivery_option': data.get('delivery_option'),
+            'delivery_address': delivery['delivery_address'],
+            'delivery_latitude': delivery['delivery_latitude'],
+            'delivery_longitude': delivery['delivery_longitude'],
+            'payment_method': data.get('payment_method'),
+        }
+
     def validate(self, data):
         """Validate booking creation data"""
+        from .pricing import rental_end
+
         vehicle = data.get('vehicle_id')
         start_date = data.get('start_date')
-        duration = data.get('duration')
-        booking_type = data.get('booking_type')
-        delivery_option = data.get('delivery_option')
         
-        # Validate delivery address if home delivery option is selected
-        if delivery_option == 'home_delivery' and not data.get('delivery_address'):
-            raise serializers.ValidationError("Delivery address is required for home delivery")
+        # Resolves and validates the delivery address if home delivery option is selected
+        delivery = self.delivery(data, vehicle.shop)
         
         # Calculate end date based on booking type and duration
-        from datetime import timedelta
-        if booking_type == 'hour':
-            end_date = start_date + timedelta(hours=duration)
-            base_price = vehicle.price_per_hour * duration
-        else:
-            end_date = start_date + timedelta(days=duration)
-            base_price = vehicle.price_per_day * duration
-        
-        # Check for overlapping bookings
-        overlapping_bookings = Booking.objects.filter(
-            vehicle=vehicle,
-            status__in=['active', 'upcoming'],
-            start_date__lt=end_date,
-            end_date__gt=start_date
-        )
+        end_date = rental_end(start_date, data.get('booking_type'), data.get('duration'))
         
-        if overlapping_bookings.exists():
-            raise serializers.ValidationError("Vehicle is already booked for this time period")
+        # Check for overlapping bookings and other customers' holds
+        user = getattr(self.context.get('request'), 'user', None)
+        conflict = vehicle_conflict(vehicle.id, start_date, end_date, user)
+        if conflict:
+            raise serializers.ValidationError(conflict)
         
         # Prepare booking data
-        delivery_fee = 10 if delivery_option == 'home_delivery' else 0
-        service_fee = 5
-        booking_data = {
-            'vehicle': vehicle,
-            'shop': vehicle.shop,
-            'booking_type': booking_type,
-            'start_date': start_date,
-            'end_date': end_date,
-            'duration': duration,
-            'base_price': base_price,
-            'delivery_fee': delivery_fee,
-            'service_fee': service_fee,
-            'total_price': float(base_price) + delivery_fee + service_fee,
-            'delivery_option': delivery_option,
-            'delivery_address': data.get('delivery_address'),
-            'payment_method': data.get('payment_method'),
-        }
-        
-        return booking_data
+        price = self.price(data, vehicle, delivery['delivery_fee'])
+        return {**self.booking_data(data, vehicle, end_date, delivery, price), 'hold_token': data.get('hold_token')}
 
     def create(self, validated_data):
-        """Create booking and immediately mark vehicle as unavailable."""
+        """
+        Create booking and immediately mark vehicle as unavailable. Call in a
+        transaction: the availability check is repeated with the vehicle locked
+        and the hold, if any, is consumed along with it.
+        """
+        from .holds import HoldError, lock_vehicle, take_hold
+        from .models import BookingHold
+        from .pricing import redeem_promo
+
+        user = validated_data['user']
+        vehicle, token = validated_data['vehicle'], validated_data.pop('hold_token', None)
+        lock_vehicle(vehicle.id)
+        if token:
+            try:
+                take_hold(user, token, vehicle.id, validated_data['start_date'], validated_data['end_date'])
+            except HoldError as e:
+                raise serializers.ValidationError({'hold_token': str(e)})
+        conflict = vehicle_conflict(vehicle.id, validated_data['start_date'], validated_data['end_date'], user)
+        if conflict:
+            raise serializers.ValidationError(conflict)
+        # Any other hold of this customer on the vehicle is superseded by the booking
+        BookingHold.objects.filter(user=user, vehicle=vehicle).delete()
+
+        promo = validated_data.get('promo_code')
+        if promo is not None and not redeem_promo(promo):
+            raise serializers.ValidationError({'promo_code': "This promo code has been used up"})
         booking = Booking.objects.create(**validated_data)
 
         # Belt-and-suspenders: mark unavailable right away.
@@ -267,61 +368,105 @@ class BookingUpdateSerializer(BookingCreateSerializer):
         return vehicle
 
     def validate(self, data):
+        from .pricing import rental_end
+
         booking = self.instance
         vehicle = data.get('vehicle_id')
         start_date = data.get('start_date')
-        duration = data.get('duration')
-        booking_type = data.get('booking_type')
-        delivery_option = data.get('delivery_option')
 
-        if delivery_option == 'home_delivery' and not data.get('delivery_address'):
-            raise serializers.ValidationError(
-                "Delivery address is required for home delivery"
-            )
+        delivery = self.delivery(data, vehicle.shop)
+        end_date = rental_end(start_date, data.get('booking_type'), data.get('duration'))
 
-        from datetime import timedelta
-        if booking_type == 'hour':
-            end_date = start_date + timedelta(hours=duration)
-            base_price = vehicle.price_per_hour * duration
-        else:
-            end_date = start_date + timedelta(days=duration)
-            base_price = vehicle.price_per_day * duration
+        conflict = vehicle_conflict(vehicle.id, start_date, end_date, booking.user, exclude_booking=booking)
+        if conflict:
+            raise serializers.ValidationError(conflict)
 
-        overlapping_bookings = Booking.objects.filter(
-            vehicle=vehicle,
-            status__in=['active', 'upcoming'],
-            start_date__lt=end_date,
-            end_date__gt=start_date,
-        ).exclude(pk=booking.pk)
+        price = self.price(data, vehicle, delivery['delivery_fee'])
+        return self.booking_data(data, vehicle, end_date, delivery, price)
+
+    def update(self, instance, validated_data):
+        """Call in a transaction; the availability check is repeated with the vehicle locked."""
+        from .holds import lock_vehicle
+        from .pricing import redeem_promo, release_promo
+
+        lock_vehicle(instance.vehicle_id)
+        conflict = vehicle_conflict(instance.vehicle_id, validated_data['start_date'], validated_data['end_date'],
+                                    instance.user, exclude_booking=instance)
+        if conflict:
+            raise serializers.ValidationError(conflict)
+
+        promo = validated_data.get('promo_code')
+        if promo is not None and promo.pk != instance.promo_code_id and not redeem_promo(promo):
+            raise serializers.ValidationError({'promo_code': "This promo code has been used up"})
+        if instance.promo_code_id and instance.promo_code_id != getattr(promo, 'pk', None):
+            release_promo(instance.promo_code_id)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
+        return instance
 
-        if overlapping_bookings.exists():
-            raise serializers.ValidationError(
-                "Vehicle is already booked for this time period"
-            )
 
-        delivery_fee = 10 if delivery_option == 'home_delivery' else 0
-        service_fee = 5
+class BookingQuoteSerializer(BookingCreateSerializer):
+    """The BookingCreateSerializer payload, priced without booking."""
+    payment_method = serializers.ChoiceField(choices=Booking.PAYMENT_METHODS, required=False)
+
+    def validate_vehicle_id(self, value):
+        try:
+            return Vehicle.objects.select_related('shop').get(id=value)
+        except Vehicle.DoesNotExist:
+            raise serializers.ValidationError("Vehicle not found")
+
+    def validate(self, data):
+        from .pricing import rental_end
+
+        vehicle = data.get('vehicle_id')
+        start_date = data.get('start_date')
+        delivery = self.delivery(data, vehicle.shop)
+        end_date = rental_end(start_date, data.get('booking_type'), data.get('duration'))
+        user = getattr(self.context.get('request'), 'user', None)
+        available = vehicle.is_available and vehicle_conflict(vehicle.id, start_date, end_date, user) is None
         return {
             'vehicle': vehicle,
-            'shop': vehicle.shop,
-            'booking_type': booking_type,
             'start_date': start_date,
             'end_date': end_date,
-            'duration': duration,
-            'base_price': base_price,
-            'delivery_fee': delivery_fee,
-            'service_fee': service_fee,
-            'total_price': float(base_price) + delivery_fee + service_fee,
-            'delivery_option': delivery_option,
-            'delivery_address': data.get('delivery_address'),
-            'payment_method': data.get('payment_method'),
+            'available': available,
+            'price': self.price(data, vehicle, delivery['delivery_fee']),
         }
 
-    def update(self, instance, validated_data):
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        return instance
+
+class HoldRequestSerializer(serializers.Serializer):
+    """Payload of /api/holds/: the vehicle and window to hold during checkout."""
+    vehicle_id = serializers.IntegerField()
+    booking_type = serializers.ChoiceField(choices=Booking.BOOKING_TYPES)
+    start_date = serializers.DateTimeField()
+    duration = serializers.IntegerField(min_value=1)
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    """Payload of /api/quotes/: one rental window priced for many vehicles."""
+    vehicle_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    shop_id = serializers.IntegerField(required=False)
+    booking_type = serializers.ChoiceField(choices=Booking.BOOKING_TYPES)
+    start_date = serializers.DateTimeField()
+    duration = serializers.IntegerField(min_value=1)
+    delivery_option = serializers.ChoiceField(choices=Booking.DELIVERY_OPTIONS, default='self_pickup')
+    delivery_address = serializers.CharField(required=False, allow_blank=True)
+    delivery_latitude = serializers.FloatField(required=False, allow_null=True, min_value=-90, max_value=90)
+    delivery_longitude = serializers.FloatField(required=False, allow_null=True, min_value=-180, max_value=180)
+    saved_location_id = serializers.IntegerField(required=False, allow_null=True)
+    promo_code = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    MAX_VEHICLES = 200
+
+    def validate_vehicle_ids(self, value):
+        if len(value) > self.MAX_VEHICLES:
+            raise serializers.ValidationError(f"At most {self.MAX_VEHICLES} vehicles per request")
+        return list(dict.fromkeys(value))
+
+    def validate(self, data):
+        if not data.get('vehicle_ids') and not data.get('shop_id'):
+            raise serializers.ValidationError("vehicle_ids or shop_id is required")
+        return data
 
 
 # ── Chat Serializers ───────────────────────────────────────────────────────────
@@ -523,21 +668,53 @@ class KYCDocumentCreateSerializer(serializers.ModelSerializer):
     address = serializers.CharField(write_only=True)
     phone = serializers.CharField(write_only=True)
     email = serializers.EmailField(write_only=True)
+    # IDs of finished chunked uploads (/api/uploads/), instead of sending the photos inline
+    driving_license_upload = serializers.UUIDField(write_only=True, required=False)
+    secondary_doc_upload = serializers.UUIDField(write_only=True, required=False)
+
+    UPLOAD_FIELDS = {
+        'driving_license_upload': 'driving_license_photo',
+        'secondary_doc_upload': 'secondary_doc_photo',
+    }
 
     class Meta:
         model = KYCDocument
         fields = [
             'full_name', 'date_of_birth', 'address', 'phone', 'email',
-            'driving_license_number', 'driving_license_photo',
-            'secondary_doc_type', 'secondary_doc_number', 'secondary_doc_photo',
+            'driving_license_number', 'driving_license_photo', 'driving_license_upload',
+            'secondary_doc_type', 'secondary_doc_number', 'secondary_doc_photo', 'secondary_doc_upload',
             'rejection_reason'
         ]
 
+    def validate(self, attrs):
+        from .uploads import UploadError, get_completed_upload
+
+        request = self.context.get('request')
+        for upload_field in self.UPLOAD_FIELDS:
+            if upload_field in attrs:
+                try:
+                    attrs[upload_field] = get_completed_upload(attrs[upload_field], 'kyc', request.user if request else None)
+                except UploadError as e:
+                    raise serializers.ValidationError({upload_field: str(e)})
+        return attrs
+
+    def _claim_uploads(self, validated_data):
+        from .uploads import UploadError, consume_upload
+
+        for upload_field, file_field in self.UPLOAD_FIELDS.items():
+            upload = validated_data.pop(upload_field, None)
+            if upload is not None:
+                try:
+                    validated_data[file_field] = consume_upload(upload)
+                except UploadError as e:
+                    raise serializers.ValidationError({upload_field: str(e)})
+
     def create(self, validated_data):
         full_name = validated_data.pop('full_name', '')
         address = validated_data.pop('address', '')
         phone = validated_data.pop('phone', '')
         email = validated_data.pop('email', '')
+        self._claim_uploads(validated_data)
         
         kyc = super().create(validated_data)
         
@@ -566,6 +743,7 @@ class KYCDocumentCreateSerializer(serializers.ModelSerializer):
         address = validated_data.pop('address', '')
         phone = validated_data.pop('phone', '')
         email = validated_data.pop('email', '')
+        self._claim_uploads(validated_data)
         
         # Update KYCDocument fields
         for attr, value in validated_data.items():
@@ -0,0 +1,203 @@
+"""
+Media file serving.
+
+``serve_media`` answers every ``MEDIA_URL`` request. Python only decides whether
+the file may be served and which headers it gets; the bytes themselves are
+either handed to the front-end web server or sent with ``FileResponse``:
+
+    MEDIA_ACCEL = 'x-accel'   nginx ``X-Accel-Redirect`` to MEDIA_ACCEL_PREFIX + path
+    MEDIA_ACCEL = 'x-sendfile' Apache/lighttpd ``X-Sendfile`` with the absolute path
+    MEDIA_ACCEL = None        ``FileResponse`` (uses the server's wsgi.file_wrapper,
+                              i.e. sendfile(2), for full responses)
+
+Content-addressed names (see rentals.storage) never change meaning, so they are
+sent with a one-year ``immutable`` Cache-Control and their digest as ETag.
+Conditional (If-None-Match) and single byte-range requests are answered here
+when not offloaded. KYC documents are only served to their owner and to admins,
+owner registration certificates only to admins, and neither is cached by shared
+caches.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .models import KYCDocument
+from .storage import kyc_media_storage, public_media_storage
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE = 'public, max-age=3600'
+PRIVATE_CACHE = 'private, no-store'
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_DIGEST_RE = re.compile(r'([0-9a-f]{64})')
+
+
+# Certificates are stored with the KYC documents; this prefix covers files
+# uploaded before that, should any be left where the migration couldn't move them.
+PRIVATE_PREFIXES = ('kyc/', 'owner_certificates/')
+
+
+def is_private(name):
+    return name.startswith(PRIVATE_PREFIXES)
+
+
+def is_immutable(name):
+    return public_media_storage.is_blob(name) or kyc_media_storage.is_blob(name)
+
+
+def can_access(request, name):
+    """Private files: an admin, or the user whose KYC document it is. Everything else is public."""
+    if not is_private(name):
+        return True
+    from .admin_views import is_admin
+
+    user = request.user
+    if not user.is_authenticated:
+        # The app authenticates with DRF tokens rather than the session.
+        from rest_framework.authentication import TokenAuthentication
+        from rest_framework.exceptions import AuthenticationFailed
+        try:
+            authenticated = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            authenticated = None
+        if authenticated is None:
+            return False
+        user = authenticated[0]
+    if is_admin(user):
+        return True
+    return KYCDocument.objects.filter(
+        Q(driving_license_photo=name) | Q(secondary_doc_photo=name), user=user,
+    ).exists()
+
+
+def etag_for(name, stat):
+    # The digest in a content-addressed name (blob or variant) identifies its bytes exactly.
+    match = _DIGEST_RE.search(os.path.basename(name)) if is_immutable(name) else None
+    if match:
+        suffix = os.path.splitext(name)[0].rsplit(match.group(1), 1)[1]
+        return f'"{match.group(1)}{suffix}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+
+def parse_range(header, size):
+    """``(start, end)`` inclusive for a single satisfiable range, 'unsatisfiable', or None to send everything."""
+    match = _RANGE_RE.match((header or '').replace(' ', ''))
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size:
+            return 'unsatisfiable'
+        if end < start:
+            return None
+    elif last:
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        start, end = max(size - length, 0), size - 1
+    else:
+        return None
+    return start, end
+
+
+def _file_slice(fh, start, length):
+    try:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+@require_safe
+def serve_media(request, path):
+    name = os.path.normpath(path).replace('\\', '/').lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path")
+    if not os.path.isfile(full_path) or not can_access(request, name):
+        # Private files the caller may not see are reported as missing.
+        raise Http404("File not found")
+
+    stat = os.stat(full_path)
+    etag = etag_for(name, stat)
+    if is_private(name):
+        cache_control = PRIVATE_CACHE
+    elif is_immutable(name):
+        cache_control = IMMUTABLE_CACHE
+    else:
+        cache_control = DEFAULT_CACHE
+    headers = {
+        'ETag': etag,
+        'Cache-Control': cache_control,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if _etag_matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    accel = getattr(settings, 'MEDIA_ACCEL', None)
+    if accel:
+        # The web server streams the file and handles Range itself.
+        response = HttpResponse(content_type=content_type)
+        if accel == 'x-accel':
+            prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + name
+        else:
+            response['X-Sendfile'] = full_path
+    else:
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if 'Range' in request.headers and (not if_range or if_range.strip() == etag):
+            byte_range = parse_range(request.headers['Range'], stat.st_size)
+
+        if byte_range == 'unsatisfiable':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        elif byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _file_slice(open(full_path, 'rb'), start, length),
+                status=206, content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(length)
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
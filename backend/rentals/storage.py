@@ -0,0 +1,93 @@
+"""
+Content-addressed file storage.
+
+Files are named by the SHA-256 of their bytes (``<prefix>/ab/abcdef….jpg``), so
+uploading the same photo twice stores it once. Which rows use a blob is tracked
+in ``MediaBlob.ref_count`` (see rentals.media), and ``manage.py gc_media``
+removes blobs nothing references any more.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible(path='rentals.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that ignores the upload name and stores by content hash."""
+
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, prefix='cas', **kwargs):
+        self.prefix = prefix
+        super().__init__(**kwargs)
+
+    def blob_name(self, digest, ext):
+        return f'{self.prefix}/{digest[:2]}/{digest}{ext}'
+
+    def is_blob(self, name):
+        return bool(name) and name.startswith(f'{self.prefix}/')
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is the content hash, decided in _save().
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()
+        staging_dir = self.path(self.prefix)
+        os.makedirs(staging_dir, exist_ok=True)
+
+        # Hash while streaming to a temp file in the same filesystem, then rename:
+        # one pass over the upload, and concurrent identical uploads can't collide.
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=staging_dir, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            return self._move_into_place(tmp_path, digest.hexdigest(), ext)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def adopt(self, path, original_name):
+        """
+        Move an already-written file (e.g. an assembled chunked upload) into the
+        store without copying it: hash it in place, then rename.
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(self.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return self._move_into_place(path, digest.hexdigest(), os.path.splitext(original_name)[1].lower())
+
+    def _move_into_place(self, tmp_path, digest, ext):
+        name = self.blob_name(digest, ext)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            os.unlink(tmp_path)  # Duplicate upload: keep the existing blob
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+            shutil.move(tmp_path, full_path)  # A rename unless staging is on another filesystem
+        return name
+
+
+public_media_storage = ContentAddressedStorage(prefix='cas')
+kyc_media_storage = ContentAddressedStorage(prefix='kyc/cas')
+
+
+def get_public_media_storage():
+    return public_media_storage
+
+
+def get_kyc_media_storage():
+    return kyc_media_storage
@@ -0,0 +1,63 @@
+"""
+Background job handlers for the rentals app (see rentals.jobs).
+"""
+import logging
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from .jobs import job
+from .models import OwnerRegistrationRequest, RentalShop, UserProfile, apply_shop_rating_delta
+
+logger = logging.getLogger(__name__)
+
+
+@job('shops.apply_rating_delta')
+def shop_rating_delta(shop_id, sum_delta, count_delta, decayed_sum_delta=0.0, weight_delta=0.0):
+    # Not idempotent by itself: applied exactly once because run_job deletes the
+    # job in this transaction, and only while the worker still holds it.
+    apply_shop_rating_delta(shop_id, sum_delta, count_delta, decayed_sum_delta, weight_delta)
+
+
+@job('owners.provision_account')
+def provision_owner_account(registration_id):
+    """
+    Create the user, profile and shop for an approved registration request.
+    Fails, rather than taking it over, if another account signed up with the
+    registration's email since approval.
+    """
+    reg_request = OwnerRegistrationRequest.objects.get(pk=registration_id, status='approved')
+
+    existing = User.objects.filter(Q(username=reg_request.email) | Q(email__iexact=reg_request.email)).first()
+    if existing is not None:
+        # A second job for the same approval finds the account the first one made
+        if existing.password == reg_request.password_hash and RentalShop.objects.filter(owner__user=existing).exists():
+            logger.info("Owner account for registration #%s already exists", registration_id)
+            return
+        raise ValueError(f"User #{existing.pk} already uses {reg_request.email}; "
+                         f"registration #{registration_id} needs a different email")
+
+    name_parts = reg_request.owner_name.split(' ', 1) if reg_request.owner_name else ["", ""]
+    user = User.objects.create(
+        username=reg_request.email,
+        email=reg_request.email,
+        first_name=name_parts[0],
+        last_name=name_parts[1] if len(name_parts) > 1 else '',
+        # The owner chose a password at registration; keep its hash.
+        password=reg_request.password_hash,
+        is_active=True,
+    )
+
+    profile, _ = UserProfile.objects.get_or_create(user=user)
+    profile.role = 'owner'
+    profile.phone = reg_request.phone
+    profile.save()
+
+    RentalShop.objects.create(
+        owner=profile,
+        name=reg_request.shop_name,
+        address="Pending Address",
+        latitude=0,
+        longitude=0
+    )
+    logger.info("Provisioned owner account for registration #%s", registration_id)
@@ -1,3 +1,1147 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from rentals import routing
+from rentals.holds import sweep_expired_holds
+from rentals.inbox import READ_RETENTION, UNREAD_RETENTION, prune, recount, unread_count
+from rentals.jobs import claim_jobs, enqueue, job, release_stale_jobs, run_job, run_worker
+from rentals.lifecycle import NO_SHOW_GRACE, expire_no_shows, refresh_rank_scores
+from rentals.media import image_sources
+from rentals.models import (
+    Booking, BookingHold, BookingReminder, ChunkedUpload, DeliveryZone, Job, KYCDocument, MediaBlob, Notification,
+    NotificationCounter, OwnerRegistrationRequest, PricingRule, PromoCode, RentalShop, Review, UserSettings, Vehicle,
+    VehicleFeature,
+)
+from rentals.notifications import FakeChannel, NotificationChannel, notify, notify_each, queue_notification
+from rentals.pricing import (
+    Geocoder, PricingError, delivery_quote, find_promo, invalidate_zones, price_rental, redeem_promo, rule_sets,
+)
+from rentals.ranking import PRIOR_MEAN, PRIOR_WEIGHT, rank_score
+from rentals.reminders import send_due_reminders
+from rentals.storage import kyc_media_storage, public_media_storage
+
+
+def write_osm(xml):
+    """Path of a temporary OSM XML file holding ``xml``."""
+    fd, path = tempfile.mkstemp(suffix='.osm')
+    with os.fdopen(fd, 'w') as fh:
+        fh.write(f'<?xml version="1.0"?>\n<osm>{xml}</osm>\n')
+    return path
+
+
+def make_user(username='customer', **kwargs):
+    return User.objects.create_user(username=username, password='secret', **kwargs)
+
+
+def make_shop(name='Shop', **kwargs):
+    fields = dict(address='1 Main St', latitude=12.97, longitude=77.59)
+    fields.update(kwargs)
+    return RentalShop.objects.create(name=name, **fields)
+
+
+def make_verified_customer(username='customer'):
+    user = make_user(username)
+    KYCDocument.objects.create(user=user, status='verified')
+    return user
+
+
+def next_weekday(weekday, hour=10):
+    """The next ``weekday`` (0 = Monday) after today at ``hour`` o'clock."""
+    today = timezone.localtime().replace(hour=hour, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+
+
+def make_staff(shop, username='driver'):
+    user = make_user(username)
+    user.user_profile.role = 'staff'
+    user.user_profile.shop = shop
+    user.user_profile.save()
+    return user
+
+
+def make_vehicle(shop, **kwargs):
+    fields = dict(type='car', name='City Car', brand='Maruti', model='Swift', number='KA01AB1234',
+                  price_per_hour=100, price_per_day=1000, fuel_type='petrol', transmission='manual')
+    fields.update(kwargs)
+    return Vehicle.objects.create(shop=shop, **fields)
+
+
+def make_booking(user, vehicle, start=None, hours=4, **kwargs):
+    start = start or timezone.now() + timedelta(days=1)
+    return Booking.objects.create(
+        user=user, vehicle=vehicle, shop=vehicle.shop, start_date=start, end_date=start + timedelta(hours=hours),
+        duration=hours, total_price=100 * hours, payment_method='card', **kwargs,
+    )
+
+
+class TempMediaMixin:
+    """Store uploads under a throwaway MEDIA_ROOT (and upload staging directory)."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=self.media_root, UPLOAD_STAGING_ROOT=os.path.join(self.media_root, '.staging'),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+def run_jobs():
+    return run_worker(worker_id='test', once=True)
+
+
+# ── Routing (user-046) ────────────────────────────────────────────────────────
+
+class RoutingTests(TestCase):
+    ROADS = (
+        '<node id="1" lat="0.0" lon="0.0"/><node id="2" lat="0.0" lon="0.001"/>'
+        '<node id="3" lat="0.0" lon="0.002"/><node id="4" lat="1.0" lon="1.0"/><node id="5" lat="1.0" lon="1.001"/>'
+        '<way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="residential"/></way>'
+        '<way id="11"><nd ref="4"/><nd ref="5"/><tag k="highway" v="residential"/></way>'
+    )
+
+    def setUp(self):
+        cache.clear()
+
+    def osm(self, xml):
+        path = write_osm(xml)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def graph(self, xml):
+        return routing.RoadGraph(routing.build_graph(self.osm(xml)), version='test')
+
+    def test_build_graph_keeps_largest_component(self):
+        self.assertEqual(len(self.graph(self.ROADS)), 3)
+
+    def test_build_graph_without_roads_is_empty(self):
+        self.assertEqual(len(routing.build_graph(self.osm('<node id="1" lat="0" lon="0"/>'))['lat']), 0)
+
+    def test_command_reports_extract_without_roads(self):
+        with self.assertRaisesMessage(CommandError, "no drivable roads"):
+            call_command('build_routing_graph', self.osm('<node id="1" lat="0" lon="0"/>'), output=os.devnull)
+
+    def test_route_adds_access_legs_per_call(self):
+        graph = self.graph(self.ROADS)
+        with mock.patch.object(routing, 'get_graph', return_value=graph):
+            first = routing.route((0.0001, 0.0), (0.0, 0.0021))
+            second = routing.route((0.0002, 0.0), (0.0, 0.0021))
+        self.assertEqual(first.source, 'graph')
+        self.assertEqual(first.coordinates[0], [0.0, 0.0001])
+        self.assertEqual(second.coordinates[0], [0.0, 0.0002])
+        self.assertGreater(second.distance_km, first.distance_km)
+        # Only the node path is cached, not the caller's endpoints
+        nodes, metres, seconds = cache.get('route:test:0:2')
+        self.assertEqual(nodes, [0, 1, 2])
+
+    def test_route_without_graph_is_straight_line(self):
+        with mock.patch.object(routing, 'get_graph', return_value=None):
+            result = routing.route((0.0, 0.0), (0.0, 0.01))
+        self.assertEqual(result.source, 'haversine')
+        self.assertAlmostEqual(result.distance_km, 1.11, places=2)
+
+
+# ── Ratings and rank score (user-027, user-028) ───────────────────────────────
+
+class RatingTests(TestCase):
+    def setUp(self):
+        self.shop = make_shop()
+
+    def test_reviews_shift_totals_through_jobs(self):
+        first = Review.objects.create(user=make_user('a'), shop=self.shop, rating=5, comment='great')
+        Review.objects.create(user=make_user('b'), shop=self.shop, rating=2, comment='meh')
+        self.shop.refresh_from_db()
+        self.assertEqual(self.shop.review_count, 0)  # applied by the worker, not the request
+
+        run_jobs()
+        self.shop.refresh_from_db()
+        self.assertEqual((self.shop.rating_sum, self.shop.review_count, self.shop.rating), (7, 2, 3.5))
+
+        first.rating = 3
+        first.save()
+        first.delete()
+        run_jobs()
+        self.shop.refresh_from_db()
+        self.assertEqual((self.shop.rating_sum, self.shop.review_count, self.shop.rating), (2, 1, 2.0))
+
+    def test_reply_only_save_queues_nothing(self):
+        review = Review.objects.create(user=make_user(), shop=self.shop, rating=4, comment='ok')
+        run_jobs()
+        review.owner_reply = 'thanks'
+        review.save(update_fields=['owner_reply'])
+        self.assertEqual(run_jobs(), 0)
+
+    def test_rank_score_is_bayesian_average(self):
+        self.assertEqual(rank_score(0.0, 0.0), PRIOR_MEAN)
+        one_fresh = rank_score(5.0, 1.0, timezone.now())
+        many_good = rank_score(4.8 * 200, 200.0, timezone.now())
+        self.assertLess(one_fresh, many_good)
+
+    def test_rank_score_decays_towards_prior(self):
+        for n in range(3):
+            Review.objects.create(user=make_user(f'u{n}'), shop=self.shop, rating=5, comment='great')
+        run_jobs()
+        self.shop.refresh_from_db()
+        now = timezone.now()
+        self.assertAlmostEqual(self.shop.rank_score, (PRIOR_WEIGHT * PRIOR_MEAN + 15) / (PRIOR_WEIGHT + 3), places=3)
+        later = rank_score(self.shop.decayed_rating_sum, self.shop.decayed_review_weight, now + timedelta(days=720))
+        self.assertLess(later, self.shop.rank_score)
+        self.assertGreater(later, PRIOR_MEAN)
+
+
+class RefreshRankScoresTests(TestCase):
+    def setUp(self):
+        self.shops = [make_shop(f'Shop {n}', decayed_rating_sum=5.0, decayed_review_weight=1.0) for n in range(3)]
+        make_shop('Unreviewed')
+        self.now = timezone.now()
+        refresh_rank_scores(self.now)
+
+    def test_unchanged_scores_are_not_rewritten(self):
+        self.assertEqual(refresh_rank_scores(self.now + timedelta(minutes=5)), 0)
+
+    def test_drifted_scores_are_rewritten_in_batches(self):
+        later = self.now + timedelta(days=365)
+        with self.assertNumQueries(5):  # two batches of ids + updates, then an empty one
+            self.assertEqual(refresh_rank_scores(later, batch_size=2), 3)
+        expected = rank_score(5.0, 1.0, later)
+        for shop in self.shops:
+            shop.refresh_from_db()
+            self.assertAlmostEqual(shop.rank_score, expected, places=6)
+        self.assertEqual(RentalShop.objects.get(name='Unreviewed').rank_score, PRIOR_MEAN)
+
+
+# ── No-shows (user-039) ───────────────────────────────────────────────────────
+
+class NoShowTests(TestCase):
+    def setUp(self):
+        from staff.models import StaffTask
+
+        self.StaffTask = StaffTask
+        self.shop = make_shop()
+        self.vehicle = make_vehicle(self.shop)
+        self.customer = make_user()
+        self.driver = make_staff(self.shop)
+        self.now = timezone.now()
+        self.booking = make_booking(self.customer, self.vehicle, start=self.now - NO_SHOW_GRACE - timedelta(minutes=1))
+
+    def open_tasks(self):
+        self.driver.workload.refresh_from_db()
+        return self.driver.workload.open_tasks
+
+    def test_unstarted_booking_is_cancelled_and_vehicle_released(self):
+        self.assertEqual(expire_no_shows(self.now), 1)
+        self.booking.refresh_from_db()
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.booking.status, 'cancelled')
+        self.assertTrue(self.vehicle.is_available)
+        self.assertEqual(expire_no_shows(self.now), 0)
+
+    def test_booking_within_grace_is_kept(self):
+        self.assertEqual(expire_no_shows(self.now - timedelta(minutes=2)), 0)
+
+    def test_booking_with_open_task_is_kept(self):
+        task = self.StaffTask.objects.create(staff=self.driver, booking=self.booking, type='delivery',
+                                             scheduled_time=self.booking.start_date, status='in_progress')
+        self.assertEqual(expire_no_shows(self.now), 0)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'upcoming')
+
+        task.status = 'completed'
+        task.save()
+        self.assertEqual(expire_no_shows(self.now), 1)
+
+    def test_cancel_drops_open_tasks(self):
+        self.StaffTask.objects.create(staff=self.driver, booking=self.booking, type='delivery',
+                                      scheduled_time=self.booking.start_date)
+        self.assertEqual(self.open_tasks(), 1)
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        response = client.post(f'/api/bookings/{self.booking.id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.StaffTask.objects.exists())
+        self.assertEqual(self.open_tasks(), 0)
+
+
+# ── Reminders (user-040) ──────────────────────────────────────────────────────
+
+# No road graph: the shop's delivery zone job runs along with the notification jobs
+@override_settings(NOTIFICATION_CHANNELS=['rentals.notifications.FakeChannel'], ROUTING_GRAPH_PATH=None)
+class ReminderTests(TestCase):
+    def setUp(self):
+        FakeChannel.outbox.clear()
+        self.customer = make_user()
+        self.vehicle = make_vehicle(make_shop())
+        self.now = timezone.now()
+
+    def send(self, now=None, **kwargs):
+        sent = send_due_reminders(now or self.now, **kwargs)
+        run_jobs()
+        return sent
+
+    def kinds(self):
+        # Booking status notifications go through the outbox too
+        kinds = sorted(d.data['reminder'] for d in FakeChannel.outbox if 'reminder' in d.data)
+        FakeChannel.outbox.clear()
+        return kinds
+
+    def test_each_reminder_is_sent_once(self):
+        booking = make_booking(self.customer, self.vehicle, start=self.now + timedelta(hours=20), payment_status='paid')
+        self.assertEqual(self.send(), 1)
+        self.assertEqual(self.kinds(), ['start_24h'])
+        self.assertEqual(self.send(), 0)
+
+        later = self.now + timedelta(hours=19)
+        self.assertEqual(self.send(later), 1)
+        self.assertEqual(self.kinds(), ['start_2h'])
+        self.assertEqual(BookingReminder.objects.filter(booking=booking).count(), 2)
+
+    def test_only_the_closest_reminder_fires(self):
+        make_booking(self.customer, self.vehicle, start=self.now + timedelta(hours=1))
+        self.send()
+        self.assertEqual(self.kinds(), ['payment_due', 'start_2h'])
+
+    def test_rescheduling_rearms_the_reminder(self):
+        booking = make_booking(self.customer, self.vehicle, start=self.now + timedelta(hours=1), payment_status='paid')
+        self.send()
+        booking.start_date += timedelta(minutes=30)
+        booking.save()
+        self.send()
+        self.assertEqual(self.kinds(), ['start_2h', 'start_2h'])
+
+    def test_batches_and_disabled_reminders(self):
+        for hours in (1, 1.5, 2 - 0.1):
+            make_booking(self.customer, self.vehicle, start=self.now + timedelta(hours=hours))
+        with override_settings(BOOKING_REMINDER_LEADS={'payment_due': None}):
+            self.assertEqual(self.send(batch_size=2), 3)
+        self.assertEqual(self.kinds(), ['start_2h'] * 3)
+
+    def test_opted_out_users_are_skipped_at_delivery(self):
+        UserSettings.objects.create(user=self.customer, reminders=False)
+        make_booking(self.customer, self.vehicle, start=self.now + timedelta(hours=1))
+        self.assertEqual(self.send(), 2)
+        self.assertEqual(self.kinds(), ['payment_due'])
+
+
+# ── Job queue (user-035) ──────────────────────────────────────────────────────
+
+calls = []
+
+
+@job('tests.record')
+def record_call(value, fail=False):
+    calls.append((value, Job.objects.filter(payload__value=value).exists()))
+    if fail:
+        raise RuntimeError('boom')
+
+
+@job('tests.record_io', atomic=False)
+def record_io_call(value):
+    calls.append((value, Job.objects.filter(payload__value=value).exists()))
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_atomic_job_removes_itself_before_running(self):
+        enqueue('tests.record', value='a')
+        self.assertEqual(run_jobs(), 1)
+        self.assertEqual(calls, [('a', False)])
+        self.assertFalse(Job.objects.exists())
+
+    def test_io_job_runs_before_removal(self):
+        enqueue('tests.record_io', value='b')
+        self.assertEqual(run_jobs(), 1)
+        self.assertEqual(calls, [('b', True)])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failure_is_retried_with_backoff_then_kept(self):
+        record = enqueue('tests.record', max_attempts=2, value='c', fail=True)
+        with self.assertLogs('rentals.jobs', 'ERROR'):
+            run_jobs()
+        record.refresh_from_db()
+        self.assertEqual((record.status, record.attempts), ('pending', 1))
+        self.assertGreater(record.run_at, timezone.now())
+        self.assertIn('boom', record.last_error)
+
+        Job.objects.filter(pk=record.pk).update(run_at=timezone.now())
+        with self.assertLogs('rentals.jobs', 'ERROR'):
+            run_jobs()
+        record.refresh_from_db()
+        self.assertEqual((record.status, record.attempts), ('failed', 2))
+        self.assertEqual(len(calls), 2)
+
+    def test_taken_over_job_runs_once(self):
+        enqueue('tests.record', value='d')
+        [stale] = claim_jobs('worker-a')
+        self.assertEqual(release_stale_jobs(timeout=timedelta(0)), 1)
+        [fresh] = claim_jobs('worker-b')
+
+        with self.assertLogs('rentals.jobs', 'WARNING'):
+            self.assertFalse(run_job(stale))
+        self.assertTrue(run_job(fresh))
+        self.assertEqual(calls, [('d', False)])
+
+    def test_unknown_job_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue('tests.missing')
+
+
+class ProvisionOwnerTests(TestCase):
+    def setUp(self):
+        self.registration = OwnerRegistrationRequest.objects.create(
+            owner_name='Asha Rao', shop_name='Asha Rentals', email='asha@example.com', phone='9000000000',
+            password_hash='pbkdf2_sha256$1$salt$hash', status='approved', is_approved=True,
+        )
+
+    def provision(self):
+        return enqueue('owners.provision_account', max_attempts=1, registration_id=self.registration.id)
+
+    def test_creates_owner_and_shop(self):
+        self.provision()
+        self.provision()
+        run_jobs()
+        user = User.objects.get(username='asha@example.com')
+        self.assertEqual(user.user_profile.role, 'owner')
+        self.assertEqual(user.password, self.registration.password_hash)
+        self.assertEqual(list(RentalShop.objects.filter(owner__user=user).values_list('name', flat=True)),
+                         ['Asha Rentals'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_does_not_take_over_existing_user(self):
+        other = make_user('someone', email='ASHA@example.com')
+        record = self.provision()
+        with self.assertLogs('rentals.jobs', 'ERROR'):
+            run_jobs()
+        record.refresh_from_db()
+        self.assertEqual(record.status, 'failed')
+        other.refresh_from_db()
+        self.assertEqual(other.user_profile.role, 'user')
+        self.assertFalse(RentalShop.objects.exists())
+
+
+# ── Notifications (user-036) ──────────────────────────────────────────────────
+
+class PushOnlyChannel(NotificationChannel):
+    """A FakeChannel that, like push, honours ``push_notifications``."""
+
+    preference = 'push_notifications'
+    outbox = []
+
+    def deliver(self, deliveries):
+        PushOnlyChannel.outbox.extend(deliveries)
+
+
+@override_settings(NOTIFICATION_CHANNELS=['rentals.notifications.FakeChannel', 'rentals.tests.PushOnlyChannel'])
+class NotificationTests(TestCase):
+    def setUp(self):
+        FakeChannel.outbox.clear()
+        PushOnlyChannel.outbox.clear()
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        UserSettings.objects.create(user=self.bob, promotions=False, push_notifications=False)
+
+    def test_opted_out_users_are_skipped(self):
+        count = notify('promo', 'Offer', 'Half price', user_ids=[self.alice.id, self.bob.id])
+        self.assertEqual(count, 1)
+        self.assertEqual([d.user_id for d in FakeChannel.outbox], [self.alice.id])
+        self.assertEqual(FakeChannel.outbox[0].type, 'promo')
+
+    def test_channel_preference_is_per_channel(self):
+        notify('system', 'Maintenance', 'Tonight', user_ids=[self.alice.id, self.bob.id])
+        self.assertEqual(sorted(d.user_id for d in FakeChannel.outbox), [self.alice.id, self.bob.id])
+        self.assertEqual([d.user_id for d in PushOnlyChannel.outbox], [self.alice.id])
+
+    def test_audience_and_inactive_users(self):
+        staff = make_staff(make_shop())
+        self.alice.is_active = False
+        self.alice.save()
+        self.assertEqual(notify('system', 'Hi', 'All customers', audience='customers'), 1)
+        self.assertEqual([d.user_id for d in FakeChannel.outbox], [self.bob.id])
+        with self.assertRaises(ValueError):
+            notify('system', 'Hi', 'Both', user_ids=[staff.id], audience='staff')
+
+    def test_notify_each_sends_each_recipient_their_own_message(self):
+        count = notify_each('reminder', [
+            (self.alice.id, 'Pickup soon', 'Car A', None),
+            (self.bob.id, 'Pickup soon', 'Car B', None),
+        ])
+        self.assertEqual(count, 2)
+        self.assertEqual(sorted(d.message for d in FakeChannel.outbox), ['Car A', 'Car B'])
+
+    def test_fan_out_runs_in_the_worker(self):
+        Job.objects.all().delete()
+        queue_notification('kyc_decision', 'KYC Approved', 'Welcome', user_ids=[self.alice.id])
+        self.assertEqual(FakeChannel.outbox, [])
+        run_jobs()
+        self.assertEqual([(d.user_id, d.title) for d in FakeChannel.outbox], [(self.alice.id, 'KYC Approved')])
+        with self.assertRaises(ValueError):
+            queue_notification('unknown', 'Title', 'Message', user_ids=[self.alice.id])
+
+
+# ── Notification inbox (user-037) ─────────────────────────────────────────────
+
+class InboxTests(TestCase):
+    def setUp(self):
+        self.user = make_user('alice')
+        Notification.objects.filter(user=self.user).delete()
+        NotificationCounter.objects.filter(user=self.user).delete()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ids = [
+            Notification.objects.create(user=self.user, title=f'N{i}', message='…', type='system').id
+            for i in range(4)
+        ]
+
+    def count(self):
+        return self.client.get('/api/notifications/unread-count/').data['unread_count']
+
+    def test_counter_follows_inserts_and_fan_out(self):
+        self.assertEqual(self.count(), 4)
+        notify('system', 'Hello', 'Fan-out', user_ids=[self.user.id])
+        self.assertEqual(self.count(), 5)
+
+    def test_mark_read_moves_counter_once(self):
+        url = f'/api/notifications/mark-read/{self.ids[0]}/'
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(self.count(), 3)
+
+        response = self.client.post('/api/notifications/mark-all-read/', {'ids': self.ids[:2]}, format='json')
+        self.assertEqual((response.data['updated'], response.data['unread_count']), (1, 2))
+        response = self.client.post('/api/notifications/mark-all-read/', {}, format='json')
+        self.assertEqual((response.data['updated'], response.data['unread_count']), (2, 0))
+        self.assertEqual(self.client.post('/api/notifications/mark-all-read/', {'ids': 'x'}, format='json').status_code, 400)
+
+    def test_bulk_delete(self):
+        self.client.post(f'/api/notifications/mark-read/{self.ids[0]}/')
+        response = self.client.post('/api/notifications/bulk-delete/', {'read': True}, format='json')
+        self.assertEqual((response.data['deleted'], response.data['unread_count']), (1, 3))
+        response = self.client.post('/api/notifications/bulk-delete/', {'ids': self.ids[1:3]}, format='json')
+        self.assertEqual((response.data['deleted'], response.data['unread_count']), (2, 1))
+        self.assertEqual(self.client.delete(f'/api/notifications/delete/{self.ids[3]}/').status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/notifications/delete/{self.ids[3]}/').status_code, 404)
+        self.assertEqual(self.count(), 0)
+
+    def test_other_users_notifications_are_untouched(self):
+        other = APIClient()
+        other.force_authenticate(make_user('bob'))
+        self.assertEqual(other.post(f'/api/notifications/mark-read/{self.ids[0]}/').status_code, 404)
+        other.post('/api/notifications/bulk-delete/', {'ids': self.ids}, format='json')
+        self.assertEqual(self.count(), 4)
+
+    def test_prune_and_recount(self):
+        now = timezone.now()
+        Notification.objects.filter(id=self.ids[0]).update(is_read=True, created_at=now - READ_RETENTION - timedelta(days=1))
+        Notification.objects.filter(id=self.ids[1]).update(created_at=now - READ_RETENTION - timedelta(days=1))
+        Notification.objects.filter(id=self.ids[2]).update(created_at=now - UNREAD_RETENTION - timedelta(days=1))
+        # The read row was marked read behind the counter's back.
+        self.assertEqual(prune(now), 2)
+        self.assertEqual(unread_count(self.user), 3)
+
+        recount()
+        self.assertEqual(unread_count(self.user), 2)
+
+
+# ── Full-text search (user-029) ───────────────────────────────────────────────
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.shop = make_shop('Lakeside Motors', address='12 Lake Road, Indiranagar')
+        self.honda = make_vehicle(self.shop, name='Activa', brand='Honda', model='6G', type='bike')
+        self.swift = make_vehicle(self.shop, name='City Car', brand='Maruti', model='Swift', number='KA01AB9999')
+
+    def search(self, q):
+        response = self.client.get('/api/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_finds_shops_and_vehicles_by_indexed_fields(self):
+        self.assertEqual([s['id'] for s in self.search('indiranagar')['shops']], [self.shop.id])
+        self.assertEqual([v['id'] for v in self.search('honda')['vehicles']], [self.honda.id])
+        self.assertEqual([v['id'] for v in self.search('maruti swi')['vehicles']], [self.swift.id])
+
+    def test_misspelt_terms_are_corrected(self):
+        data = self.search('hunda')
+        self.assertEqual([v['id'] for v in data['vehicles']], [self.honda.id])
+        self.assertEqual(data['corrections'], {'hunda': ['honda']})
+
+    def test_index_follows_renames_features_and_deletes(self):
+        self.honda.brand = 'Hero'
+        self.honda.save()
+        self.assertEqual(self.search('honda')['vehicles'], [])
+        self.assertEqual(len(self.search('hero')['vehicles']), 1)
+
+        VehicleFeature.objects.create(vehicle=self.swift, feature_name='Bluetooth')
+        self.assertEqual([v['id'] for v in self.search('bluetooth')['vehicles']], [self.swift.id])
+
+        self.shop.delete()
+        data = self.search('lakeside swift')
+        self.assertEqual((data['shops'], data['vehicles']), ([], []))
+
+    def test_shops_of_deactivated_owners_are_hidden(self):
+        owner = make_user('owner')
+        self.shop.owner = owner.user_profile
+        self.shop.save()
+        owner.is_active = False
+        owner.save()
+        self.assertEqual(self.search('lakeside')['shops'], [])
+
+
+# ── Vehicle facets (user-030) ─────────────────────────────────────────────────
+
+class FacetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        shop = make_shop()
+        self.car = make_vehicle(shop, type='car', fuel_type='petrol', price_per_hour=100)
+        self.diesel = make_vehicle(shop, type='car', fuel_type='diesel', price_per_hour=150, number='KA02')
+        self.bike = make_vehicle(shop, type='bike', fuel_type='petrol', price_per_hour=40, number='KA03')
+        for vehicle in (self.car, self.diesel):
+            VehicleFeature.objects.create(vehicle=vehicle, feature_name='AC')
+        VehicleFeature.objects.create(vehicle=self.car, feature_name='GPS')
+
+    def vehicles(self, **params):
+        response = self.client.get('/api/vehicles/', {'facets': '1', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def ids(self, **params):
+        return sorted(v['id'] for v in self.vehicles(**params)['results'])
+
+    def counts(self, facets, dimension):
+        return {item['value']: item['count'] for item in facets[dimension]}
+
+    def test_filters_or_within_and_across_dimensions(self):
+        self.assertEqual(self.ids(type='car,bike'), sorted([self.car.id, self.diesel.id, self.bike.id]))
+        self.assertEqual(self.ids(type='car', fuel_type='petrol'), [self.car.id])
+        self.assertEqual(self.ids(features='ac,gps'), [self.car.id])
+        self.assertEqual(self.ids(max_price_per_hour='100'), sorted([self.car.id, self.bike.id]))
+
+    def test_counts_ignore_their_own_dimension(self):
+        facets = self.vehicles(type='car', fuel_type='petrol')['facets']
+        # type counts apply only the fuel filter, fuel counts only the type filter
+        self.assertEqual(self.counts(facets, 'type'), {'car': 1, 'bike': 1})
+        self.assertEqual(self.counts(facets, 'fuel_type'), {'petrol': 1, 'diesel': 1})
+        self.assertEqual(self.counts(facets, 'features'), {'AC': 1, 'GPS': 1})
+        self.assertEqual(facets['price_per_hour'], {'min': Decimal('100'), 'max': Decimal('100')})
+
+    def test_unfiltered_price_bounds(self):
+        facets = self.vehicles()['facets']
+        self.assertEqual(facets['price_per_hour'], {'min': Decimal('40'), 'max': Decimal('150')})
+        self.assertEqual(self.counts(facets, 'features'), {'AC': 2, 'GPS': 1})
+
+
+# ── Image variants (user-031) ─────────────────────────────────────────────────
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(buffer, format='PNG')
+    return ContentFile(buffer.getvalue())
+
+
+class ImageVariantTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.shop = make_shop()
+        Job.objects.all().delete()
+
+    def upload(self, width=800, height=400):
+        self.shop.image.save('front.png', png(width, height))
+        run_jobs()
+        self.shop.refresh_from_db()
+        return self.shop.image_variants
+
+    def test_variants_are_rendered_in_the_worker(self):
+        self.shop.image.save('front.png', png(800, 400))
+        self.assertEqual(Job.objects.get().name, 'media.render_variants')
+        self.assertEqual(self.shop.image_variants, {})
+        run_jobs()
+        self.shop.refresh_from_db()
+        variants = self.shop.image_variants
+        self.assertEqual(variants['source'], self.shop.image.name)
+        # Never upscaled: 1280 collapses into the 800 px original width
+        self.assertEqual(sorted(variants['jpeg'], key=int), ['320', '640', '800'])
+        self.assertEqual(sorted(variants['webp'], key=int), ['320', '640', '800'])
+        for name in [*variants['jpeg'].values(), *variants['webp'].values()]:
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, name)), name)
+        with Image.open(os.path.join(self.media_root, variants['jpeg']['320'])) as image:
+            self.assertEqual(image.size, (320, 160))
+
+    def test_saves_without_a_new_image_queue_nothing(self):
+        self.upload()
+        self.shop.name = 'Renamed'
+        self.shop.save()
+        self.assertFalse(Job.objects.exists())
+
+    def test_sources_ignore_variants_of_a_replaced_image(self):
+        variants = self.upload()
+        sources = image_sources(self.shop.image, variants)
+        self.assertIn('320w', sources['srcset'])
+        self.assertTrue(sources['thumbnail'].endswith('_320w.jpg'))
+
+        self.shop.image.save('back.png', png(500, 500))
+        sources = image_sources(self.shop.image, variants)
+        self.assertEqual((sources['srcset'], sources['thumbnail']), ('', sources['src']))
+
+
+# ── Content-addressed media (user-032) ────────────────────────────────────────
+
+class MediaStoreTests(TempMediaMixin, TestCase):
+    def upload(self, user, content=b'licence scan'):
+        document, _ = KYCDocument.objects.get_or_create(user=user)
+        document.driving_license_photo.save('licence.jpg', ContentFile(content))
+        return document
+
+    def refs(self, name):
+        return MediaBlob.objects.get(name=name).ref_count
+
+    def gc(self):
+        call_command('gc_media', grace_hours=0, stdout=io.StringIO())
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(make_user('a'))
+        second = self.upload(make_user('b'))
+        name = first.driving_license_photo.name
+        self.assertEqual(second.driving_license_photo.name, name)
+        self.assertTrue(name.startswith('kyc/cas/'))
+        self.assertEqual(self.refs(name), 2)
+
+        second.delete()
+        self.assertEqual(self.refs(name), 1)
+        self.gc()
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+
+    def test_unreferenced_blob_is_collected(self):
+        document = self.upload(make_user())
+        old = document.driving_license_photo.name
+        self.upload(document.user, b'new scan')
+        document.refresh_from_db()
+        self.assertNotEqual(document.driving_license_photo.name, old)
+        self.assertEqual(self.refs(old), 0)
+
+        self.gc()
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, old)))
+        self.assertFalse(MediaBlob.objects.filter(name=old).exists())
+        self.assertTrue(os.path.exists(document.driving_license_photo.path))
+
+    def test_gc_rechecks_references(self):
+        document = self.upload(make_user())
+        name = document.driving_license_photo.name
+        MediaBlob.objects.filter(name=name).update(ref_count=0)  # e.g. drifted through a bulk update
+        self.gc()
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
+
+
+# ── Media serving (user-033) ──────────────────────────────────────────────────
+
+class ServeMediaTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.name = public_media_storage.save('notes.txt', ContentFile(b'0123456789'))
+        self.url = f'/media/{self.name}'
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_blobs_are_immutable_with_digest_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        digest = os.path.splitext(os.path.basename(self.name))[0]
+        self.assertEqual(response['ETag'], f'"{digest}"')
+        self.assertEqual(self.content(response), b'0123456789')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"other", "{digest}"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(self.content(response), b'234')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(self.content(response), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+        # A stale If-Range validator gets the whole file
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_private_documents_only_reach_their_owner_and_admins(self):
+        owner = make_user('owner')
+        document = KYCDocument.objects.create(user=owner)
+        document.driving_license_photo.save('licence.jpg', ContentFile(b'scan'))
+        url = f'/media/{document.driving_license_photo.name}'
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+        other = Token.objects.create(user=make_user('other'))
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=f'Token {other.key}').status_code, 404)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=owner).key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_paths_outside_media_root_are_missing(self):
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+
+
+# ── Chunked uploads (user-034) ────────────────────────────────────────────────
+
+class ChunkedUploadTests(TempMediaMixin, TestCase):
+    DATA = b'%PDF-1.4 scanned licence'
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start(self, client=None, purpose='kyc'):
+        response = (client or self.client).post(
+            '/api/uploads/', {'purpose': purpose, 'filename': 'licence.pdf', 'size': len(self.DATA)}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return f"/api/uploads/{response.data['id']}/"
+
+    def patch(self, url, offset, data, client=None):
+        return (client or self.client).generic(
+            'PATCH', url, data, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_upload_resumes_from_reported_offset(self):
+        url = self.start()
+        self.assertEqual(self.patch(url, 0, self.DATA[:10]).data['offset'], 10)
+
+        # A retry of the first chunk is rejected with the resume point
+        response = self.patch(url, 0, self.DATA[:10])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '10')
+        self.assertEqual(self.client.get(url).data['offset'], 10)
+
+        response = self.patch(url, 10, self.DATA[10:])
+        self.assertEqual(response.data['status'], 'complete')
+        upload = ChunkedUpload.objects.get()
+        self.assertTrue(upload.file_name.startswith('kyc/cas/'))
+        with kyc_media_storage.open(upload.file_name) as fh:
+            self.assertEqual(fh.read(), self.DATA)
+
+        self.assertEqual(self.patch(url, len(self.DATA), b'x').status_code, 409)
+
+    def test_oversized_chunk_is_rejected(self):
+        url = self.start()
+        self.assertEqual(self.patch(url, 0, self.DATA + b'extra').status_code, 400)
+
+    def test_chunk_being_written_blocks_a_racing_request(self):
+        url = self.start()
+        ChunkedUpload.objects.update(status='writing', updated_at=timezone.now())
+        self.assertEqual(self.patch(url, 0, self.DATA[:10]).status_code, 409)
+
+    def test_uploads_belong_to_their_user(self):
+        url = self.start()
+        other = APIClient()
+        other.force_authenticate(make_user('other'))
+        self.assertEqual(other.get(url).status_code, 404)
+        self.assertEqual(self.patch(url, 0, self.DATA, client=other).status_code, 404)
+
+    def test_anonymous_uploads_belong_to_their_session(self):
+        anonymous = APIClient()
+        response = anonymous.post('/api/uploads/', {'purpose': 'kyc', 'filename': 'a.pdf', 'size': 1})
+        self.assertEqual(response.status_code, 401)
+
+        url = self.start(anonymous, purpose='owner_certificate')
+        self.assertEqual(anonymous.get(url).status_code, 200)
+        self.assertEqual(APIClient().get(url).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+# ── Delivery fees (user-047) ──────────────────────────────────────────────────
+
+KM = 1 / 111.195  # degrees of latitude per kilometre
+
+
+class NearbyGeocoder(Geocoder):
+    """Puts every address 5 km north of the test shop."""
+
+    def geocode(self, address):
+        return 12.97 + 5 * KM, 77.59
+
+
+@override_settings(ROUTING_GRAPH_PATH=None, DELIVERY_FEE_TIERS=[(3, 10), (7, 20), (15, 35)], DELIVERY_FEE_DEFAULT=10)
+class DeliveryFeeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_zones()
+        Job.objects.all().delete()
+        self.shop = make_shop()
+
+    def north(self, km, shop=None):
+        shop = shop or self.shop
+        return shop.latitude + km * KM, shop.longitude
+
+    def build(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            run_jobs()
+
+    def test_shop_zones_are_built_in_the_background(self):
+        self.assertEqual(Job.objects.get().name, 'pricing.build_zones')
+        self.build()
+        self.assertEqual(list(DeliveryZone.objects.values_list('max_distance_km', flat=True)), [3, 7, 15])
+
+        quotes = [delivery_quote(self.shop, self.north(km)) for km in (2, 5, 10, 20)]
+        self.assertEqual([(q.fee, q.zone_km) for q in quotes],
+                         [(Decimal('10'), 3), (Decimal('20'), 7), (Decimal('35'), 15), (None, None)])
+        self.assertFalse(quotes[-1].deliverable)
+        self.assertEqual(quotes[1].distance_km, 5)
+
+    def test_tiers_apply_as_circles_until_zones_exist(self):
+        quote = delivery_quote(self.shop, self.north(5))
+        self.assertEqual((quote.fee, quote.zone_km), (Decimal('20'), 7))
+        self.assertFalse(DeliveryZone.objects.exists())
+
+    def test_unlocated_points_pay_the_default_fee(self):
+        quote = delivery_quote(self.shop, None)
+        self.assertEqual((quote.fee, quote.deliverable, quote.located), (Decimal('10'), True, False))
+
+    def test_moving_a_shop_rebuilds_its_zones(self):
+        self.build()
+        self.shop.latitude += 1
+        self.shop.save()
+        self.build()
+        self.assertEqual(delivery_quote(self.shop, self.north(2)).zone_km, 3)
+        self.assertFalse(delivery_quote(self.shop, (self.shop.latitude - 1, self.shop.longitude)).deliverable)
+
+    def test_delivery_quote_endpoint(self):
+        self.build()
+        url = f'/api/shops/{self.shop.id}/delivery-quote/'
+        lat, lng = self.north(5)
+        response = APIClient().get(url, {'lat': lat, 'lng': lng})
+        self.assertEqual((response.data['delivery_fee'], response.data['zone_km']), (Decimal('20'), 7))
+        self.assertEqual(APIClient().get(url, {'lat': 'north', 'lng': lng}).status_code, 400)
+
+        # Addresses are only geocoded for signed-in users
+        client = APIClient()
+        with override_settings(GEOCODER='rentals.tests.NearbyGeocoder'):
+            response = client.get(url, {'address': '1 Main St'})
+            self.assertEqual((response.data['located'], response.data['delivery_fee']), (False, Decimal('10')))
+            client.force_authenticate(make_user())
+            response = client.get(url, {'address': '1 Main St'})
+            self.assertEqual((response.data['located'], response.data['delivery_fee']), (True, Decimal('20')))
+
+
+# ── Pricing (user-048) ────────────────────────────────────────────────────────
+
+class PricingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rule_sets.invalidate()
+        self.shop = make_shop()
+        self.vehicle = make_vehicle(self.shop)
+
+    def rule(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return PricingRule.objects.create(shop=self.shop, name=fields['kind'].title(), **fields)
+
+    def test_surge_then_discounts(self):
+        self.rule(kind='weekend', percent=20, booking_type='hour')
+        self.rule(kind='long_rental', percent=10, min_duration=3)
+        promo = PromoCode.objects.create(code='save10', percent_off=10)
+        monday = price_rental(self.vehicle, 'hour', next_weekday(0), 2)
+        self.assertEqual((monday.adjustments, monday.total_price), ([], Decimal('205.00')))
+
+        price = price_rental(self.vehicle, 'hour', next_weekday(5), 4, promo=find_promo('SAVE10', self.shop))
+        self.assertEqual(price.base_price, Decimal('400.00'))
+        self.assertEqual(
+            [(a.kind, a.amount) for a in price.adjustments],
+            [('weekend', Decimal('80.00')), ('long_rental', Decimal('-48.00')), ('promo', Decimal('-43.20'))],
+        )
+        self.assertEqual(price.total_price, Decimal('393.80'))  # with the service fee
+        self.assertEqual(price.promo_code, promo)
+
+    def test_utilization_surge(self):
+        self.rule(kind='utilization', percent=25, min_utilization=0.5)
+        start = next_weekday(2)
+        make_booking(make_user(), make_vehicle(self.shop, number='KA02'), start=start)
+        price = price_rental(self.vehicle, 'hour', start, 2)
+        self.assertEqual([(a.kind, a.amount) for a in price.adjustments], [('utilization', Decimal('50.00'))])
+
+    def test_promo_validity(self):
+        now = timezone.now()
+        PromoCode.objects.create(code='OTHER', shop=make_shop('Other'), amount_off=50)
+        PromoCode.objects.create(code='OLD', amount_off=50, valid_until=now - timedelta(days=1))
+        PromoCode.objects.create(code='GONE', amount_off=50, max_uses=1, used_count=1)
+        for code in ('OTHER', 'OLD', 'GONE', 'NOPE'):
+            with self.assertRaises(PricingError):
+                find_promo(code, self.shop)
+
+    def test_promo_is_redeemed_once_per_booking_and_released(self):
+        promo = PromoCode.objects.create(code='ONCE', amount_off=50, max_uses=1)
+        client = APIClient()
+        client.force_authenticate(make_verified_customer())
+        payload = {'vehicle_id': self.vehicle.id, 'booking_type': 'hour', 'start_date': next_weekday(2).isoformat(),
+                   'duration': 2, 'payment_method': 'card', 'promo_code': 'once'}
+        response = client.post('/api/bookings/create/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Decimal(response.data['total_price']), Decimal('155.00'))
+        promo.refresh_from_db()
+        self.assertEqual(promo.used_count, 1)
+        self.assertFalse(redeem_promo(promo))
+
+        # Re-saving with the same code keeps the one use; dropping it releases it
+        url = f"/api/bookings/{response.data['id']}/modify/"
+        self.assertEqual(client.patch(url, payload, format='json').status_code, 200)
+        promo.refresh_from_db()
+        self.assertEqual(promo.used_count, 1)
+        self.assertEqual(client.patch(url, {**payload, 'promo_code': ''}, format='json').status_code, 200)
+        promo.refresh_from_db()
+        self.assertEqual(promo.used_count, 0)
+
+
+# ── Batch quotes (user-049) ───────────────────────────────────────────────────
+
+@override_settings(ROUTING_GRAPH_PATH=None)
+class QuoteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rule_sets.invalidate()
+        invalidate_zones()
+        self.shop = make_shop()
+        self.car = make_vehicle(self.shop)
+        self.booked = make_vehicle(self.shop, number='KA02')
+        self.start = next_weekday(2)
+        make_booking(make_user('other'), self.booked, start=self.start)
+        PromoCode.objects.create(code='SAVE50', amount_off=50)
+        self.client = APIClient()
+
+    def quote(self, **body):
+        payload = {'booking_type': 'hour', 'start_date': self.start.isoformat(), 'duration': 2, **body}
+        return self.client.post('/api/quotes/', payload, format='json')
+
+    def test_prices_and_availability_of_a_whole_shop(self):
+        response = self.quote(shop_id=self.shop.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(q['vehicle_id'], q['available'], q['total_price']) for q in response.data['quotes']],
+            [(self.car.id, True, '205.00'), (self.booked.id, False, '205.00')],
+        )
+
+    def test_vehicle_ids_and_missing_vehicles(self):
+        response = self.quote(vehicle_ids=[self.car.id, self.car.id, 999])
+        self.assertEqual([q['vehicle_id'] for q in response.data['quotes']], [self.car.id])
+        self.assertEqual(response.data['not_found'], [999])
+        self.assertEqual(self.quote().status_code, 400)
+
+    def test_promo_codes_need_a_signed_in_user(self):
+        response = self.quote(shop_id=self.shop.id, promo_code='SAVE50')
+        self.assertEqual(response.data['promo_error'], 'Sign in to use a promo code')
+        self.assertEqual(response.data['quotes'][0]['total_price'], '205.00')
+
+        self.client.force_authenticate(make_user())
+        response = self.quote(shop_id=self.shop.id, promo_code='SAVE50')
+        self.assertIsNone(response.data['promo_error'])
+        self.assertEqual((response.data['quotes'][0]['promo_code'], response.data['quotes'][0]['total_price']),
+                         ('SAVE50', '155.00'))
+        self.assertIsNotNone(self.quote(shop_id=self.shop.id, promo_code='NOPE').data['promo_error'])
+
+    def test_home_delivery_adds_the_zone_fee(self):
+        near, far = self.shop.latitude + 2 * KM, self.shop.latitude + 30 * KM
+        quote = self.quote(vehicle_ids=[self.car.id], delivery_option='home_delivery',
+                           delivery_latitude=near, delivery_longitude=self.shop.longitude).data['quotes'][0]
+        self.assertEqual((quote['deliverable'], quote['delivery_fee'], quote['total_price']), (True, '10.00', '215.00'))
+        quote = self.quote(vehicle_ids=[self.car.id], delivery_option='home_delivery',
+                           delivery_latitude=far, delivery_longitude=self.shop.longitude).data['quotes'][0]
+        self.assertFalse(quote['deliverable'])
+
+
+# ── Checkout holds (user-050) ─────────────────────────────────────────────────
+
+class HoldTests(TestCase):
+    def setUp(self):
+        self.vehicle = make_vehicle(make_shop())
+        self.start = next_weekday(2)
+        self.alice, self.bob = APIClient(), APIClient()
+        self.alice.force_authenticate(make_verified_customer('alice'))
+        self.bob.force_authenticate(make_verified_customer('bob'))
+
+    def window(self, **overrides):
+        return {'vehicle_id': self.vehicle.id, 'booking_type': 'hour', 'start_date': self.start.isoformat(),
+                'duration': 3, **overrides}
+
+    def hold(self, client, **overrides):
+        return client.post('/api/holds/', self.window(**overrides), format='json')
+
+    def book(self, client, **overrides):
+        return client.post('/api/bookings/create/', self.window(payment_method='card', **overrides), format='json')
+
+    def available(self, client):
+        response = client.post('/api/quotes/', {**self.window(), 'vehicle_ids': [self.vehicle.id]}, format='json')
+        return response.data['quotes'][0]['available']
+
+    def test_hold_blocks_other_customers_only(self):
+        self.assertEqual(self.hold(self.alice).status_code, 201)
+        later = (self.start + timedelta(hours=2)).isoformat()
+        self.assertEqual(self.hold(self.bob, start_date=later).status_code, 409)
+        self.assertEqual(self.book(self.bob, start_date=later).status_code, 400)
+        self.assertFalse(self.available(self.bob))
+        self.assertTrue(self.available(self.alice))
+        # A window that does not overlap is free
+        self.assertEqual(self.hold(self.bob, start_date=(self.start + timedelta(hours=3)).isoformat()).status_code, 201)
+
+    def test_booking_takes_the_hold(self):
+        token = self.hold(self.alice).data['token']
+        response = self.book(self.alice, hold_token=token, duration=2)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertFalse(BookingHold.objects.exists())
+        self.assertFalse(self.available(self.bob))
+
+    def test_hold_must_cover_the_booking(self):
+        token = self.hold(self.alice).data['token']
+        response = self.book(self.alice, hold_token=token, duration=4)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('hold_token', response.data)
+        self.assertTrue(BookingHold.objects.exists())
+
+    def test_expired_holds_stop_counting_and_are_swept(self):
+        self.hold(self.alice)
+        BookingHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.hold(self.bob).status_code, 201)
+        self.assertEqual(sweep_expired_holds(timezone.now()), 1)
+        self.assertEqual(BookingHold.objects.get().user.username, 'bob')
+
+    def test_release_and_limits(self):
+        token = self.hold(self.alice).data['token']
+        self.assertEqual(self.bob.delete(f'/api/holds/{token}/').status_code, 404)
+        self.assertEqual(self.alice.delete(f'/api/holds/{token}/').status_code, 204)
+
+        past = (timezone.now() - timedelta(hours=1)).isoformat()
+        self.assertEqual(self.hold(self.alice, start_date=past).status_code, 400)
+        self.assertEqual(self.hold(self.alice, booking_type='day', duration=31).status_code, 400)
+
+        unverified = APIClient()
+        unverified.force_authenticate(make_user('carol'))
+        self.assertEqual(self.hold(unverified).status_code, 403)
@@ -0,0 +1,211 @@
+"""
+Resumable chunked uploads for KYC documents and owner certificates.
+
+    POST  /api/uploads/        {"purpose", "filename", "size"}  → {"id", "offset": 0, ...}
+    PATCH /api/uploads/<id>/   raw bytes, ``Upload-Offset: <n>`` → {"offset", "status"}
+    GET   /api/uploads/<id>/   current offset, to resume after a dropped connection
+
+Each PATCH is streamed into a temporary file next to the upload's staging file
+under ``UPLOAD_STAGING_ROOT``, so a request only occupies a worker for one
+chunk and nothing is buffered in memory. Only then is the upload claimed (a
+conditional UPDATE to ``writing`` at the expected offset) and the chunk spliced
+onto the staging file, so of two requests racing for the same offset the loser
+never touches it. Whatever part of a chunk arrived before a connection dropped
+is kept; the client resumes from the reported offset. When the last byte
+arrives the staging file itself is moved into the private KYC store (a rename,
+not a copy) and forms reference the finished upload by id.
+
+Uploads belong to the user who started them. Owner certificates are uploaded
+before the owner has an account, so anonymous uploads are tied to the
+browser session that started them instead.
+"""
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ChunkedUpload
+from .storage import kyc_media_storage
+
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+MAX_CHUNK_SIZE = 5 * 1024 * 1024
+COPY_BUFFER_SIZE = 64 * 1024
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.heic', '.pdf'}
+
+# Unfinished or unclaimed uploads older than this are removed by purge_stale_uploads.
+STALE_AFTER = timedelta(hours=24)
+
+# A chunk still ``writing`` after this long belongs to a crashed request and may be retried.
+WRITE_TIMEOUT = timedelta(minutes=1)
+
+# Session key listing the anonymous uploads started from this session
+SESSION_KEY = 'chunked_uploads'
+SESSION_MAX_UPLOADS = 20
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def staging_path(upload):
+    return os.path.join(settings.UPLOAD_STAGING_ROOT, str(upload.pk))
+
+
+def upload_state(upload):
+    return {
+        'id': str(upload.pk),
+        'purpose': upload.purpose,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'status': upload.status,
+        'max_chunk_size': MAX_CHUNK_SIZE,
+    }
+
+
+def remember_upload(session, upload):
+    """Record an anonymous ``upload`` as belonging to ``session``."""
+    ids = [i for i in session.get(SESSION_KEY, []) if i != str(upload.pk)]
+    session[SESSION_KEY] = (ids + [str(upload.pk)])[-SESSION_MAX_UPLOADS:]
+
+
+def owns_upload(request, upload):
+    """Whether ``request`` comes from the user (or, if anonymous, the session) that started ``upload``."""
+    if upload.user_id is not None:
+        return upload.user_id == request.user.id
+    return str(upload.pk) in request.session.get(SESSION_KEY, [])
+
+
+def start_upload(user, purpose, filename, size):
+    if purpose not in dict(ChunkedUpload.PURPOSE_CHOICES):
+        raise UploadError("Unknown upload purpose")
+    filename = os.path.basename(filename or '')
+    if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
+        raise UploadError("Unsupported file type")
+    if size <= 0 or size > MAX_UPLOAD_SIZE:
+        raise UploadError(f"File size must be between 1 byte and {MAX_UPLOAD_SIZE // (1024 * 1024)} MB")
+
+    upload = ChunkedUpload.objects.create(
+        user=user if user and user.is_authenticated else None,
+        purpose=purpose, filename=filename, size=size,
+    )
+    os.makedirs(settings.UPLOAD_STAGING_ROOT, exist_ok=True)
+    open(staging_path(upload), 'wb').close()
+    return upload
+
+
+def claim_offset(upload, offset):
+    """Mark ``upload`` as being written at ``offset``; raises UploadError if another request got there first."""
+    now = timezone.now()
+    claimed = ChunkedUpload.objects.filter(
+        Q(status='uploading') | Q(status='writing', updated_at__lt=now - WRITE_TIMEOUT),
+        pk=upload.pk, offset=offset,
+    ).update(status='writing', updated_at=now)
+    if not claimed:
+        upload.refresh_from_db()
+        raise UploadError(f"Expected Upload-Offset {upload.offset}", status=409)
+
+
+def append_chunk(upload, offset, stream, length):
+    """Write up to ``length`` bytes from ``stream`` at ``offset``; finish the upload on the last byte."""
+    if upload.status not in ('uploading', 'writing'):
+        raise UploadError("Upload is already complete", status=409)
+    if offset != upload.offset:
+        raise UploadError(f"Expected Upload-Offset {upload.offset}", status=409)
+    if not length or length < 0:
+        raise UploadError("Empty chunk")
+    if length > MAX_CHUNK_SIZE:
+        raise UploadError("Chunk too large", status=413)
+    if offset + length > upload.size:
+        raise UploadError("Chunk exceeds the declared file size")
+
+    fd, chunk_path = tempfile.mkstemp(dir=settings.UPLOAD_STAGING_ROOT, prefix=f'{upload.pk}.')
+    try:
+        written = 0
+        with os.fdopen(fd, 'wb') as out:
+            try:
+                while written < length:
+                    data = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                    if not data:
+                        break
+                    out.write(data)
+                    written += len(data)
+            except OSError:
+                pass  # Client went away mid-chunk: keep what arrived
+
+        claim_offset(upload, offset)
+        new_offset = offset
+        try:
+            with open(chunk_path, 'rb') as chunk, open(staging_path(upload), 'r+b') as fh:
+                fh.seek(offset)
+                shutil.copyfileobj(chunk, fh, COPY_BUFFER_SIZE)
+                fh.truncate(offset + written)
+            new_offset = offset + written
+        finally:
+            # Release the claim; if splicing failed the offset stays put and the chunk can be resent.
+            ChunkedUpload.objects.filter(pk=upload.pk, status='writing').update(
+                status='uploading', offset=new_offset, updated_at=timezone.now(),
+            )
+    finally:
+        os.unlink(chunk_path)
+    upload.status = 'uploading'
+    upload.offset = offset + written
+
+    if upload.offset == upload.size:
+        finish_upload(upload)
+    return upload
+
+
+def finish_upload(upload):
+    from .media import adjust_blob_refs
+
+    # Certificates are as private as KYC documents: both live in the KYC store,
+    # which serve_media only hands to their owner and to admins.
+    name = kyc_media_storage.adopt(staging_path(upload), upload.filename)
+    # Register the blob so gc_media reclaims it if the upload is never claimed.
+    adjust_blob_refs(name, 0)
+
+    upload.file_name = name
+    upload.status = 'complete'
+    upload.save(update_fields=['file_name', 'status', 'updated_at'])
+
+
+def get_completed_upload(upload_id, purpose, user=None):
+    """The finished, unclaimed ``purpose`` upload ``upload_id`` belonging to ``user`` (None: anonymous)."""
+    uploads = ChunkedUpload.objects.filter(purpose=purpose, status='complete')
+    uploads = uploads.filter(user=user) if user is not None else uploads.filter(user__isnull=True)
+    try:
+        return uploads.get(pk=upload_id)
+    except (ChunkedUpload.DoesNotExist, ValidationError, ValueError):
+        raise UploadError("Upload not found or not complete")
+
+
+def consume_upload(upload):
+    """Mark ``upload`` as used by a form and return its storage name."""
+    claimed = ChunkedUpload.objects.filter(pk=upload.pk, status='complete').update(
+        status='consumed', updated_at=timezone.now(),
+    )
+    if not claimed:
+        raise UploadError("Upload has already been used")
+    return upload.file_name
+
+
+def purge_stale_uploads(older_than=STALE_AFTER):
+    """Delete abandoned staging files and old upload records; return how many were removed."""
+    cutoff = timezone.now() - older_than
+    stale = ChunkedUpload.objects.filter(updated_at__lt=cutoff)
+    removed = 0
+    for upload in stale.iterator():
+        if upload.status in ('uploading', 'writing') and os.path.exists(staging_path(upload)):
+            os.unlink(staging_path(upload))
+        # Unclaimed finished uploads are blobs with no references, left to gc_media.
+        upload.delete()
+        removed += 1
+    return removed
@@ -2,14 +2,17 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     RentalShopViewSet, VehicleViewSet, BookingViewSet,
-    register, login, create_booking,
-    shop_reviews,
+    register, login, create_booking, booking_quote, quotes_view, holds_view, hold_detail_view,
+    shop_reviews, search_view, route_view,
     conversation_list, message_list,
     user_profile, user_stats,
     user_profile_update, user_settings_view,
     payment_methods_view, saved_locations_view, kyc_document_view,
+    upload_create_view, upload_detail_view,
     change_password,
     notification_list, mark_notification_read, delete_notification, create_notification,
+    notification_unread_count, mark_all_notifications_read, bulk_delete_notifications,
+    push_devices_view,
     complaints_view,
     staff_assigned_complaints_view,
     staff_resolve_complaint_view,
@@ -30,6 +33,11 @@ router.register(r'bookings', BookingViewSet)
 # /api/vehicles/  -> List/Create/Detail Vehicles
 # /api/notifications/ -> List/Create/Mark Read Notifications
 # /api/bookings/  -> List/Create/Detail Bookings
+# /api/bookings/quote/ -> Price breakdown and availability of a booking (rentals.pricing)
+# /api/search/?q= -> Ranked full-text search over shops and vehicles
+# /api/route/?from=&to= -> Road route and ETA between two points (rentals.routing)
+# /api/quotes/    -> Prices and availability of many vehicles for one rental window
+# /api/holds/     -> Hold a vehicle during checkout (rentals.holds); DELETE /api/holds/<token>/ releases it
 #
 # Chat routes:
 # GET  /api/chat/conversations/              -> list user's conversations
@@ -38,8 +46,15 @@ router.register(r'bookings', BookingViewSet)
 # POST /api/chat/conversations/<id>/messages/ -> send a message
 urlpatterns = [
     path('bookings/create/', create_booking, name='create-booking'),
+    path('bookings/quote/', booking_quote, name='booking-quote'),
+    path('holds/', holds_view, name='holds'),
+    path('holds/<uuid:token>/', hold_detail_view, name='hold-detail'),
     path('shops/<int:shop_id>/reviews/', shop_reviews, name='shop-reviews'),
     path('', include(router.urls)),
+    # Search
+    path('search/', search_view, name='search'),
+    path('route/', route_view, name='route'),
+    path('quotes/', quotes_view, name='quotes'),
     # Auth
     path('register/', register, name='register'),
     path('login/', login, name='login'),
@@ -63,11 +78,19 @@ urlpatterns = [
     path('locations/<int:pk>/', saved_locations_view, name='saved-location-detail'),
     # KYC
     path('kyc/', kyc_document_view, name='kyc-document'),
+    # Resumable chunked uploads (KYC documents, owner certificates)
+    path('uploads/', upload_create_view, name='upload-create'),
+    path('uploads/<uuid:upload_id>/', upload_detail_view, name='upload-detail'),
     # Notifications
     path('notifications/', notification_list, name='notification-list'),
     path('notifications/mark-read/<int:notification_id>/', mark_notification_read, name='mark-notification-read'),
     path('notifications/delete/<int:notification_id>/', delete_notification, name='delete-notification'),
     path('notifications/create/', create_notification, name='create-notification'),
+    path('notifications/unread-count/', notification_unread_count, name='notification-unread-count'),
+    path('notifications/mark-all-read/', mark_all_notifications_read, name='mark-all-notifications-read'),
+    path('notifications/bulk-delete/', bulk_delete_notifications, name='bulk-delete-notifications'),
+    # Push device tokens
+    path('push/devices/', push_devices_view, name='push-devices'),
     # Chat
     path('chat/conversations/', conversation_list, name='chat-conversations'),
     path('chat/conversations/<int:conversation_id>/messages/', message_list, name='chat-messages'),
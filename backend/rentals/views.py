@@ -4,12 +4,13 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authtoken.models import Token
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.pagination import CursorPagination
 from django.contrib.auth import authenticate
 from django.shortcuts import get_object_or_404
 from .models import RentalShop, Vehicle, Booking, Conversation, Message, UserSettings, PaymentMethod, SavedLocation, KYCDocument, UserProfile, Notification, Review
 from .serializers import (
     RentalShopSerializer, VehicleSerializer, BookingSerializer, BookingCreateSerializer,
-    BookingUpdateSerializer,
+    BookingUpdateSerializer, BookingQuoteSerializer,
     UserSerializer, ConversationSerializer, MessageSerializer,
     UserProfileSerializer, UserStatsSerializer,
     UserSettingsSerializer, PaymentMethodSerializer, PaymentMethodCreateSerializer,
@@ -117,8 +118,10 @@ def create_booking(request):
     Create a new booking.
     Requires KYC to be verified before a booking can be made.
     """
+    from django.db import transaction
+    from rest_framework.exceptions import ValidationError
     from .serializers import BookingCreateSerializer, BookingSerializer
-    from .models import Booking, Notification, KYCDocument
+    from .models import Booking, KYCDocument
 
     # ── KYC gate ──────────────────────────────────────────────────────────────
     try:
@@ -135,25 +138,22 @@ def create_booking(request):
         )
     # ──────────────────────────────────────────────────────────────────────────
 
-    serializer = BookingCreateSerializer(data=request.data)
+    serializer = BookingCreateSerializer(data=request.data, context={'request': request})
     
     if serializer.is_valid():
         try:
-            booking = serializer.save(user=request.user)
-            
-            # Create notification for successful booking
-            Notification.objects.create(
-                user=request.user,
-                title='Booking Confirmed',
-                message=f'Your booking for {booking.vehicle.name} has been confirmed',
-                type='booking',
-                is_read=False
-            )
+            # The booking and its "Booking Confirmed" notification job
+            # (rentals.notifications) commit together.
+            with transaction.atomic():
+                booking = serializer.save(user=request.user)
 
             # Return booking details
             response_serializer = BookingSerializer(booking)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
             
+        except ValidationError as e:
+            # e.g. the promo code ran out while validating
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             print("CREATE BOOKING EXCEPTION:", str(e))
             import traceback
@@ -163,6 +163,152 @@ def create_booking(request):
     print("CREATE BOOKING VALIDATION ERRORS:", serializer.errors)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def booking_quote(request):
+    """
+    POST /api/bookings/quote/ with the create_booking payload (payment_method optional).
+    Price breakdown (rentals.pricing) and availability, without booking.
+    """
+    from .pricing import breakdown_data
+
+    serializer = BookingQuoteSerializer(data=request.data, context={'request': request})
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    quote = serializer.validated_data
+    return Response({
+        'vehicle_id': quote['vehicle'].id,
+        'available': quote['available'],
+        'start_date': quote['start_date'],
+        'end_date': quote['end_date'],
+        **breakdown_data(quote['price']),
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def holds_view(request):
+    """
+    POST /api/holds/ {"vehicle_id", "booking_type", "start_date", "duration"}
+    Hold the vehicle for that window while the customer checks out (rentals.holds).
+    Pass the returned token as ``hold_token`` to create_booking before ``expires_at``.
+    """
+    from .holds import HoldError, place_hold
+    from .models import KYCDocument
+    from .pricing import rental_end
+    from .serializers import HoldRequestSerializer
+
+    # Same gate as create_booking: only customers who may book can hold
+    if not KYCDocument.objects.filter(user=request.user, status='verified').exists():
+        return Response(
+            {'error': 'KYC verification required. Please complete KYC verification before booking.', 'code': 'kyc_not_verified'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    serializer = HoldRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    end_date = rental_end(data['start_date'], data['booking_type'], data['duration'])
+    try:
+        hold = place_hold(request.user, data['vehicle_id'], data['start_date'], end_date)
+    except HoldError as e:
+        return Response({'error': str(e)}, status=e.status)
+    return Response({
+        'token': str(hold.token),
+        'vehicle_id': hold.vehicle_id,
+        'start_date': hold.start_date,
+        'end_date': hold.end_date,
+        'expires_at': hold.expires_at,
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def hold_detail_view(request, token):
+    """DELETE /api/holds/<token>/ — give the vehicle back when the customer leaves checkout."""
+    from .holds import release_hold
+
+    if not release_hold(request.user, token):
+        return Response({'error': 'Hold not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def quotes_view(request):
+    """
+    POST /api/quotes/ {"vehicle_ids": [...] or "shop_id", "booking_type", "start_date",
+    "duration", "delivery_option", delivery address fields, "promo_code"}
+    Price breakdown and availability (bookings and other customers' checkout
+    holds) of every vehicle for that window, from one availability query and
+    one pricing pass (rentals.pricing.price_vehicles). Anonymous callers get
+    list prices: promo codes and address geocoding need a signed-in user, so
+    codes cannot be probed anonymously.
+    """
+    from .holds import unavailable_vehicle_ids
+    from .models import SavedLocation
+    from .pricing import breakdown_data, delivery_location, price_vehicles, rental_end
+    from .serializers import QuoteRequestSerializer
+
+    serializer = QuoteRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    start_date, booking_type, duration = data['start_date'], data['booking_type'], data['duration']
+    end_date = rental_end(start_date, booking_type, duration)
+
+    vehicles = Vehicle.objects.select_related('shop')
+    if data.get('vehicle_ids'):
+        vehicles = vehicles.filter(id__in=data['vehicle_ids'])
+    if data.get('shop_id'):
+        vehicles = vehicles.filter(shop_id=data['shop_id'])
+    vehicles = list(vehicles.order_by('id')[:QuoteRequestSerializer.MAX_VEHICLES])
+
+    home_delivery = data['delivery_option'] == 'home_delivery'
+    point = None
+    if home_delivery:
+        try:
+            _, point = delivery_location(
+                request.user if request.user.is_authenticated else None, data.get('delivery_address'),
+                data.get('delivery_latitude'), data.get('delivery_longitude'), data.get('saved_location_id'),
+            )
+        except SavedLocation.DoesNotExist:
+            return Response({'saved_location_id': ['Saved location not found']}, status=status.HTTP_400_BAD_REQUEST)
+
+    booked = unavailable_vehicle_ids(
+        [vehicle.id for vehicle in vehicles], start_date, end_date,
+        request.user if request.user.is_authenticated else None,
+    )
+    promo_code = data.get('promo_code') if request.user.is_authenticated else None
+    prices, promo_error = price_vehicles(
+        vehicles, booking_type, start_date, duration, home_delivery, point, promo_code,
+    )
+    if data.get('promo_code') and not request.user.is_authenticated:
+        promo_error = "Sign in to use a promo code"
+
+    found = {vehicle.id for vehicle in vehicles}
+    return Response({
+        'booking_type': booking_type,
+        'start_date': start_date,
+        'end_date': end_date,
+        'duration': duration,
+        'delivery_option': data['delivery_option'],
+        'promo_error': promo_error,
+        'quotes': [
+            {
+                'vehicle_id': vehicle.id,
+                'shop_id': vehicle.shop_id,
+                'available': vehicle.is_available and vehicle.id not in booked,
+                'deliverable': prices[vehicle.id][1],
+                **breakdown_data(prices[vehicle.id][0]),
+            }
+            for vehicle in vehicles
+        ],
+        'not_found': [vehicle_id for vehicle_id in data.get('vehicle_ids') or [] if vehicle_id not in found],
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def complaints_view(request):
@@ -609,7 +755,7 @@ def kyc_document_view(request):
         if kyc_doc.status not in ['not_submitted', 'rejected']:
             return Response({'error': 'KYC already submitted'}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = KYCDocumentCreateSerializer(kyc_doc, data=request.data, partial=True)
+        serializer = KYCDocumentCreateSerializer(kyc_doc, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             kyc_doc = serializer.save(status='pending', rejection_reason=None)
             response_serializer = KYCDocumentSerializer(kyc_doc)
@@ -748,6 +894,19 @@ def message_list(request, conversation_id):
     conv.updated_at = timezone.now()
     conv.save(update_fields=['updated_at'])
 
+    # Let the other side know
+    from .notifications import queue_notification
+    if sender_role == 'user':
+        recipient_ids = [conv.shop.owner.user_id] if conv.shop.owner_id else []
+        if conv.booking_id:
+            recipient_ids += list(conv.booking.staff_tasks.values_list('staff_id', flat=True))
+    else:
+        recipient_ids = [conv.user_id]
+    if recipient_ids:
+        sender_name = request.user.get_full_name() or request.user.username
+        queue_notification('new_message', f'New message from {sender_name}', text or 'Sent a photo',
+                           user_ids=set(recipient_ids), data={'conversation_id': conv.id})
+
     serializer = MessageSerializer(message)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -788,6 +947,7 @@ class RentalShopViewSet(viewsets.ModelViewSet):
     """
     API endpoint that allows rental shops to be viewed or edited.
     Supports filtering by name/address: GET /api/shops/?search=<term>
+    Supports ranking:                   GET /api/shops/?ordering=rank[&lat=<lat>&lng=<lng>][&available=1]
     """
     queryset = RentalShop.objects.all()
     serializer_class = RentalShopSerializer
@@ -800,21 +960,82 @@ class RentalShopViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(
                 Q(name__icontains=search) | Q(address__icontains=search)
             )
+        if self.request.query_params.get('ordering') == 'rank':
+            queryset = self._rank(queryset)
         return queryset
 
+    def _rank(self, queryset):
+        """
+        Order by the precomputed rank_score (served by its index). When the client
+        sends its location the score is discounted by distance, and ?available=1
+        keeps only open shops that have a vehicle available right now.
+        """
+        from django.db.models import Exists, F, OuterRef
+        from .ranking import DISTANCE_SCALE_KM, distance_km_expression
+
+        params = self.request.query_params
+        if params.get('available') in ('1', 'true', 'True'):
+            queryset = queryset.filter(is_open=True).filter(
+                Exists(Vehicle.objects.filter(shop=OuterRef('pk'), is_available=True))
+            )
+
+        try:
+            lat, lng = float(params['lat']), float(params['lng'])
+        except (KeyError, TypeError, ValueError):
+            return queryset.order_by('-rank_score', 'id')
+
+        distance_km = distance_km_expression(lat, lng)
+        return queryset.annotate(
+            distance_km=distance_km,
+            ranked_score=F('rank_score') / (1 + distance_km / DISTANCE_SCALE_KM),
+        ).order_by('-ranked_score', 'id')
+
+    @action(detail=True, methods=['GET'], url_path='delivery-quote')
+    def delivery_quote(self, request, pk=None):
+        """
+        GET /api/shops/<id>/delivery-quote/?lat=<lat>&lng=<lng>
+        (or ?saved_location=<id>, or ?address=<text> when a geocoder is configured)
+        Home delivery fee to that point, from the shop's delivery zones.
+        """
+        from .models import SavedLocation
+        from .pricing import delivery_location, delivery_quote
+
+        shop = self.get_object()
+        params = request.query_params
+        try:
+            lat = float(params['lat']) if 'lat' in params else None
+            lng = float(params['lng']) if 'lng' in params else None
+            address, point = delivery_location(
+                request.user if request.user.is_authenticated else None,
+                params.get('address'), lat, lng, params.get('saved_location'),
+            )
+        except ValueError:
+            return Response({'error': 'lat and lng must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        except SavedLocation.DoesNotExist:
+            return Response({'error': 'Saved location not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        quote = delivery_quote(shop, point)
+        return Response({
+            'shop_id': shop.id,
+            'deliverable': quote.deliverable,
+            'delivery_fee': quote.fee,
+            'zone_km': quote.zone_km,
+            'distance_km': quote.distance_km,
+            'located': quote.located,
+        })
+
 class VehicleViewSet(viewsets.ModelViewSet):
     """
     API endpoint that allows vehicles to be viewed or edited.
     Supports filtering by shop: /api/vehicles/?shop=<shop_id>
+    Faceted filters (see rentals.facets): type, fuel_type, transmission, seating,
+    is_available, features, min_/max_price_per_hour, min_/max_price_per_day.
+    Add ?facets=1 to receive { "results": [...], "facets": {...} } instead of a list.
     """
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
 
-    def get_queryset(self):
-        """
-        Logic to filter vehicles if needed.
-        Currently returns all vehicles for the details page.
-        """
+    def _base_queryset(self):
         from django.db.models import Q
         queryset = Vehicle.objects.filter(Q(shop__owner__isnull=True) | Q(shop__owner__user__is_active=True))
         shop_id = self.request.query_params.get('shop')
@@ -822,6 +1043,98 @@ class VehicleViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(shop__id=shop_id)
         return queryset
 
+    def get_queryset(self):
+        from .facets import apply_vehicle_filters, parse_vehicle_filters
+        conditions = parse_vehicle_filters(self.request.query_params)
+        return apply_vehicle_filters(self._base_queryset(), conditions).prefetch_related('image_set', 'feature_set')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets') in ('1', 'true', 'True'):
+            from .facets import parse_vehicle_filters, vehicle_facets
+            conditions = parse_vehicle_filters(request.query_params)
+            response.data = {
+                'results': response.data,
+                'facets': vehicle_facets(self._base_queryset(), conditions),
+            }
+        return response
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_view(request):
+    """
+    GET /api/search/?q=<text>[&limit=<n>]
+    Ranked, typo-tolerant full-text search over shops (name, address) and
+    vehicles (name, brand, model, features). ``corrections`` lists the indexed
+    terms that misspelt query words were matched against.
+    """
+    from django.db.models import Q
+    from .search import SHOP, VEHICLE, get_search_backend
+
+    query = request.query_params.get('q', '').strip()
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+    except ValueError:
+        limit = 20
+    if not query:
+        return Response({'query': query, 'shops': [], 'vehicles': [], 'corrections': {}})
+
+    hits, corrections = get_search_backend().search(query, limit=limit)
+    shop_ids = [pk for kind, pk in hits if kind == SHOP]
+    vehicle_ids = [pk for kind, pk in hits if kind == VEHICLE]
+
+    shops = RentalShop.objects.filter(
+        Q(owner__isnull=True) | Q(owner__user__is_active=True), id__in=shop_ids
+    ).in_bulk()
+    vehicles = Vehicle.objects.filter(
+        Q(shop__owner__isnull=True) | Q(shop__owner__user__is_active=True), id__in=vehicle_ids
+    ).prefetch_related('image_set', 'feature_set').in_bulk()
+
+    # Keep the backend's relevance order
+    return Response({
+        'query': query,
+        'shops': RentalShopSerializer([shops[pk] for pk in shop_ids if pk in shops], many=True).data,
+        'vehicles': VehicleSerializer([vehicles[pk] for pk in vehicle_ids if pk in vehicles], many=True).data,
+        'corrections': corrections,
+    })
+
+
+def _parse_point(raw):
+    try:
+        lat, lng = (float(x) for x in raw.split(','))
+    except (AttributeError, ValueError):
+        return None
+    return (lat, lng) if -90 <= lat <= 90 and -180 <= lng <= 180 else None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def route_view(request):
+    """
+    GET /api/route/?from=<lat>,<lng>&to=<lat>,<lng>   (or &shop=<id> instead of to)
+    Fastest road route. ``source`` is 'graph' for a road route and 'haversine'
+    for the straight-line estimate used when no road graph is available.
+    """
+    from .routing import route
+
+    origin = _parse_point(request.query_params.get('from'))
+    if 'shop' in request.query_params:
+        shop = get_object_or_404(RentalShop, pk=request.query_params['shop'])
+        destination = (shop.latitude, shop.longitude)
+    else:
+        destination = _parse_point(request.query_params.get('to'))
+    if origin is None or destination is None:
+        return Response({'error': 'from and to (or shop) are required as <lat>,<lng>'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    result = route(origin, destination)
+    return Response({
+        'distance_km': round(result.distance_km, 3),
+        'duration_s': round(result.duration_s),
+        'geometry': {'type': 'LineString', 'coordinates': result.coordinates},
+        'source': result.source,
+    })
+
 class BookingViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing bookings.
@@ -857,6 +1170,12 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         booking.status = 'pickup_requested'
         booking.return_location = return_location
+        # Optional coordinates of the return location, used to route the pickup
+        try:
+            booking.return_latitude = float(request.data['return_latitude'])
+            booking.return_longitude = float(request.data['return_longitude'])
+        except (KeyError, TypeError, ValueError):
+            booking.return_latitude = booking.return_longitude = None
         booking.save()
 
         return Response({'success': True, 'status': booking.status})
@@ -866,22 +1185,41 @@ class BookingViewSet(viewsets.ModelViewSet):
         booking = self.get_object()
         if booking.status == 'cancelled':
             return Response({'status': 'already cancelled'}, status=status.HTTP_400_BAD_REQUEST)
-        booking.status = 'cancelled'
-        booking.save()
+        from django.db import transaction
+        from staff.transitions import drop_open_tasks
+
+        with transaction.atomic():
+            booking.status = 'cancelled'
+            booking.save()
+            drop_open_tasks([booking.id])
         return Response({'status': 'cancelled', 'booking_id': booking.id})
 
+    @action(detail=True, methods=['GET'])
+    def tracking(self, request, pk=None):
+        """Where the driver of a home delivery or pickup service is, with an ETA. Poll while open."""
+        from staff.location import TRACKED_DELIVERY_OPTIONS, booking_tracking
+
+        booking = self.get_object()
+        if booking.delivery_option not in TRACKED_DELIVERY_OPTIONS:
+            return Response({'error': 'Tracking is only available for home delivery and pickup service'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({'booking_id': booking.id, **booking_tracking(booking)})
+
     @action(detail=True, methods=['patch'], url_path='modify')
     def modify(self, request, pk=None):
         """Update schedule, duration, delivery, and payment for an upcoming booking."""
+        from django.db import transaction
+
         booking = self.get_object()
         if booking.status != 'upcoming':
             return Response(
                 {'error': 'Only upcoming bookings can be modified.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        serializer = BookingUpdateSerializer(booking, data=request.data)
+        serializer = BookingUpdateSerializer(booking, data=request.data, context={'request': request})
         if serializer.is_valid():
-            updated = serializer.save()
+            with transaction.atomic():
+                updated = serializer.save()
             return Response(BookingSerializer(updated).data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1196,7 +1534,7 @@ def kyc_document_view(request):
         if kyc_doc.status not in ['not_submitted', 'rejected']:
             return Response({'error': 'KYC already submitted'}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = KYCDocumentCreateSerializer(kyc_doc, data=request.data, partial=True)
+        serializer = KYCDocumentCreateSerializer(kyc_doc, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             kyc_doc = serializer.save(status='pending', rejection_reason=None)
             response_serializer = KYCDocumentSerializer(kyc_doc)
@@ -1234,40 +1572,181 @@ def kyc_document_view(request):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def upload_create_view(request):
+    """
+    Start a resumable chunked upload. Owner certificates are uploaded before the
+    owner has an account; every other purpose requires authentication.
+    """
+    from .uploads import UploadError, remember_upload, start_upload, upload_state
+
+    purpose = request.data.get('purpose')
+    if purpose != 'owner_certificate' and not request.user.is_authenticated:
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        return Response({'error': 'size is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        upload = start_upload(request.user, purpose, request.data.get('filename'), size)
+    except UploadError as e:
+        return Response({'error': str(e)}, status=e.status)
+    if not request.user.is_authenticated:
+        remember_upload(request.session, upload)
+    return Response(upload_state(upload), status=status.HTTP_201_CREATED)
+
+@api_view(['GET', 'PATCH'])
+@permission_classes([AllowAny])
+def upload_detail_view(request, upload_id):
+    """
+    GET: Current offset of an upload (resume point)
+    PATCH: Append the raw request body at the ``Upload-Offset`` header
+    """
+    from .models import ChunkedUpload
+    from .uploads import UploadError, append_chunk, owns_upload, upload_state
+
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id)
+    if not owns_upload(request, upload):
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'Upload-Offset header is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Read the body as a stream; request.data would buffer and parse it.
+            append_chunk(upload, offset, request.stream, length)
+        except UploadError as e:
+            response = Response({'error': str(e), 'offset': upload.offset}, status=e.status)
+            response['Upload-Offset'] = str(upload.offset)
+            return response
+
+    response = Response(upload_state(upload))
+    response['Upload-Offset'] = str(upload.offset)
+    return response
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def push_devices_view(request):
+    """
+    POST: Register this device's push token. Body: {"token", "provider": "expo", "platform"}
+    DELETE: Stop pushing to a token (e.g. on logout). Body: {"token"}
+    """
+    from .models import PushDevice
+    from .push import provider_names, register_device, unregister_device
+
+    token = (request.data.get('token') or '').strip()
+    if not token:
+        return Response({'error': 'token is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.method == 'DELETE':
+        unregister_device(request.user, token)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    provider = request.data.get('provider', 'expo')
+    platform = request.data.get('platform', '')
+    if provider not in provider_names() or platform not in dict(PushDevice.PLATFORM_CHOICES, **{'': ''}):
+        return Response({'error': 'Unknown provider or platform'}, status=status.HTTP_400_BAD_REQUEST)
+    device = register_device(request.user, token, provider, platform)
+    return Response({'id': device.id, 'provider': device.provider, 'platform': device.platform},
+                    status=status.HTTP_201_CREATED)
+
+class NotificationCursorPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def _notification_ids(request):
+    """Optional ``ids`` list from the request body; None means every notification."""
+    ids = request.data.get('ids') if hasattr(request.data, 'get') else None
+    if ids is None:
+        return None
+    if not isinstance(ids, list) or not all(str(i).isdigit() for i in ids):
+        raise ValueError('ids must be a list of notification ids')
+    return [int(i) for i in ids]
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def notification_list(request):
-    """Get user notifications"""
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-    serializer = NotificationSerializer(notifications, many=True)
-    return Response(serializer.data)
+    """
+    Get user notifications, newest first, cursor-paginated (?cursor=, ?page_size=).
+    ?unread=1 returns only unread notifications.
+    """
+    from .inbox import unread_count
+
+    notifications = Notification.objects.filter(user=request.user)
+    if request.query_params.get('unread') in ('1', 'true'):
+        notifications = notifications.filter(is_read=False)
+    paginator = NotificationCursorPagination()
+    page = paginator.paginate_queryset(notifications, request)
+    response = paginator.get_paginated_response(NotificationSerializer(page, many=True).data)
+    response.data['unread_count'] = unread_count(request.user)
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def notification_unread_count(request):
+    """Unread badge count, read from the maintained counter"""
+    from .inbox import unread_count
+    return Response({'unread_count': unread_count(request.user)})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_notification_read(request, notification_id):
     """Mark notification as read"""
-    try:
-        notification = Notification.objects.get(id=notification_id, user=request.user)
-        notification.is_read = True
-        notification.save()
-        return Response({'message': 'Notification marked as read'})
-    except Notification.DoesNotExist:
+    from .inbox import mark_read
+
+    if not Notification.objects.filter(id=notification_id, user=request.user).exists():
         return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    mark_read(request.user, ids=[notification_id])
+    return Response({'message': 'Notification marked as read'})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_all_notifications_read(request):
+    """Mark every notification (or the given ``ids``) as read in one UPDATE"""
+    from .inbox import mark_read, unread_count
+
+    try:
+        ids = _notification_ids(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    updated = mark_read(request.user, ids=ids)
+    return Response({'updated': updated, 'unread_count': unread_count(request.user)})
 
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def delete_notification(request, notification_id):
     """Delete notification"""
-    try:
-        notification = Notification.objects.get(id=notification_id, user=request.user)
-        notification.delete()
-        return Response({'message': 'Notification deleted successfully'})
-    except Notification.DoesNotExist:
+    from .inbox import delete_notifications
+
+    if not delete_notifications(request.user, ids=[notification_id]):
         return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({'message': 'Notification deleted successfully'})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_delete_notifications(request):
+    """
+    Delete notifications in bulk.
+    Body: {"ids": [...]} for specific ones, {"read": true} for all read ones,
+    or {} for all of them.
+    """
+    from .inbox import delete_notifications, unread_count
+
+    try:
+        ids = _notification_ids(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    only_read = str(request.data.get('read', '')).lower() in ('1', 'true')
+    deleted = delete_notifications(request.user, ids=ids, only_read=only_read)
+    return Response({'deleted': deleted, 'unread_count': unread_count(request.user)})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
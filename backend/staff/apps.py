@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StaffConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'staff'
+
+    def ready(self):
+        # Registers the background job handlers and the workload signal receivers
+        from . import tasks, workload  # noqa: F401
@@ -0,0 +1,260 @@
+"""
+Automatic dispatch of a shop's delivery and pickup tasks.
+
+``plan_day(shop, day)`` gathers the stops staff have to visit that day — open
+tasks already scheduled for it, home deliveries starting that day that nobody
+has been assigned to yet and (for today) pickups customers have requested —
+and splits them between the shop's active staff so that total travel time is
+minimal. Every run starts and ends at the shop.
+
+The routing is a small capacitated vehicle routing problem solved
+heuristically on a haversine distance matrix computed with NumPy:
+
+1. cheapest insertion: stops, farthest from the shop first, are inserted where
+   they add the least distance to any route that still has room;
+2. local search: relocating a stop to another route, swapping two stops
+   between routes and 2-opt within a route, repeated until no move improves
+   the total.
+
+Each staff member takes at most ``ceil(stops / staff)`` stops unless a
+capacity is passed, so work is spread over everyone. Scheduled times are not
+treated as time windows; ``route_order`` gives the order to drive the run in.
+Stops without coordinates are placed at the shop.
+
+``apply_plan`` writes the result (reassigning open tasks and creating the
+missing ones) and tells each staff member about their run.
+"""
+import math
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from rentals.models import Booking
+from rentals.notifications import queue_notifications
+from rentals.ranking import EARTH_RADIUS_KM
+from .models import StaffTask
+from .workload import task_moved
+
+AVERAGE_SPEED_KMH = 25.0
+MAX_SEARCH_ROUNDS = 500
+EPSILON = 1e-9
+
+Stop = namedtuple('Stop', 'booking type task latitude longitude scheduled_time')
+Plan = namedtuple('Plan', 'routes unassigned total_km')
+
+
+def travel_minutes(km):
+    return km / AVERAGE_SPEED_KMH * 60
+
+
+def distance_matrix(latitudes, longitudes):
+    """Pairwise haversine distances in km."""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lng = np.radians(np.asarray(longitudes, dtype=float))
+    half_dlat = (lat[:, None] - lat[None, :]) / 2
+    half_dlng = (lng[:, None] - lng[None, :]) / 2
+    a = np.sin(half_dlat) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(half_dlng) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+# ── Solver ────────────────────────────────────────────────────────────────────
+# Nodes are matrix indices; 0 is the shop. A route is the list of stops
+# between leaving and returning to the shop.
+
+def route_length(dist, route):
+    path = np.array([0, *route, 0])
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+def _insertion_costs(dist, route, node):
+    """Extra distance of inserting ``node`` before each position of ``route``."""
+    path = np.array([0, *route, 0])
+    return dist[path[:-1], node] + dist[node, path[1:]] - dist[path[:-1], path[1:]]
+
+
+def _removal_gain(dist, route, position):
+    path = [0, *route, 0]
+    before, node, after = path[position], path[position + 1], path[position + 2]
+    return dist[before, node] + dist[node, after] - dist[before, after]
+
+
+def construct(dist, vehicles, capacity):
+    """Cheapest insertion, farthest stops first. Returns (routes, unassigned)."""
+    routes = [[] for _ in range(vehicles)]
+    unassigned = []
+    for node in sorted(range(1, len(dist)), key=lambda n: -dist[0, n]):
+        best = None
+        for r, route in enumerate(routes):
+            if len(route) >= capacity:
+                continue
+            costs = _insertion_costs(dist, route, node)
+            position = int(costs.argmin())
+            if best is None or costs[position] < best[0]:
+                best = (costs[position], r, position)
+        if best is None:
+            unassigned.append(node)
+        else:
+            routes[best[1]].insert(best[2], node)
+    return routes, unassigned
+
+
+def _relocate(dist, routes, capacity):
+    for r, route in enumerate(routes):
+        for position, node in enumerate(route):
+            gain = _removal_gain(dist, route, position)
+            for t, target in enumerate(routes):
+                if t == r:
+                    rest = route[:position] + route[position + 1:]
+                    costs = _insertion_costs(dist, rest, node)
+                elif len(target) < capacity:
+                    costs = _insertion_costs(dist, target, node)
+                else:
+                    continue
+                best = int(costs.argmin())
+                if costs[best] < gain - EPSILON:
+                    del route[position]
+                    (route if t == r else target).insert(best, node)
+                    return True
+    return False
+
+
+def _swap(dist, routes):
+    for r in range(len(routes)):
+        for t in range(r + 1, len(routes)):
+            first, second = routes[r], routes[t]
+            if not first or not second:
+                continue
+            base = route_length(dist, first) + route_length(dist, second)
+            for i in range(len(first)):
+                for j in range(len(second)):
+                    first[i], second[j] = second[j], first[i]
+                    if route_length(dist, first) + route_length(dist, second) < base - EPSILON:
+                        return True
+                    first[i], second[j] = second[j], first[i]
+    return False
+
+
+def _two_opt(dist, routes):
+    improved = False
+    for route in routes:
+        path = [0, *route, 0]
+        for i in range(1, len(path) - 2):
+            for j in range(i + 1, len(path) - 1):
+                a, b, c, d = path[i - 1], path[i], path[j], path[j + 1]
+                if dist[a, c] + dist[b, d] < dist[a, b] + dist[c, d] - EPSILON:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+        route[:] = path[1:-1]
+    return improved
+
+
+def solve(dist, vehicles, capacity=None):
+    """
+    Routes for ``vehicles`` over the distance matrix ``dist`` (node 0 is the
+    depot). Returns (routes, unassigned nodes).
+    """
+    stops = len(dist) - 1
+    if capacity is None:
+        capacity = math.ceil(stops / vehicles) if vehicles else 0
+    routes, unassigned = construct(dist, vehicles, capacity)
+    for _ in range(MAX_SEARCH_ROUNDS):
+        moved = _two_opt(dist, routes)
+        moved = _relocate(dist, routes, capacity) or moved
+        moved = _swap(dist, routes) or moved
+        if not moved:
+            break
+    return routes, unassigned
+
+
+# ── Shop planning ─────────────────────────────────────────────────────────────
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def stop_location(booking, task_type):
+    """Where a ``task_type`` task for ``booking`` takes staff: (latitude, longitude)."""
+    if task_type == 'pickup' and booking.return_latitude is not None:
+        return booking.return_latitude, booking.return_longitude
+    if booking.delivery_option == 'home_delivery' and booking.delivery_latitude is not None:
+        return booking.delivery_latitude, booking.delivery_longitude
+    return booking.shop.latitude, booking.shop.longitude
+
+
+def collect_stops(shop, day):
+    start, end = _day_bounds(day)
+    stops = []
+    tasks = (
+        StaffTask.objects.filter(booking__shop=shop, status='pending', scheduled_time__gte=start, scheduled_time__lt=end)
+        .select_related('booking__shop')
+    )
+    for task in tasks:
+        stops.append(Stop(task.booking, task.type, task, *stop_location(task.booking, task.type), task.scheduled_time))
+
+    deliveries = (
+        Booking.objects.filter(shop=shop, status='upcoming', delivery_option='home_delivery',
+                               start_date__gte=start, start_date__lt=end, staff_tasks__isnull=True)
+        .select_related('shop')
+    )
+    for booking in deliveries:
+        stops.append(Stop(booking, 'delivery', None, *stop_location(booking, 'delivery'), booking.start_date))
+
+    if day == timezone.localdate():
+        pickups = (
+            Booking.objects.filter(shop=shop, status='pickup_requested')
+            .exclude(Exists(StaffTask.objects.filter(
+                booking=OuterRef('pk'), type='pickup', status__in=('pending', 'in_progress'),
+            )))
+            .select_related('shop')
+        )
+        for booking in pickups:
+            stops.append(Stop(booking, 'pickup', None, *stop_location(booking, 'pickup'), timezone.now()))
+    return stops
+
+
+def plan_day(shop, day, staff, capacity=None):
+    """Plan ``day`` for ``shop`` over ``staff`` (users). Returns a Plan."""
+    stops = collect_stops(shop, day)
+    staff = list(staff)
+    if not stops or not staff:
+        return Plan({}, stops, 0.0)
+
+    dist = distance_matrix(
+        [shop.latitude] + [stop.latitude for stop in stops],
+        [shop.longitude] + [stop.longitude for stop in stops],
+    )
+    routes, unassigned = solve(dist, len(staff), capacity)
+    return Plan(
+        {member: [stops[node - 1] for node in route] for member, route in zip(staff, routes) if route},
+        [stops[node - 1] for node in unassigned],
+        sum(route_length(dist, route) for route in routes),
+    )
+
+
+def apply_plan(plan):
+    """Save the plan's assignments and visit order; returns the number of stops assigned."""
+    assigned = 0
+    items = []
+    with transaction.atomic():
+        for member, route in plan.routes.items():
+            for order, stop in enumerate(route, start=1):
+                if stop.task is None:
+                    StaffTask.objects.create(
+                        booking=stop.booking, staff=member, type=stop.type,
+                        scheduled_time=stop.scheduled_time, status='pending', route_order=order,
+                    )
+                else:
+                    moved = StaffTask.objects.filter(pk=stop.task.pk, status='pending').update(
+                        staff=member, route_order=order, updated_at=timezone.now(),
+                    )
+                    if moved:
+                        task_moved(stop.task.staff_id, 'pending', member.id, 'pending')
+            assigned += len(route)
+            items.append((member.id, 'Your run is ready', f'{len(route)} stop(s) assigned to you', {}))
+        queue_notifications('task_assigned', items)
+    return assigned
@@ -0,0 +1,244 @@
+"""
+Live staff locations.
+
+The staff app posts its GPS fixes in batches to ``/api/staff/location/``.
+``LocationStore`` keeps, in process memory, the latest fix per staff member
+and a downsampled track: a fix is kept for the track only if it is at least
+TRACK_MIN_INTERVAL after, or TRACK_MIN_DISTANCE_KM away from, the last kept
+one. Ingesting a batch is a few dict operations under a lock and never touches
+the database.
+
+Every FLUSH_INTERVAL the node that is ingesting writes what it has collected:
+the track points in one bulk insert and the latest fixes in one upsert into
+``StaffLocation``. Ingesting triggers the flush when one is due, and a
+background thread (started by the first ingest) flushes whatever is left once
+fixes stop arriving, so a staff member's last fixes are not held back. ``latest`` answers from memory and falls back to that table
+for staff members whose fixes went to another node, so with several nodes a
+position can be up to FLUSH_INTERVAL old. The buffers are also flushed at
+interpreter exit.
+
+``booking_tracking`` is what a customer sees for a home delivery or pickup
+service booking: where the assigned staff member is while the task is in
+progress and the ETA to the stop along the road (rentals.routing; a
+straight-line estimate without a road graph).
+"""
+import atexit
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from rentals.ranking import EARTH_RADIUS_KM
+from rentals.routing import route
+from .dispatch import stop_location
+from .models import StaffLocation, StaffLocationPoint, StaffTask
+
+logger = logging.getLogger(__name__)
+
+TRACK_MIN_INTERVAL = timedelta(seconds=30)
+TRACK_MIN_DISTANCE_KM = 0.05
+FLUSH_INTERVAL = 10.0  # seconds
+MAX_POINTS_PER_REQUEST = 1000
+# Fixes further in the future than this are rejected (device clock skew)
+MAX_CLOCK_SKEW = timedelta(minutes=2)
+# A position older than this is not shown to customers
+STALE_AFTER = timedelta(minutes=10)
+
+TRACKED_DELIVERY_OPTIONS = ('home_delivery', 'pickup_service')
+
+Fix = namedtuple('Fix', 'latitude longitude recorded_at accuracy speed heading')
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _optional_float(value):
+    return None if value is None else float(value)
+
+
+def parse_fix(point, now):
+    """
+    A Fix from one posted point, or None if it is unusable. ``recorded_at`` is an
+    ISO datetime; ``timestamp`` (epoch milliseconds, as the device reports it)
+    is accepted instead.
+    """
+    try:
+        latitude, longitude = float(point['latitude']), float(point['longitude'])
+        if 'timestamp' in point:
+            recorded_at = datetime.fromtimestamp(float(point['timestamp']) / 1000, tz=dt_timezone.utc)
+        else:
+            recorded_at = parse_datetime(point['recorded_at'])
+            if recorded_at is not None and timezone.is_naive(recorded_at):
+                recorded_at = timezone.make_aware(recorded_at)
+        fix = Fix(latitude, longitude, recorded_at, _optional_float(point.get('accuracy')),
+                  _optional_float(point.get('speed')), _optional_float(point.get('heading')))
+    except (KeyError, TypeError, ValueError, OverflowError, OSError):
+        return None
+    if recorded_at is None or recorded_at > now + MAX_CLOCK_SKEW:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return fix
+
+
+class LocationStore:
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._latest = {}  # staff id → Fix
+        self._kept = {}  # staff id → last Fix kept for the track
+        self._track = defaultdict(list)  # staff id → Fixes not yet written
+        self._dirty = set()  # staff ids whose latest Fix is not yet written
+        self._flushed_at = time.monotonic()
+        self._flushing = False
+        self._flusher = None
+
+    def ingest(self, staff_id, fixes):
+        """Record ``fixes`` of ``staff_id``; returns how many were newer than what we had."""
+        accepted = 0
+        with self._lock:
+            latest = self._latest.get(staff_id)
+            kept = self._kept.get(staff_id)
+            for fix in sorted(fixes, key=lambda f: f.recorded_at):
+                if latest is not None and fix.recorded_at <= latest.recorded_at:
+                    continue
+                latest = fix
+                accepted += 1
+                if (kept is None or fix.recorded_at - kept.recorded_at >= TRACK_MIN_INTERVAL
+                        or haversine_km(kept.latitude, kept.longitude, fix.latitude, fix.longitude)
+                        >= TRACK_MIN_DISTANCE_KM):
+                    self._track[staff_id].append(fix)
+                    kept = fix
+            if accepted:
+                self._latest[staff_id] = latest
+                self._kept[staff_id] = kept
+                self._dirty.add(staff_id)
+            flush_due = not self._flushing and time.monotonic() - self._flushed_at >= self.flush_interval
+            if flush_due:
+                self._flushing = True
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_periodically, name='staff-location-flush',
+                                                 daemon=True)
+                self._flusher.start()
+        if flush_due:
+            self.flush()
+        return accepted
+
+    def _flush_periodically(self):
+        """Background thread: flush buffered fixes that no ingest came to flush."""
+        while True:
+            time.sleep(self.flush_interval)
+            with self._lock:
+                flush_due = ((self._track or self._dirty) and not self._flushing
+                             and time.monotonic() - self._flushed_at >= self.flush_interval)
+                if flush_due:
+                    self._flushing = True
+            if flush_due:
+                try:
+                    self.flush()
+                finally:
+                    # This thread's connection would otherwise stay open between flushes.
+                    connection.close()
+
+    def latest(self, staff_id):
+        """The newest Fix of ``staff_id`` known to this node or persisted by any node."""
+        with self._lock:
+            fix = self._latest.get(staff_id)
+        if fix is not None and timezone.now() - fix.recorded_at < timedelta(seconds=self.flush_interval):
+            return fix
+        row = StaffLocation.objects.filter(staff_id=staff_id).first()
+        if row is not None and (fix is None or row.recorded_at > fix.recorded_at):
+            fix = Fix(row.latitude, row.longitude, row.recorded_at, row.accuracy, row.speed, row.heading)
+        return fix
+
+    def flush(self):
+        """Write buffered track points and latest fixes; returns the number of track points written."""
+        with self._lock:
+            self._flushing = True
+            track, self._track = self._track, defaultdict(list)
+            latest = {staff_id: self._latest[staff_id] for staff_id in self._dirty}
+            self._dirty = set()
+        try:
+            # Staff deleted since their fixes came in
+            existing = set(User.objects.filter(id__in={*track, *latest}).values_list('id', flat=True))
+            track = {staff_id: fixes for staff_id, fixes in track.items() if staff_id in existing}
+            latest = {staff_id: fix for staff_id, fix in latest.items() if staff_id in existing}
+            with transaction.atomic():
+                StaffLocationPoint.objects.bulk_create([
+                    StaffLocationPoint(staff_id=staff_id, latitude=fix.latitude, longitude=fix.longitude,
+                                       recorded_at=fix.recorded_at)
+                    for staff_id, fixes in track.items() for fix in fixes
+                ], batch_size=1000)
+                StaffLocation.objects.bulk_create(
+                    [StaffLocation(staff_id=staff_id, **fix._asdict()) for staff_id, fix in latest.items()],
+                    update_conflicts=True, unique_fields=['staff'],
+                    update_fields=['latitude', 'longitude', 'recorded_at', 'accuracy', 'speed', 'heading'],
+                    batch_size=1000,
+                )
+        except Exception:
+            logger.exception("Could not persist staff locations; keeping them for the next flush")
+            with self._lock:
+                for staff_id, fixes in track.items():
+                    self._track[staff_id][:0] = fixes
+                self._dirty.update(latest)
+            return 0
+        finally:
+            with self._lock:
+                self._flushing = False
+                self._flushed_at = time.monotonic()
+        return sum(len(fixes) for fixes in track.values())
+
+
+store = LocationStore()
+atexit.register(store.flush)
+
+
+def booking_tracking(booking, now=None):
+    """What the customer of ``booking`` may see of its delivery or pickup run."""
+    now = now or timezone.now()
+    # A task in progress comes before pending ones
+    task = (
+        StaffTask.objects.filter(booking=booking, status__in=('pending', 'in_progress'))
+        .select_related('staff').order_by('status', 'scheduled_time').first()
+    )
+    if task is None:
+        return {'status': 'unassigned'}
+
+    result = {
+        'status': 'assigned',
+        'task_id': task.id,
+        'task_type': task.type,
+        'staff_name': task.staff.first_name or task.staff.username,
+    }
+    # The position is only shared while the staff member is on the way
+    if task.status != 'in_progress':
+        return result
+    fix = store.latest(task.staff_id)
+    if fix is None or now - fix.recorded_at > STALE_AFTER:
+        return {**result, 'status': 'en_route'}
+
+    latitude, longitude = stop_location(booking, task.type)
+    trip = route((fix.latitude, fix.longitude), (latitude, longitude))
+    return {
+        **result,
+        'status': 'en_route',
+        'position': {
+            'latitude': fix.latitude,
+            'longitude': fix.longitude,
+            'heading': fix.heading,
+            'recorded_at': fix.recorded_at.isoformat(),
+        },
+        'destination': {'latitude': latitude, 'longitude': longitude},
+        'distance_km': round(trip.distance_km, 2),
+        'eta_minutes': math.ceil(trip.duration_s / 60),
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0003_alter_stafftask_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stafftask',
+            name='route_order',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
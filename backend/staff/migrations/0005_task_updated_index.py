@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0004_task_route_order'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stafftask',
+            index=models.Index(fields=['staff', 'updated_at'], name='staff_task_staff_updated'),
+        ),
+    ]
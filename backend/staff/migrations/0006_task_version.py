@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0005_task_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stafftask',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
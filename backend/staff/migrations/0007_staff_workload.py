@@ -0,0 +1,54 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_workloads(apps, schema_editor):
+    UserProfile = apps.get_model('rentals', 'UserProfile')
+    Complaint = apps.get_model('rentals', 'Complaint')
+    StaffTask = apps.get_model('staff', 'StaffTask')
+    StaffWorkload = apps.get_model('staff', 'StaffWorkload')
+    tasks = dict(
+        StaffTask.objects.filter(status__in=('pending', 'in_progress')).values_list('staff_id')
+        .annotate(n=models.Count('id')).values_list('staff_id', 'n')
+    )
+    complaints = dict(
+        Complaint.objects.filter(assigned_to__isnull=False).exclude(status='resolved').values_list('assigned_to_id')
+        .annotate(n=models.Count('id')).values_list('assigned_to_id', 'n')
+    )
+    StaffWorkload.objects.bulk_create([
+        StaffWorkload(staff_id=user_id, shop_id=shop_id, open_tasks=tasks.get(user_id, 0),
+                      open_complaints=complaints.get(user_id, 0),
+                      load=tasks.get(user_id, 0) + complaints.get(user_id, 0))
+        for user_id, shop_id in UserProfile.objects.filter(role='staff').values_list('user_id', 'shop_id')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('rentals', '0039_booking_coordinates'),
+        ('staff', '0006_task_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffWorkload',
+            fields=[
+                ('staff', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='workload', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('open_tasks', models.IntegerField(default=0)),
+                ('open_complaints', models.IntegerField(default=0)),
+                ('load', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rentals.rentalshop')),
+            ],
+            options={
+                'db_table': 'staff_workload',
+                'indexes': [models.Index(fields=['shop', 'load', 'staff'], name='staff_workload_shop_load')],
+            },
+        ),
+        migrations.RunPython(backfill_workloads, migrations.RunPython.noop),
+    ]
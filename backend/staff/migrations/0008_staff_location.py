@@ -0,0 +1,46 @@
+# Generated by Django 4.2.27 on 2026-10-19 19:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('staff', '0007_staff_workload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffLocation',
+            fields=[
+                ('staff', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='location', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('accuracy', models.FloatField(blank=True, null=True)),
+                ('speed', models.FloatField(blank=True, null=True)),
+                ('heading', models.FloatField(blank=True, null=True)),
+                ('recorded_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'staff_location',
+            },
+        ),
+        migrations.CreateModel(
+            name='StaffLocationPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('recorded_at', models.DateTimeField()),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_points', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'staff_location_point',
+                'indexes': [models.Index(fields=['staff', 'recorded_at'], name='staff_location_staff_time')],
+            },
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from rentals.models import Vehicle, Booking
+from rentals.models import Vehicle, Booking, RentalShop
 
 class StaffTask(models.Model):
     TASK_TYPES = [
@@ -21,13 +21,63 @@ class StaffTask(models.Model):
     # Store directly, or we can fetch through booking.
     scheduled_time = models.DateTimeField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Bumped on every status change (optimistic concurrency, see staff.transitions)
+    version = models.PositiveIntegerField(default=1)
+    # Position in the staff member's run for the day, set by staff.dispatch
+    route_order = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'staff_task'
+        indexes = [models.Index(fields=['staff', 'updated_at'], name='staff_task_staff_updated')]
 
     def __str__(self):
         return f"Task #{self.id} - {self.type} - {self.staff.username}"
 
 
+class StaffWorkload(models.Model):
+    """Open work per staff member, kept current by staff.workload."""
+    staff = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='workload')
+    # Copied from UserProfile.shop so the least-loaded lookup is one index seek
+    shop = models.ForeignKey(RentalShop, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    open_tasks = models.IntegerField(default=0)
+    open_complaints = models.IntegerField(default=0)
+    load = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'staff_workload'
+        indexes = [models.Index(fields=['shop', 'load', 'staff'], name='staff_workload_shop_load')]
+
+    def __str__(self):
+        return f"{self.staff_id}: {self.open_tasks} task(s), {self.open_complaints} complaint(s)"
+
+
+class StaffLocation(models.Model):
+    """Last known position of a staff member, written by staff.location on flush."""
+    staff = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='location')
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    accuracy = models.FloatField(null=True, blank=True)  # metres
+    speed = models.FloatField(null=True, blank=True)  # m/s
+    heading = models.FloatField(null=True, blank=True)  # degrees
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'staff_location'
+
+    def __str__(self):
+        return f"{self.staff_id} @ {self.latitude:.5f},{self.longitude:.5f} ({self.recorded_at})"
+
+
+class StaffLocationPoint(models.Model):
+    """Downsampled GPS track of a staff member."""
+    staff = models.ForeignKey(User, on_delete=models.CASCADE, related_name='location_points')
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'staff_location_point'
+        indexes = [models.Index(fields=['staff', 'recorded_at'], name='staff_location_staff_time')]
@@ -9,25 +9,21 @@ DELIVERY_OPTION_LABELS = {
 }
 
 
+def _local(dt):
+    if dt and django_timezone.is_aware(dt):
+        return django_timezone.localtime(dt)
+    return dt
+
+
 def _format_dt(dt):
-    if not dt:
-        return ''
-    if django_timezone.is_aware(dt):
-        dt = django_timezone.localtime(dt)
-    return dt.strftime('%a %b %d, %Y • %I:%M %p')
+    return dt.strftime('%a %b %d, %Y • %I:%M %p') if dt else ''
 
 
 class StaffTaskSerializer(serializers.ModelSerializer):
-    vehicleName = serializers.SerializerMethodField()
-    customerName = serializers.SerializerMethodField()
-    customerPhone = serializers.SerializerMethodField()
-    address = serializers.SerializerMethodField()
-    scheduledTime = serializers.SerializerMethodField()
-    scheduledDateDisplay = serializers.SerializerMethodField()
-    deliveryOption = serializers.SerializerMethodField()
-    deliveryOptionLabel = serializers.SerializerMethodField()
-    bookingStartDisplay = serializers.SerializerMethodField()
-    bookingEndDisplay = serializers.SerializerMethodField()
+    """
+    A task as the staff app shows it. The row is built in one pass so every
+    datetime is converted to local time once and related objects are read once.
+    """
 
     class Meta:
         model = StaffTask
@@ -35,81 +31,62 @@ class StaffTaskSerializer(serializers.ModelSerializer):
             'id', 'type', 'vehicleName', 'customerName', 'customerPhone', 'address',
             'scheduledTime', 'scheduledDateDisplay', 'status', 'booking_id',
             'deliveryOption', 'deliveryOptionLabel', 'bookingStartDisplay', 'bookingEndDisplay',
+            'route_order', 'version', 'updated_at',
         ]
-
-    def get_vehicleName(self, obj):
-        return f"{obj.booking.vehicle.brand} {obj.booking.vehicle.model}" if obj.booking and obj.booking.vehicle else "Unknown Vehicle"
-
-    def get_customerName(self, obj):
-        if not obj.booking or not obj.booking.user:
-            return "Unknown Customer"
-        user = obj.booking.user
-        name = f"{user.first_name} {user.last_name}".strip()
-        return name if name else user.username
-
-    def get_customerPhone(self, obj):
-        if not obj.booking or not obj.booking.user:
-            return ""
-        profile = getattr(obj.booking.user, 'user_profile', None)
-        if profile and profile.phone:
-            return (profile.phone or "").strip()
-        return ""
-
-    def get_address(self, obj):
+        read_only_fields = fields
+
+    def to_representation(self, obj):
+        booking = obj.booking
+        user = booking.user if booking else None
+        vehicle = booking.vehicle if booking else None
+        scheduled = _local(obj.scheduled_time)
+        option = (booking.delivery_option or '') if booking else ''
+
+        customer_name = "Unknown Customer"
+        customer_phone = ""
+        if user:
+            customer_name = f"{user.first_name} {user.last_name}".strip() or user.username
+            profile = getattr(user, 'user_profile', None)
+            customer_phone = (profile.phone or "").strip() if profile else ""
+
+        return {
+            'id': obj.id,
+            'type': obj.type,
+            'vehicleName': f"{vehicle.brand} {vehicle.model}" if vehicle else "Unknown Vehicle",
+            'customerName': customer_name,
+            'customerPhone': customer_phone,
+            'address': self._address(booking),
+            'scheduledTime': scheduled.strftime("%I:%M %p") if scheduled else "",
+            'scheduledDateDisplay': _format_dt(scheduled),
+            'status': obj.status,
+            'booking_id': obj.booking_id,
+            'deliveryOption': option,
+            'deliveryOptionLabel': DELIVERY_OPTION_LABELS.get(option, option.replace('_', ' ').title()),
+            'bookingStartDisplay': _format_dt(_local(booking.start_date)) if booking else '',
+            'bookingEndDisplay': _format_dt(_local(booking.end_date)) if booking else '',
+            'route_order': obj.route_order,
+            'version': obj.version,
+            'updated_at': serializers.DateTimeField().to_representation(obj.updated_at),
+        }
+
+    @staticmethod
+    def _address(booking):
         """Where staff should go: customer address for home delivery, else shop address."""
-        b = obj.booking
-        if not b:
+        if not booking:
             return ""
-        if b.delivery_option == 'home_delivery':
-            addr = (b.delivery_address or "").strip()
+        if booking.delivery_option == 'home_delivery':
+            addr = (booking.delivery_address or "").strip()
             if addr:
                 return addr
-            profile = getattr(b.user, 'user_profile', None) if b.user else None
+            profile = getattr(booking.user, 'user_profile', None) if booking.user else None
             if profile and profile.address:
                 return (profile.address or "").strip()
             return ""
-        if b.shop:
-            shop = b.shop
+        if booking.shop:
+            shop = booking.shop
             name = (shop.name or "").strip()
             line = (shop.address or "").strip()
             if name and line:
                 return f"{name} — {line}"
             return name or line
         return ""
-
-    def get_scheduledTime(self, obj):
-        if obj.scheduled_time:
-            dt = obj.scheduled_time
-            if django_timezone.is_aware(dt):
-                dt = django_timezone.localtime(dt)
-            return dt.strftime("%I:%M %p")
-        return ""
-
-    def get_scheduledDateDisplay(self, obj):
-        return _format_dt(obj.scheduled_time)
-
-    def get_deliveryOption(self, obj):
-        if obj.booking:
-            return obj.booking.delivery_option or ''
-        return ''
-
-    def get_deliveryOptionLabel(self, obj):
-        if not obj.booking:
-            return ''
-        key = obj.booking.delivery_option or ''
-        return DELIVERY_OPTION_LABELS.get(
-            key,
-            key.replace('_', ' ').title() if key else '',
-        )
-
-    def get_bookingStartDisplay(self, obj):
-        if obj.booking and obj.booking.start_date:
-            return _format_dt(obj.booking.start_date)
-        return ''
-
-    def get_bookingEndDisplay(self, obj):
-        if obj.booking and obj.booking.end_date:
-            return _format_dt(obj.booking.end_date)
-        return ''
-
-
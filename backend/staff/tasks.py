@@ -0,0 +1,23 @@
+"""
+Background job handlers for the staff app (see rentals.jobs).
+"""
+import logging
+
+from rentals.jobs import job
+from .models import StaffTask
+from .transitions import advance_booking
+
+logger = logging.getLogger(__name__)
+
+
+@job('bookings.advance_after_task')
+def advance_booking_after_task(task_id):
+    """
+    Jobs queued before task updates applied the booking change themselves
+    (see staff.transitions); kept so they still drain.
+    """
+    task = StaffTask.objects.get(pk=task_id)
+    if task.status == 'completed':
+        booking = advance_booking(task)
+        logger.info("Booking #%s is %s after %s task #%s", task.booking_id,
+                    booking.status if booking else None, task.type, task.id)
@@ -1,3 +1,356 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from rentals.models import Booking, Complaint, RentalShop, Vehicle
+from .dispatch import apply_plan, distance_matrix, plan_day, route_length, solve
+from .location import STALE_AFTER, Fix, LocationStore, parse_fix
+from .models import StaffLocation, StaffLocationPoint, StaffTask, StaffWorkload
+from .workload import least_loaded, recount, shop_workloads
+
+
+def make_staff(shop, username='driver'):
+    user = User.objects.create_user(username, password='secret')
+    user.user_profile.role = 'staff'
+    user.user_profile.shop = shop
+    user.user_profile.save()
+    return user
+
+
+def make_booking(shop, username='customer', **kwargs):
+    vehicle = Vehicle.objects.create(
+        shop=shop, type='car', name='City Car', brand='Maruti', model='Swift', number=f'KA-{username}',
+        price_per_hour=100, price_per_day=1000, fuel_type='petrol', transmission='manual',
+    )
+    start = timezone.now() + timedelta(hours=2)
+    return Booking.objects.create(
+        user=User.objects.create_user(username), vehicle=vehicle, shop=shop, start_date=start,
+        end_date=start + timedelta(hours=4), duration=4, total_price=400, payment_method='card', **kwargs,
+    )
+
+
+class StaffTestCase(TestCase):
+    def setUp(self):
+        self.shop = RentalShop.objects.create(name='Shop', address='1 Main St', latitude=12.97, longitude=77.59)
+        self.staff = make_staff(self.shop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def make_task(self, booking=None, task_type='delivery', **kwargs):
+        booking = booking or make_booking(self.shop)
+        return StaffTask.objects.create(staff=self.staff, booking=booking, type=task_type,
+                                        scheduled_time=booking.start_date, **kwargs)
+
+    def open_tasks(self):
+        self.staff.workload.refresh_from_db()
+        return self.staff.workload.open_tasks
+
+
+# ── Task state machine (user-043) ─────────────────────────────────────────────
+
+class TaskTransitionTests(StaffTestCase):
+    def put(self, task, **body):
+        return self.client.put(f'/api/staff/tasks/{task.id}/', body, format='json')
+
+    def test_completing_a_delivery_hands_the_vehicle_over(self):
+        task = self.make_task()
+        self.assertEqual(self.open_tasks(), 1)
+        response = self.put(task, status='in_progress', version=1)
+        self.assertEqual((response.status_code, response.data['version']), (200, 2))
+        self.put(task, status='completed', version=2)
+
+        task.refresh_from_db()
+        task.booking.refresh_from_db()
+        self.assertEqual((task.status, task.version), ('completed', 3))
+        self.assertEqual(task.booking.status, 'active')
+        self.assertEqual(self.open_tasks(), 0)
+
+    def test_completing_a_pickup_closes_the_booking(self):
+        task = self.make_task(make_booking(self.shop, status='pickup_requested'), task_type='pickup')
+        self.put(task, status='completed')
+        task.booking.refresh_from_db()
+        self.assertEqual(task.booking.status, 'completed')
+
+    def test_stale_version_conflicts(self):
+        task = self.make_task()
+        self.put(task, status='in_progress', version=1)
+        response = self.put(task, status='completed', version=1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['task']['version'], 2)
+        # Repeating a change that already happened is a no-op whatever the version
+        self.assertEqual(self.put(task, status='in_progress', version=1).status_code, 200)
+
+    def test_completed_tasks_cannot_reopen(self):
+        task = self.make_task(status='completed')
+        self.assertEqual(self.put(task, status='pending').status_code, 409)
+        self.assertEqual(self.put(task, status='lost').status_code, 400)
+
+    def test_bulk_changes_are_all_or_nothing(self):
+        first, second = self.make_task(), self.make_task(make_booking(self.shop, 'other'), status='completed')
+        response = self.client.post('/api/staff/tasks/bulk-status/', {'tasks': [
+            {'id': first.id, 'status': 'in_progress'},
+            {'id': second.id, 'status': 'pending'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(list(response.data['errors']), [second.id])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.version), ('pending', 1))
+
+        response = self.client.post('/api/staff/tasks/bulk-status/', {'tasks': [
+            {'id': first.id, 'status': 'completed', 'version': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.open_tasks(), 0)
+
+    def test_other_staff_tasks_are_not_found(self):
+        task = self.make_task()
+        self.client.force_authenticate(make_staff(self.shop, 'other-driver'))
+        self.assertEqual(self.put(task, status='completed').status_code, 404)
+
+
+# ── Dispatch (user-041) ───────────────────────────────────────────────────────
+
+class DispatchTests(StaffTestCase):
+    EAST = [(12.97, 77.62), (12.98, 77.63)]
+    WEST = [(12.97, 77.56), (12.96, 77.55)]
+
+    def setUp(self):
+        super().setUp()
+        self.other = make_staff(self.shop, 'other-driver')
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.start = timezone.make_aware(datetime.combine(self.day, time.min))
+
+    def delivery(self, username, point):
+        booking = make_booking(self.shop, username, delivery_option='home_delivery',
+                               delivery_latitude=point[0], delivery_longitude=point[1])
+        Booking.objects.filter(pk=booking.pk).update(start_date=self.start + timedelta(hours=10))
+        booking.refresh_from_db()
+        return booking
+
+    def test_solver_splits_clusters_between_vehicles(self):
+        points = [(self.shop.latitude, self.shop.longitude), *self.EAST, *self.WEST]
+        dist = distance_matrix([p[0] for p in points], [p[1] for p in points])
+        routes, unassigned = solve(dist, 2)
+        self.assertEqual(unassigned, [])
+        self.assertEqual(sorted(sorted(route) for route in routes), [[1, 2], [3, 4]])
+
+        routes, unassigned = solve(dist, 1, capacity=3)
+        self.assertEqual((len(routes[0]), len(unassigned)), (3, 1))
+        self.assertGreater(route_length(dist, routes[0]), 0)
+
+    def test_plan_assigns_new_and_existing_stops(self):
+        east = [self.delivery(f'east{i}', point) for i, point in enumerate(self.EAST)]
+        west = [self.delivery(f'west{i}', point) for i, point in enumerate(self.WEST)]
+        # Already assigned; the plan may hand it to the other driver
+        task = self.make_task(west[0])
+        StaffTask.objects.filter(pk=task.pk).update(scheduled_time=west[0].start_date)
+
+        plan = plan_day(self.shop, self.day, [self.staff, self.other])
+        self.assertEqual(plan.unassigned, [])
+        self.assertEqual(apply_plan(plan), 4)
+
+        runs = {
+            staff.id: sorted(StaffTask.objects.filter(staff=staff).values_list('booking_id', flat=True))
+            for staff in (self.staff, self.other)
+        }
+        self.assertEqual(sorted(runs.values()), sorted([sorted(b.id for b in east), sorted(b.id for b in west)]))
+        self.assertEqual(StaffTask.objects.count(), 4)
+        self.assertEqual(sorted(StaffTask.objects.values_list('route_order', flat=True)), [1, 1, 2, 2])
+        self.assertEqual(self.open_tasks(), 2)
+
+    def test_nothing_to_plan(self):
+        plan = plan_day(self.shop, self.day, [self.staff])
+        self.assertEqual((plan.routes, plan.unassigned), ({}, []))
+
+
+# ── Incremental task feed (user-042) ──────────────────────────────────────────
+
+class TaskFeedTests(StaffTestCase):
+    def feed(self, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/staff/tasks/', params, **headers)
+
+    def test_plain_list_shows_open_tasks_and_a_since_token(self):
+        task = self.make_task()
+        self.make_task(make_booking(self.shop, 'other'), status='completed')
+        response = self.feed()
+        self.assertEqual([row['id'] for row in response.data], [task.id])
+        self.assertIn('X-Next-Since', response)
+        self.assertEqual(len(self.feed(status='all').data), 2)
+
+    def test_etag_is_stable_until_a_task_changes(self):
+        task = self.make_task()
+        etag = self.feed()['ETag']
+        response = self.feed(etag)
+        self.assertEqual((response.status_code, response['ETag']), (304, etag))
+        # Another status filter is another feed
+        self.assertEqual(self.feed(etag, status='all').status_code, 200)
+
+        self.client.put(f'/api/staff/tasks/{task.id}/', {'status': 'in_progress'}, format='json')
+        response = self.feed(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_updated_since_returns_changes_and_open_ids(self):
+        changed, untouched = self.make_task(), self.make_task(make_booking(self.shop, 'other'))
+        since = self.feed()['X-Next-Since']
+        StaffTask.objects.filter(pk__in=[changed.pk, untouched.pk]).update(updated_at=timezone.now() - timedelta(hours=1))
+        Booking.objects.filter(pk__in=[changed.booking_id, untouched.booking_id]).update(
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        changed.booking.save()
+
+        response = self.feed(updated_since=since)
+        self.assertEqual([row['id'] for row in response.data['results']], [changed.id])
+        self.assertEqual(sorted(response.data['open_ids']), sorted([changed.id, untouched.id]))
+        self.assertIn('next_since', response.data)
+        self.assertEqual(self.feed(updated_since='yesterday').status_code, 400)
+
+
+# ── Workload index (user-044) ─────────────────────────────────────────────────
+
+class WorkloadTests(StaffTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = make_staff(self.shop, 'other-driver')
+
+    def load(self, staff):
+        staff.workload.refresh_from_db()
+        return staff.workload.open_tasks, staff.workload.open_complaints, staff.workload.load
+
+    def test_counters_follow_tasks_and_complaints(self):
+        task = self.make_task()
+        complaint = Complaint.objects.create(user=task.booking.user, shop=self.shop, subject='Dent',
+                                             description='…', status='assigned', assigned_to=self.staff)
+        self.assertEqual(self.load(self.staff), (1, 1, 2))
+
+        task.staff = self.other
+        task.save()
+        self.assertEqual((self.load(self.staff), self.load(self.other)), ((0, 1, 1), (1, 0, 1)))
+
+        complaint.status = 'resolved'
+        complaint.save()
+        StaffTask.objects.filter(pk=task.pk).delete()
+        self.assertEqual((self.load(self.staff), self.load(self.other)), ((0, 0, 0), (0, 0, 0)))
+
+    def test_least_loaded_skips_busy_and_inactive_staff(self):
+        self.make_task()
+        self.assertEqual(least_loaded(self.shop), self.other)
+        self.assertEqual(least_loaded(self.shop, exclude=[self.other.id]), self.staff)
+        self.other.is_active = False
+        self.other.save()
+        self.assertEqual(least_loaded(self.shop), self.staff)
+        self.assertEqual([user.id for user in shop_workloads(self.shop)], [self.staff.id, self.other.id])
+
+    def test_recount_repairs_drift(self):
+        self.make_task()
+        StaffWorkload.objects.update(open_tasks=7, load=7)
+        recount()
+        self.assertEqual((self.load(self.staff), self.load(self.other)), ((1, 0, 1), (0, 0, 0)))
+
+
+# ── Live locations (user-045) ─────────────────────────────────────────────────
+
+def fix(seconds_ago, latitude=12.97, longitude=77.59, now=None):
+    return Fix(latitude, longitude, (now or timezone.now()) - timedelta(seconds=seconds_ago), None, None, 90.0)
+
+
+class LocationStoreTests(StaffTestCase):
+    def setUp(self):
+        super().setUp()
+        # Flushed by hand; the background flusher never comes round during a test
+        self.store = LocationStore(flush_interval=3600)
+
+    def test_parse_fix(self):
+        now = timezone.now()
+        parsed = parse_fix({'latitude': '12.9', 'longitude': 77.5, 'timestamp': now.timestamp() * 1000}, now)
+        self.assertEqual((parsed.latitude, parsed.accuracy), (12.9, None))
+        self.assertAlmostEqual(parsed.recorded_at.timestamp(), now.timestamp(), places=2)
+        for point in (
+            {'latitude': 12.9, 'longitude': 77.5, 'recorded_at': (now + timedelta(hours=1)).isoformat()},
+            {'latitude': 91, 'longitude': 77.5, 'recorded_at': now.isoformat()},
+            {'latitude': 12.9, 'longitude': 77.5, 'recorded_at': 'noon'},
+            {'latitude': 12.9, 'recorded_at': now.isoformat()},
+        ):
+            self.assertIsNone(parse_fix(point, now))
+
+    def test_track_is_downsampled_and_stale_fixes_dropped(self):
+        now = timezone.now()
+        accepted = self.store.ingest(self.staff.id, [
+            fix(100, now=now),
+            fix(95, now=now),  # too soon and too close to keep for the track
+            fix(60, now=now),  # 40 s later
+            fix(55, latitude=12.971, now=now),  # ~110 m away
+        ])
+        self.assertEqual(accepted, 4)
+        self.assertEqual(self.store.ingest(self.staff.id, [fix(200, now=now)]), 0)
+        self.assertEqual(self.store.flush(), 3)
+        self.assertEqual(StaffLocationPoint.objects.filter(staff=self.staff).count(), 3)
+        self.assertEqual(StaffLocation.objects.get(staff=self.staff).latitude, 12.971)
+
+        # Another node answers from the table
+        self.assertEqual(LocationStore().latest(self.staff.id).latitude, 12.971)
+
+    def test_failed_flush_keeps_the_buffer(self):
+        self.store.ingest(self.staff.id, [fix(10)])
+        with mock.patch.object(StaffLocationPoint.objects, 'bulk_create', side_effect=DatabaseError('locked')):
+            with self.assertLogs('staff.location', 'ERROR'):
+                self.assertEqual(self.store.flush(), 0)
+        self.assertEqual(self.store.flush(), 1)
+        self.assertTrue(StaffLocation.objects.filter(staff=self.staff).exists())
+
+
+@override_settings(ROUTING_GRAPH_PATH=None)
+class TrackingTests(StaffTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = LocationStore(flush_interval=3600)
+        patcher = mock.patch('staff.location.store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.booking = make_booking(self.shop, delivery_option='home_delivery',
+                                    delivery_latitude=12.99, delivery_longitude=77.59)
+        self.customer = APIClient()
+        self.customer.force_authenticate(self.booking.user)
+
+    def track(self):
+        return self.customer.get(f'/api/bookings/{self.booking.id}/tracking/').data
+
+    def test_ingest_endpoint(self):
+        now = timezone.now().isoformat()
+        response = self.client.post('/api/staff/location/', {'points': [
+            {'latitude': 12.97, 'longitude': 77.59, 'recorded_at': now}, {'latitude': 'x'},
+        ]}, format='json')
+        self.assertEqual((response.data['accepted'], response.data['rejected']), (1, 1))
+        self.assertEqual(self.client.post('/api/staff/location/', {'points': []}, format='json').status_code, 400)
+        response = self.customer.post('/api/staff/location/', {'points': [{'latitude': 1}]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_position_is_shared_while_the_task_is_in_progress(self):
+        self.assertEqual(self.track()['status'], 'unassigned')
+        task = self.make_task(self.booking)
+        self.store.ingest(self.staff.id, [fix(5)])
+        self.assertNotIn('position', self.track())
+
+        task.status = 'in_progress'
+        task.save()
+        data = self.track()
+        self.assertEqual((data['status'], data['position']['latitude']), ('en_route', 12.97))
+        self.assertAlmostEqual(data['distance_km'], 2.2, delta=0.5)
+        self.assertGreater(data['eta_minutes'], 0)
+
+    def test_stale_positions_are_hidden(self):
+        self.make_task(self.booking, status='in_progress')
+        self.store.ingest(self.staff.id, [fix(STALE_AFTER.total_seconds() + 60)])
+        self.assertEqual(self.track()['status'], 'en_route')
+        self.assertNotIn('position', self.track())
+
+    def test_only_delivery_bookings_are_tracked(self):
+        Booking.objects.filter(pk=self.booking.pk).update(delivery_option='self_pickup')
+        response = self.customer.get(f'/api/bookings/{self.booking.id}/tracking/')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,124 @@
+"""
+Staff task state machine.
+
+A task moves pending → in_progress → completed (a task can also be completed
+straight from pending, or put back to pending). Completing a task moves its
+booking on: a delivery hands the vehicle over (upcoming → active) and a pickup
+takes it back (pickup_requested → completed). Both writes happen in the
+caller's transaction, so a task is never completed without its booking
+following.
+
+``StaffTask.version`` guards against lost updates: the task row is updated
+only if its version is still the one the caller read (or the one the client
+sent), otherwise ``TransitionError`` with status 409 is raised. Setting a task
+to the status it already has is a no-op whatever the version, so clients can
+safely retry.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from rentals.models import Booking
+from .models import StaffTask
+from .workload import OPEN_TASK_STATUSES, task_moved
+
+TASK_TRANSITIONS = {
+    'pending': ('in_progress', 'completed'),
+    'in_progress': ('pending', 'completed'),
+    'completed': (),
+}
+
+# (task type, booking status) → booking status once the task is completed
+BOOKING_ON_COMPLETION = {
+    ('delivery', 'upcoming'): 'active',
+    ('pickup', 'pickup_requested'): 'completed',
+}
+
+
+class TransitionError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def advance_booking(task):
+    """Apply the booking side of a completed task."""
+    booking = Booking.objects.select_for_update().filter(pk=task.booking_id).first()
+    if booking is None:
+        return None
+    next_status = BOOKING_ON_COMPLETION.get((task.type, booking.status))
+    if next_status:
+        booking.status = next_status
+        booking.save(update_fields=['status', 'updated_at'])
+    return booking
+
+
+def transition(task, new_status, version=None):
+    """
+    Move ``task`` to ``new_status`` (and its booking along with it). Must run
+    inside a transaction. ``version`` is the version the client last saw;
+    without it the version ``task`` was loaded with is used.
+    """
+    if new_status not in TASK_TRANSITIONS:
+        raise TransitionError("Invalid status")
+    if new_status == task.status:
+        return task
+    if version is not None:
+        try:
+            version = int(version)
+        except (TypeError, ValueError):
+            raise TransitionError("version must be an integer")
+        if version != task.version:
+            raise TransitionError("Task was changed since you loaded it", status=409)
+    if new_status not in TASK_TRANSITIONS[task.status]:
+        raise TransitionError(f"A {task.status} task cannot be moved to {new_status}", status=409)
+
+    now = timezone.now()
+    moved = StaffTask.objects.filter(pk=task.pk, version=task.version).update(
+        status=new_status, version=F('version') + 1, updated_at=now,
+    )
+    if not moved:
+        raise TransitionError("Task was changed since you loaded it", status=409)
+    task_moved(task.staff_id, task.status, task.staff_id, new_status)
+    task.status, task.version, task.updated_at = new_status, task.version + 1, now
+
+    if new_status == 'completed':
+        booking = advance_booking(task)
+        if booking is not None:
+            task.booking = booking
+    return task
+
+
+def drop_open_tasks(booking_ids):
+    """
+    Delete the pending/in-progress tasks of bookings that were cancelled, so
+    they leave the staff runs and workload counters. Returns the number deleted.
+    """
+    # Deleting through the queryset sends post_delete per task (staff.workload)
+    return StaffTask.objects.filter(booking_id__in=booking_ids, status__in=OPEN_TASK_STATUSES).delete()[0]
+
+
+def transition_many(tasks, changes):
+    """
+    Apply ``changes`` (dicts with id, status and optionally version) to
+    ``tasks`` (id → StaffTask) all or nothing. Raises ``TransitionError`` whose
+    ``errors`` maps task id → message if any change is rejected.
+    """
+    errors = {}
+    with transaction.atomic():
+        for change in changes:
+            task = tasks.get(change.get('id'))
+            if task is None:
+                errors[change.get('id')] = "Task not found"
+                continue
+            try:
+                transition(task, change.get('status'), change.get('version'))
+            except TransitionError as e:
+                errors[task.id] = str(e)
+        if errors:
+            transaction.set_rollback(True)
+    if errors:
+        error = TransitionError("Some tasks could not be updated; nothing was changed", status=409)
+        error.errors = errors
+        raise error
+    return [tasks[change['id']] for change in changes]
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import StaffTaskViewSet
+from .views import StaffTaskViewSet, location_ingest
 
 router = DefaultRouter()
 router.register(r'tasks', StaffTaskViewSet, basename='staff-tasks')
 
 
 urlpatterns = [
+    path('location/', location_ingest, name='staff-location'),
     path('', include(router.urls)),
 ]
@@ -1,18 +1,53 @@
+import hashlib
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from .models import StaffTask
 from .serializers import StaffTaskSerializer
+from .transitions import TransitionError, transition, transition_many
+
+OPEN_STATUSES = ('pending', 'in_progress')
+
+# ?updated_since= polls overlap by this much so rows committed late are not missed;
+# clients merge results by id.
+SINCE_OVERLAP = timedelta(seconds=5)
+
 
 class StaffTaskViewSet(viewsets.ModelViewSet):
+    """
+    Tasks of the logged-in staff member.
+
+    The list shows open tasks unless ``?status=`` asks for one status or
+    ``all``. With ``?updated_since=<ISO time>`` it returns only tasks changed
+    since then (task or booking, any status unless filtered) together with the
+    ids of all open tasks, so clients can drop tasks that were reassigned, and
+    ``next_since`` to send on the next poll. Plain lists carry that token in an
+    ``X-Next-Since`` header, so clients load the open tasks once and poll for
+    changes from there. Responses carry an ETag that only
+    changes when the staff member's tasks do; send it as If-None-Match to get
+    a 304.
+    """
     serializer_class = StaffTaskSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Return tasks assigned to the currently logged in staff member
+        tasks = StaffTask.objects.filter(staff=self.request.user)
+        if self.action == 'list':
+            status_filter = self._status_filter()
+            if status_filter == 'open':
+                tasks = tasks.filter(status__in=OPEN_STATUSES)
+            elif status_filter != 'all':
+                tasks = tasks.filter(status=status_filter)
         return (
-            StaffTask.objects.filter(staff=self.request.user)
-            .select_related(
+            tasks.select_related(
                 'booking',
                 'booking__vehicle',
                 'booking__shop',
@@ -21,28 +56,102 @@ class StaffTaskViewSet(viewsets.ModelViewSet):
             )
             .order_by('-created_at')
         )
+
+    def _status_filter(self):
+        default = 'all' if 'updated_since' in self.request.query_params else 'open'
+        return self.request.query_params.get('status', default)
+
+    def _change_token(self):
+        """ETag over everything that can change this staff member's feed."""
+        state = StaffTask.objects.filter(staff=self.request.user).aggregate(
+            count=Count('id'), tasks=Max('updated_at'), bookings=Max('booking__updated_at'),
+        )
+        key = f"{self.request.user.id}|{self._status_filter()}|{state['count']}|{state['tasks']}|{state['bookings']}"
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        since = None
+        if 'updated_since' in request.query_params:
+            since = parse_datetime(request.query_params['updated_since'])
+            if since is None:
+                return Response({"error": "updated_since must be an ISO 8601 datetime"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        etag = self._change_token()
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        now = timezone.now()
+        tasks = self.get_queryset()
+        if since is None:
+            return Response(self.get_serializer(tasks, many=True).data, headers={
+                'ETag': etag, 'X-Next-Since': (now - SINCE_OVERLAP).isoformat(),
+            })
+
+        changed = tasks.filter(Q(updated_at__gte=since) | Q(booking__updated_at__gte=since))
+        open_ids = StaffTask.objects.filter(staff=request.user, status__in=OPEN_STATUSES).values_list('id', flat=True)
+        return Response({
+            'results': self.get_serializer(changed, many=True).data,
+            'open_ids': list(open_ids),
+            'next_since': (now - SINCE_OVERLAP).isoformat(),
+        }, headers={'ETag': etag})
         
     def update(self, request, *args, **kwargs):
+        """Change the task's status. Body: {"status", "version"?}"""
         task = self.get_object()
-        new_status = request.data.get('status')
-        print(f"[StaffTaskViewSet] Updating Task #{task.id} to status: {new_status}")
-        
-        if new_status in dict(StaffTask.STATUS_CHOICES).keys():
-            task.status = new_status
-            task.save()
-            print(f"[StaffTaskViewSet] Task #{task.id} saved.")
-            
-            # Update the associated booking status if the task was completed
-            if new_status == 'completed' and task.booking:
-                print(f"[StaffTaskViewSet] Triggering booking status update for Booking #{task.booking.id} Type: {task.type} Current Status: {task.booking.status}")
-                if task.booking.status == 'upcoming':
-                    task.booking.status = 'active'
-                elif task.booking.status == 'pickup_requested':
-                    task.booking.status = 'completed'
-                task.booking.save()
-                print(f"[StaffTaskViewSet] Booking #{task.booking.id} status is now {task.booking.status}")
-                
-            return Response(self.get_serializer(task).data)
-        return Response({"error": "Invalid status"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic():
+                transition(task, request.data.get('status'), request.data.get('version'))
+        except TransitionError as e:
+            return Response({"error": str(e), "task": self.get_serializer(self.get_object()).data}, status=e.status)
+        return Response(self.get_serializer(task).data)
+
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """
+        Change several tasks at once, all or nothing.
+        Body: {"tasks": [{"id", "status", "version"?}, ...]}
+        """
+        changes = request.data.get('tasks')
+        try:
+            changes = [{**change, 'id': int(change['id'])} for change in changes]
+        except (KeyError, TypeError, ValueError):
+            changes = None
+        if not changes:
+            return Response({"error": "tasks must be a non-empty list of {id, status}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        tasks = {task.id: task for task in self.get_queryset().filter(id__in=[c.get('id') for c in changes])}
+        try:
+            updated = transition_many(tasks, changes)
+        except TransitionError as e:
+            return Response({"error": str(e), "errors": e.errors}, status=e.status)
+        return Response(self.get_serializer(list({t.id: t for t in updated}.values()), many=True).data)
+
+
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def location_ingest(request):
+    """
+    Batched GPS fixes from the staff app.
+    Body: {"points": [{"latitude", "longitude", "recorded_at" | "timestamp", "accuracy"?, "speed"?, "heading"?}]}
+    """
+    from .location import MAX_POINTS_PER_REQUEST, parse_fix, store
 
+    profile = getattr(request.user, 'user_profile', None)
+    if profile is None or profile.role != 'staff':
+        return Response({"error": "Only staff members can report their location"}, status=status.HTTP_403_FORBIDDEN)
+    points = request.data.get('points')
+    if not isinstance(points, list) or not points:
+        return Response({"error": "points must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(points) > MAX_POINTS_PER_REQUEST:
+        return Response({"error": f"At most {MAX_POINTS_PER_REQUEST} points per request"},
+                        status=status.HTTP_400_BAD_REQUEST)
 
+    now = timezone.now()
+    fixes = [fix for fix in (parse_fix(point, now) for point in points if isinstance(point, dict)) if fix]
+    accepted = store.ingest(request.user.id, fixes)
+    return Response({"received": len(points), "accepted": accepted, "rejected": len(points) - len(fixes)})
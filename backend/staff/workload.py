@@ -0,0 +1,164 @@
+"""
+Staff workload index.
+
+``StaffWorkload`` holds, per staff member, the number of open tasks (pending or
+in progress) and open complaints (assigned, not resolved) and their weighted
+sum ``load``. The counters move by deltas whenever a task or complaint is
+created, reassigned, closed or deleted — through model signals for ordinary
+saves and explicitly (``adjust``) in the code paths that use ``update()``
+(staff.transitions, staff.dispatch). ``recount`` rebuilds them from scratch.
+
+The (shop, load, staff) index makes ``least_loaded`` a single index seek, and
+``shop_workloads`` lists a shop's staff by load for the owner pages.
+"""
+from django.contrib.auth.models import User
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from rentals.models import Complaint, UserProfile
+from .models import StaffTask, StaffWorkload
+
+OPEN_TASK_STATUSES = ('pending', 'in_progress')
+TASK_WEIGHT = 1
+COMPLAINT_WEIGHT = 1
+
+
+def adjust(deltas):
+    """
+    Apply ``{staff_id: (task delta, complaint delta)}`` to the workload counters.
+    Users without a workload row (not staff) are ignored.
+    """
+    for staff_id, (tasks, complaints) in deltas.items():
+        if staff_id and (tasks or complaints):
+            StaffWorkload.objects.filter(staff_id=staff_id).update(
+                open_tasks=F('open_tasks') + tasks,
+                open_complaints=F('open_complaints') + complaints,
+                load=F('load') + tasks * TASK_WEIGHT + complaints * COMPLAINT_WEIGHT,
+            )
+
+
+def _moved(kind, old_staff, was_open, new_staff, is_open):
+    """One task (kind 0) or complaint (kind 1) went from (old_staff, was_open) to (new_staff, is_open)."""
+    deltas = {}
+    for staff_id, counts, sign in ((old_staff, was_open, -1), (new_staff, is_open, 1)):
+        if staff_id and counts:
+            delta = list(deltas.get(staff_id, (0, 0)))
+            delta[kind] += sign
+            deltas[staff_id] = tuple(delta)
+    adjust(deltas)
+
+
+def task_moved(old_staff, old_status, new_staff, new_status):
+    _moved(0, old_staff, old_status in OPEN_TASK_STATUSES, new_staff, new_status in OPEN_TASK_STATUSES)
+
+
+def _complaint_open(status, assigned_to):
+    return bool(assigned_to) and status != 'resolved'
+
+
+# ── Signals ───────────────────────────────────────────────────────────────────
+
+@receiver(post_init, sender=StaffTask)
+def remember_task_state(sender, instance, **kwargs):
+    instance._workload_state = (instance.__dict__.get('staff_id'), instance.__dict__.get('status'))
+
+
+@receiver(post_save, sender=StaffTask)
+def task_saved(sender, instance, created, **kwargs):
+    old_staff, old_status = (None, None) if created else instance._workload_state
+    task_moved(old_staff, old_status, instance.staff_id, instance.status)
+    instance._workload_state = (instance.staff_id, instance.status)
+
+
+@receiver(post_delete, sender=StaffTask)
+def task_deleted(sender, instance, **kwargs):
+    old_staff, old_status = instance._workload_state
+    task_moved(old_staff, old_status, None, None)
+
+
+@receiver(post_init, sender=Complaint)
+def remember_complaint_state(sender, instance, **kwargs):
+    instance._workload_state = (instance.__dict__.get('assigned_to_id'), instance.__dict__.get('status'))
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_saved(sender, instance, created, **kwargs):
+    old_staff, old_status = (None, None) if created else instance._workload_state
+    _moved(1, old_staff, _complaint_open(old_status, old_staff),
+           instance.assigned_to_id, _complaint_open(instance.status, instance.assigned_to_id))
+    instance._workload_state = (instance.assigned_to_id, instance.status)
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted(sender, instance, **kwargs):
+    old_staff, old_status = instance._workload_state
+    _moved(1, old_staff, _complaint_open(old_status, old_staff), None, False)
+
+
+@receiver(post_save, sender=UserProfile)
+def sync_staff_shop(sender, instance, **kwargs):
+    if instance.role != 'staff':
+        StaffWorkload.objects.filter(staff_id=instance.user_id).delete()
+        return
+    workload, created = StaffWorkload.objects.get_or_create(staff_id=instance.user_id, defaults={'shop_id': instance.shop_id})
+    if created:
+        recount([instance.user_id])
+    elif workload.shop_id != instance.shop_id:
+        StaffWorkload.objects.filter(pk=workload.pk).update(shop_id=instance.shop_id)
+
+
+# ── Queries ───────────────────────────────────────────────────────────────────
+
+def least_loaded(shop, exclude=()):
+    """The shop's active staff member with the lowest load (ties: lowest id), or None."""
+    workload = (
+        StaffWorkload.objects.filter(shop=shop, staff__is_active=True)
+        .exclude(staff_id__in=exclude)
+        .order_by('load', 'staff_id')
+        .select_related('staff')
+        .first()
+    )
+    return workload.staff if workload else None
+
+
+def shop_workloads(shop):
+    """The shop's staff users, least loaded first, with ``open_tasks``/``open_complaints``/``load`` attached."""
+    return (
+        User.objects.filter(workload__shop=shop, user_profile__role='staff')
+        .annotate(
+            open_tasks=F('workload__open_tasks'),
+            open_complaints=F('workload__open_complaints'),
+            load=F('workload__load'),
+        )
+        .select_related('user_profile')
+        .order_by('-is_active', 'load', 'id')
+    )
+
+
+def recount(staff_ids=None):
+    """Rebuild the counters (of ``staff_ids``, default everyone) from the task and complaint tables."""
+    profiles = UserProfile.objects.filter(role='staff')
+    rows = StaffWorkload.objects.all()
+    if staff_ids is not None:
+        profiles = profiles.filter(user_id__in=staff_ids)
+        rows = rows.filter(staff_id__in=staff_ids)
+    StaffWorkload.objects.bulk_create(
+        [StaffWorkload(staff_id=user_id, shop_id=shop_id) for user_id, shop_id in profiles.values_list('user_id', 'shop_id')],
+        ignore_conflicts=True,
+    )
+    tasks = (
+        StaffTask.objects.filter(staff_id=OuterRef('staff_id'), status__in=OPEN_TASK_STATUSES)
+        .order_by().values('staff_id').annotate(n=Count('id')).values('n')
+    )
+    complaints = (
+        Complaint.objects.filter(assigned_to_id=OuterRef('staff_id')).exclude(status='resolved')
+        .order_by().values('assigned_to_id').annotate(n=Count('id')).values('n')
+    )
+    rows.update(
+        open_tasks=Coalesce(Subquery(tasks), Value(0)),
+        open_complaints=Coalesce(Subquery(complaints), Value(0)),
+        shop_id=Subquery(UserProfile.objects.filter(user_id=OuterRef('staff_id')).values('shop_id')[:1]),
+    )
+    return rows.update(load=F('open_tasks') * TASK_WEIGHT + F('open_complaints') * COMPLAINT_WEIGHT)
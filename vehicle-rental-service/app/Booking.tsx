@@ -29,6 +29,7 @@ import {
   ScrollView,
   StyleSheet,
   Text,
+  TextInput,
   TouchableOpacity,
   View,
 } from "react-native";
@@ -37,7 +38,7 @@ import { SafeAreaView } from "react-native-safe-area-context";
 // Assuming these components handle their own modal styling,
 import { DeliveryLocationSelector } from "@/components/user/DeliveryLocationSelector";
 
-import { PaymentMethod, SavedLocation } from "@/services/api";
+import { BookingQuote, DeliveryQuote, PaymentMethod, SavedLocation } from "@/services/api";
 import { formatCurrency, getImageSource } from '@/lib/utils';
 
 type DeliveryOption = "pickup" | "delivery";
@@ -61,6 +62,14 @@ function slotToMinutes(slot: string): number {
   return h24 * 60 + minutePart;
 }
 
+/** ``date`` at the time of ``slot`` (e.g. "2:00 PM"), local. */
+function slotStartDate(date: Date, slot: string): Date {
+  const minutes = slotToMinutes(slot);
+  const start = new Date(date);
+  start.setHours(Math.floor(minutes / 60), minutes % 60, 0, 0);
+  return start;
+}
+
 function nearestBookingTimeSlot(date: Date): string {
   const target = date.getHours() * 60 + date.getMinutes();
   let best: string = BOOKING_TIME_SLOTS[0];
@@ -132,6 +141,12 @@ export default function Booking() {
 
   const [deliveryOption, setDeliveryOption] = useState<DeliveryOption>("pickup");
   const [deliveryAddress, setDeliveryAddress] = useState("");
+  const [deliveryQuote, setDeliveryQuote] = useState<DeliveryQuote | null>(null);
+  const [promoCode, setPromoCode] = useState("");
+  const [priceQuote, setPriceQuote] = useState<BookingQuote | null>(null);
+  const [priceError, setPriceError] = useState<string | null>(null);
+  const [holdToken, setHoldToken] = useState<string | null>(null);
+  const [holdError, setHoldError] = useState<string | null>(null);
   const [showDeliverySelector, setShowDeliverySelector] = useState(false);
 
   const today = new Date();
@@ -254,6 +269,115 @@ export default function Booking() {
     }, [id, editBookingId, bookingType, navigation, router]),
   );
 
+  // The delivery fee depends on how far the address is from the shop
+  const deliveryLocation = savedLocations.find(
+    (loc) => loc.address === deliveryAddress,
+  );
+  useEffect(() => {
+    if (deliveryOption !== "delivery" || !vehicle || !deliveryAddress) {
+      setDeliveryQuote(null);
+      return;
+    }
+    let cancelled = false;
+    api
+      .getDeliveryQuote(vehicle.shopId, {
+        savedLocationId: deliveryLocation?.id,
+        address: deliveryAddress,
+      })
+      .then((quote) => {
+        if (!cancelled) setDeliveryQuote(quote);
+      })
+      .catch(() => {
+        if (!cancelled) setDeliveryQuote(null);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [deliveryOption, vehicle, deliveryAddress, deliveryLocation?.id]);
+
+  // Hold the vehicle for the chosen window while the form is open, so nobody
+  // else can book it before this customer confirms. Released on change/leave.
+  useEffect(() => {
+    if (!kycVerified || !vehicle || !id || editBookingId) return;
+    let cancelled = false;
+    let placed: string | null = null;
+    const timer = setTimeout(() => {
+      api
+        .placeHold({
+          vehicle_id: parseInt(id, 10),
+          booking_type: bookingType,
+          start_date: slotStartDate(selectedDate, selectedTime).toISOString(),
+          duration,
+        })
+        .then((hold) => {
+          placed = hold.token;
+          if (cancelled) {
+            api.releaseHold(hold.token);
+            return;
+          }
+          setHoldToken(hold.token);
+          setHoldError(null);
+        })
+        .catch((err: Error) => {
+          if (cancelled) return;
+          setHoldToken(null);
+          setHoldError(err.message);
+        });
+    }, 500);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+      if (placed) api.releaseHold(placed);
+    };
+  }, [kycVerified, vehicle, id, editBookingId, bookingType, selectedDate, selectedTime, duration]);
+
+  // Surges, discounts and promo codes are applied by the server
+  useEffect(() => {
+    if (!vehicle || !id || (deliveryOption === "delivery" && !deliveryAddress)) {
+      setPriceQuote(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      api
+        .getBookingQuote({
+          vehicle_id: parseInt(id, 10),
+          booking_type: bookingType,
+          start_date: slotStartDate(selectedDate, selectedTime).toISOString(),
+          duration,
+          delivery_option: deliveryOption === "pickup" ? "self_pickup" : "home_delivery",
+          delivery_address: deliveryOption === "delivery" ? deliveryAddress : undefined,
+          saved_location_id: deliveryOption === "delivery" ? deliveryLocation?.id : undefined,
+          promo_code: promoCode.trim() || undefined,
+        })
+        .then((quote) => {
+          if (cancelled) return;
+          setPriceQuote(quote);
+          setPriceError(null);
+        })
+        .catch((err: Error) => {
+          if (cancelled) return;
+          setPriceQuote(null);
+          setPriceError(err.message);
+        });
+    }, 300);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [
+    vehicle,
+    id,
+    bookingType,
+    selectedDate,
+    selectedTime,
+    duration,
+    deliveryOption,
+    deliveryAddress,
+    deliveryLocation?.id,
+    promoCode,
+  ]);
+
   if (loading) {
     return (
       <View style={styles.centerContainer}>
@@ -280,9 +404,13 @@ export default function Booking() {
 
   const pricePerUnit =
     bookingType === "day" ? vehicle.pricePerDay : vehicle.pricePerHour;
-  const deliveryFee = deliveryOption === "delivery" ? 10 : 0;
-  const serviceFee = 5;
-  const totalPrice = pricePerUnit * duration + deliveryFee + serviceFee;
+  const deliveryFee =
+    deliveryOption === "delivery"
+      ? (priceQuote?.deliveryFee ?? deliveryQuote?.deliveryFee ?? 10)
+      : 0;
+  const serviceFee = priceQuote?.serviceFee ?? 5;
+  const totalPrice =
+    priceQuote?.totalPrice ?? pricePerUnit * duration + deliveryFee + serviceFee;
 
   // Calendar Logic
   const months = [
@@ -351,23 +479,14 @@ export default function Booking() {
       Alert.alert("Error", "Please set a delivery location");
       return;
     }
+    if (deliveryOption === "delivery" && deliveryQuote && !deliveryQuote.deliverable) {
+      Alert.alert("Error", "This address is outside the shop's delivery area");
+      return;
+    }
 
     try {
       // Combine date and time for start_date
-      const [hours, rest] = selectedTime.split(":");
-      const minutePart = rest?.split(" ")[0] ?? "0";
-      const period = selectedTime.toUpperCase().includes("PM") ? "PM" : "AM";
-      let hour24 = parseInt(hours ?? "10", 10);
-
-      if (period === "PM" && hour24 !== 12) {
-        hour24 += 12;
-      } else if (period === "AM" && hour24 === 12) {
-        hour24 = 0;
-      }
-
-      const startDateTime = new Date(selectedDate);
-      startDateTime.setHours(hour24, parseInt(minutePart, 10));
-      startDateTime.setSeconds(0, 0);
+      const startDateTime = slotStartDate(selectedDate, selectedTime);
 
       if (startDateTime.getTime() < Date.now()) {
         Alert.alert(
@@ -388,6 +507,10 @@ export default function Booking() {
         delivery_option: deliveryOptionBackend as "self_pickup" | "home_delivery",
         delivery_address:
           deliveryOption === "delivery" ? deliveryAddress : undefined,
+        saved_location_id:
+          deliveryOption === "delivery" ? deliveryLocation?.id : undefined,
+        promo_code: promoCode.trim() || undefined,
+        hold_token: holdToken ?? undefined,
         payment_method:
           (savedPaymentMethods.find((p) => p.id === paymentMethodId)
             ?.type as "card" | "upi" | "wallet") || "card",
@@ -781,16 +904,43 @@ export default function Booking() {
             </Text>
             <Text style={styles.summaryValue}>{formatCurrency(pricePerUnit * duration)}</Text>
           </View>
+          {priceQuote?.adjustments.map((adjustment) => (
+            <View key={`${adjustment.kind}-${adjustment.label}`} style={styles.summaryRow}>
+              <Text style={styles.mutedText}>{adjustment.label}</Text>
+              <Text style={styles.summaryValue}>
+                {adjustment.amount < 0
+                  ? `-${formatCurrency(-adjustment.amount)}`
+                  : formatCurrency(adjustment.amount)}
+              </Text>
+            </View>
+          ))}
           {deliveryFee > 0 && (
             <View style={styles.summaryRow}>
               <Text style={styles.mutedText}>Delivery fee</Text>
               <Text style={styles.summaryValue}>{formatCurrency(deliveryFee)}</Text>
             </View>
           )}
+          {deliveryOption === "delivery" && deliveryQuote && !deliveryQuote.deliverable && (
+            <View style={styles.summaryRow}>
+              <Text style={styles.mutedText}>Outside the shop's delivery area</Text>
+            </View>
+          )}
           <View style={styles.summaryRow}>
             <Text style={styles.mutedText}>Service fee</Text>
             <Text style={styles.summaryValue}>{formatCurrency(serviceFee)}</Text>
           </View>
+          <TextInput
+            style={styles.promoInput}
+            placeholder="Promo code"
+            placeholderTextColor="#64748b"
+            autoCapitalize="characters"
+            value={promoCode}
+            onChangeText={setPromoCode}
+          />
+          {priceError && promoCode.trim() !== "" && (
+            <Text style={styles.promoError}>{priceError}</Text>
+          )}
+          {holdError && <Text style={styles.promoError}>{holdError}</Text>}
           <View style={styles.divider} />
           <View style={styles.summaryRow}>
             <Text style={styles.totalLabel}>Total</Text>
@@ -1120,6 +1270,16 @@ const styles = StyleSheet.create({
     marginBottom: 8,
   },
   summaryValue: { fontWeight: "500", color: "#ffffff" },
+  promoInput: {
+    borderWidth: 1,
+    borderColor: "#334155",
+    borderRadius: 8,
+    paddingHorizontal: 12,
+    paddingVertical: 8,
+    marginTop: 4,
+    color: "#ffffff",
+  },
+  promoError: { fontSize: 12, color: "#f87171", marginTop: 4 },
   divider: { height: 1, backgroundColor: "#334155", marginVertical: 12 },
   totalLabel: { fontSize: 18, fontWeight: "600", color: "#ffffff" },
   totalValue: { fontSize: 18, fontWeight: "bold", color: "#2dd4bf" },
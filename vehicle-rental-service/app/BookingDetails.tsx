@@ -30,12 +30,20 @@ import {
   Alert,
 } from "react-native";
 import { useSafeAreaInsets } from "react-native-safe-area-context";
-import { api, profileApi, SavedLocation } from "@/services/api";
+import { api, BookingTracking, profileApi, SavedLocation } from "@/services/api";
 import { Booking } from "@/types";
 import { DeliveryLocationSelector } from "@/components/user/DeliveryLocationSelector";
 import { formatCurrency, getImageSource } from '@/lib/utils';
 
 const SCREEN_HEIGHT = Dimensions.get("window").height;
+const TRACKING_POLL_MS = 15000;
+
+const trackingText = (tracking: BookingTracking) => {
+  if (tracking.status === "unassigned") return "Waiting for the shop to assign a driver";
+  if (tracking.status === "assigned") return `${tracking.staffName} will be on the way soon`;
+  if (tracking.etaMinutes == null) return `${tracking.staffName} is on the way`;
+  return `${tracking.staffName} is on the way · about ${tracking.etaMinutes} min (${tracking.distanceKm} km)`;
+};
 
 export default function BookingDetails() {
   const route = useRoute();
@@ -50,6 +58,30 @@ export default function BookingDetails() {
   const [showPickupSelector, setShowPickupSelector] = useState(false);
   const [savedLocations, setSavedLocations] = useState<SavedLocation[]>([]);
   const [isRequestingPickup, setIsRequestingPickup] = useState(false);
+  const [tracking, setTracking] = useState<BookingTracking | null>(null);
+
+  // A staff member drives to the customer for home deliveries and pickup requests
+  const tracked =
+    !!booking &&
+    ((booking.deliveryOption === "delivery" && booking.status === "upcoming") ||
+      booking.status === "pickup_requested");
+
+  useFocusEffect(
+    React.useCallback(() => {
+      if (!id || !tracked) {
+        setTracking(null);
+        return;
+      }
+      const fetchTracking = () =>
+        api
+          .getBookingTracking(id)
+          .then(setTracking)
+          .catch((e) => console.log("Failed to load tracking", e));
+      fetchTracking();
+      const interval = setInterval(fetchTracking, TRACKING_POLL_MS);
+      return () => clearInterval(interval);
+    }, [id, tracked]),
+  );
 
   useFocusEffect(
     React.useCallback(() => {
@@ -373,6 +405,23 @@ export default function BookingDetails() {
             </View>
           </View>
 
+          {tracking && (
+            <View style={styles.card}>
+              <Text style={styles.sectionTitle}>
+                {tracking.taskType === "pickup" ? "Vehicle Pickup" : "Delivery Status"}
+              </Text>
+              <View style={styles.scheduleRow}>
+                <View style={styles.iconBoxSecondary}>
+                  <Navigation size={20} color="#94a3b8" />
+                </View>
+                <View style={styles.scheduleTextContainer}>
+                  <Text style={styles.label}>Driver</Text>
+                  <Text style={styles.value}>{trackingText(tracking)}</Text>
+                </View>
+              </View>
+            </View>
+          )}
+
           {/* Payment Summary */}
           <View style={styles.card}>
             <Text style={styles.sectionTitle}>Payment Summary</Text>
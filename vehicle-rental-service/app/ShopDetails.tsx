@@ -1,6 +1,6 @@
 import { getImageSource } from '@/lib/utils';
 import { VehicleCard } from "@/components/VehicleCard";
-import { api, chatApi, favoritesApi } from "@/services/api";
+import { api, chatApi, favoritesApi, VehicleQuote } from "@/services/api";
 import { useAuth } from "@/context/AuthContext";
 import { RentalShop, Vehicle } from "@/types";
 import { UserStackParamList } from "@/navigation/types";
@@ -43,6 +43,9 @@ type ShopDetailsNavigationProp = NativeStackNavigationProp<
   "ShopDetails"
 >;
 
+// Window the fleet is priced for: the next QUOTE_HOURS, like the booking form's default
+const QUOTE_HOURS = 4;
+
 export default function ShopDetails() {
   const router = useRouter();
   const route = useRoute<ShopDetailsRouteProp>();
@@ -53,6 +56,7 @@ export default function ShopDetails() {
 
   const [shop, setShop] = useState<RentalShop | null>(null);
   const [shopVehicles, setShopVehicles] = useState<Vehicle[]>([]);
+  const [quotes, setQuotes] = useState<Record<string, VehicleQuote>>({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -71,6 +75,18 @@ export default function ShopDetails() {
           ]);
           setShop(shopData);
           setShopVehicles(vehiclesData);
+          // The whole fleet priced for the next QUOTE_HOURS, in one request
+          const start = new Date();
+          start.setHours(start.getHours() + 1, 0, 0, 0);
+          api
+            .getQuotes({
+              shopId: id,
+              bookingType: "hour",
+              startDate: start.toISOString(),
+              duration: QUOTE_HOURS,
+            })
+            .then((list) => setQuotes(Object.fromEntries(list.map((q) => [q.vehicleId, q]))))
+            .catch((err) => console.error("Failed to fetch quotes:", err));
           try {
             const faved = await favoritesApi.checkFavorite(id);
             setIsFavorited(faved);
@@ -241,7 +257,13 @@ export default function ShopDetails() {
 
           <View className="gap-y-4">
             {filteredVehicles.map((vehicle) => (
-              <VehicleCard key={vehicle.id} vehicle={vehicle} onPress={() => navigation.navigate("VehicleDetails", { id: vehicle.id })} />
+              <VehicleCard
+                key={vehicle.id}
+                vehicle={vehicle}
+                quote={quotes[vehicle.id]}
+                quoteLabel={`for ${QUOTE_HOURS} hrs`}
+                onPress={() => navigation.navigate("VehicleDetails", { id: vehicle.id })}
+              />
             ))}
           </View>
         </View>
@@ -11,6 +11,7 @@ import { WebView } from "react-native-webview";
 import { X, Navigation } from "lucide-react-native";
 import { useSafeAreaInsets } from "react-native-safe-area-context";
 import * as Location from "expo-location";
+import { routingApi } from "@/services/api";
 
 // Fixed color palette matching the rest of the application
 const colors = {
@@ -137,30 +138,26 @@ export default function ShopNavigation() {
     if (!location) return;
 
     try {
-      // Use OSRM for routing (free public API)
-      const response = await fetch(
-        `https://router.project-osrm.org/route/v1/driving/${location.longitude},${location.latitude};${stationLng},${stationLat}?overview=full&geometries=geojson`
-      );
-      const data = await response.json();
-
-      if (data.routes && data.routes.length > 0) {
-        const route = data.routes[0];
-        setRouteInfo({
-          distance: route.distance / 1000, // meters to km
-          duration: route.duration, // seconds
-        });
+      // Routed by the backend (cached road graph)
+      const route = await routingApi.getRoute(location, {
+        latitude: stationLat,
+        longitude: stationLng,
+      });
+      setRouteInfo({
+        distance: route.distanceKm,
+        duration: route.durationSeconds,
+      });
 
-        // Pass route geometry to WebView
-        if (webViewRef.current) {
-          webViewRef.current.postMessage(
-            JSON.stringify({
-              type: "DRAW_ROUTE",
-              geometry: route.geometry,
-              start: [location.latitude, location.longitude],
-              end: [stationLat, stationLng],
-            })
-          );
-        }
+      // Pass route geometry to WebView
+      if (webViewRef.current) {
+        webViewRef.current.postMessage(
+          JSON.stringify({
+            type: "DRAW_ROUTE",
+            geometry: route.geometry,
+            start: [location.latitude, location.longitude],
+            end: [stationLat, stationLng],
+          })
+        );
       }
     } catch (error) {
       console.error("Error fetching route:", error);
@@ -12,7 +12,7 @@ import {
   Truck,
   User,
 } from "lucide-react-native";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   ActivityIndicator,
   Linking,
@@ -24,9 +24,10 @@ import {
 } from "react-native";
 import { SafeAreaView } from "react-native-safe-area-context";
 import Toast from "react-native-toast-message";
-import { staffApi, chatApi, StaffTask } from "@/services/api";
+import { staffApi, chatApi, StaffTask, StaffTaskChanges } from "@/services/api";
 import { useFocusEffect } from "expo-router";
 import { useAuth } from "@/context/AuthContext";
+import { useLocationReporting } from "@/hooks/use-location-reporting";
 import React from "react";
 
 // Theme Colors matching the screenshots
@@ -41,6 +42,18 @@ const COLORS = {
   success: "#22C55E",
 };
 
+/** Apply an incremental poll: replace changed tasks, add new ones, drop reassigned ones. */
+const mergeTaskChanges = (prev: StaffTask[], changes: StaffTaskChanges) => {
+  const changed = new Map(changes.tasks.map((t) => [t.id, t]));
+  const open = new Set(changes.openIds);
+  const merged = prev.map((t) => changed.get(t.id) ?? t);
+  const known = new Set(prev.map((t) => t.id));
+  const added = changes.tasks.filter((t) => !known.has(t.id));
+  return [...added, ...merged].filter(
+    (t) => t.status === "completed" || open.has(t.id),
+  );
+};
+
 export default function AssignedTasks() {
   const router = useRouter();
   const [tasks, setTasks] = useState<StaffTask[]>([]);
@@ -48,13 +61,39 @@ export default function AssignedTasks() {
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
   const { token } = useAuth();
+  // Where the incremental feed left off; null until the open tasks are loaded
+  const feed = useRef<{ since: string | null; etag: string | null }>({
+    since: null,
+    etag: null,
+  });
+  // Completed tasks are only fetched once the Done tab is opened
+  const completedLoaded = useRef(false);
 
   const fetchTasks = async (showRefresh = false) => {
-    if (showRefresh) setRefreshing(true);
+    if (showRefresh) {
+      setRefreshing(true);
+      feed.current = { since: null, etag: null };
+    }
     try {
-      const data = await staffApi.getAssignedTasks();
-      // Only set tasks if the network request actually returns valid data
-      if (Array.isArray(data)) setTasks(data);
+      if (feed.current.since === null) {
+        const snapshot = await staffApi.getTaskSnapshot("open");
+        feed.current = { since: snapshot.nextSince, etag: null };
+        const open = new Set(snapshot.tasks.map((t) => t.id));
+        setTasks((prev) => [
+          ...snapshot.tasks,
+          ...prev.filter((t) => t.status === "completed" && !open.has(t.id)),
+        ]);
+        return;
+      }
+      const changes = await staffApi.getTaskChanges(
+        feed.current.since,
+        feed.current.etag,
+      );
+      // null: nothing moved since the last poll
+      if (changes) {
+        feed.current = { since: changes.nextSince, etag: changes.etag };
+        setTasks((prev) => mergeTaskChanges(prev, changes));
+      }
     } catch (error) {
       console.error(error);
       // We don't want to show a toast on every silent background poll failure
@@ -85,6 +124,26 @@ export default function AssignedTasks() {
     }, []),
   );
 
+  // Share the position with customers while a delivery or pickup is under way
+  useLocationReporting(tasks.some((t) => t.status === "in_progress"));
+
+  useEffect(() => {
+    if (activeTab !== "Done" || completedLoaded.current) return;
+    completedLoaded.current = true;
+    staffApi
+      .getTaskSnapshot("completed")
+      .then(({ tasks: completed }) =>
+        setTasks((prev) => {
+          const known = new Set(prev.map((t) => t.id));
+          return [...prev, ...completed.filter((t) => !known.has(t.id))];
+        }),
+      )
+      .catch((error) => {
+        completedLoaded.current = false;
+        console.error(error);
+      });
+  }, [activeTab]);
+
   const onRefresh = () => {
     fetchTasks(true);
   };
@@ -99,14 +158,17 @@ export default function AssignedTasks() {
     return true;
   });
 
+  const versionOf = (taskId: string) =>
+    tasks.find((t) => t.id === taskId)?.version;
+
   const startTask = async (taskId: string) => {
     try {
-      await staffApi.updateTaskStatus(taskId, "in_progress");
-      setTasks((prev) =>
-        prev.map((t) =>
-          t.id === taskId ? { ...t, status: "in_progress" } : t,
-        ),
+      const updated = await staffApi.updateTaskStatus(
+        taskId,
+        "in_progress",
+        versionOf(taskId),
       );
+      setTasks((prev) => prev.map((t) => (t.id === taskId ? updated : t)));
       Toast.show({
         type: "success",
         text1: "Task Started",
@@ -116,17 +178,19 @@ export default function AssignedTasks() {
       Toast.show({
         type: "error",
         text1: "Error",
-        text2: "Failed to start task",
+        text2: e instanceof Error ? e.message : "Failed to start task",
       });
     }
   };
 
   const completeTask = async (taskId: string) => {
     try {
-      await staffApi.updateTaskStatus(taskId, "completed");
-      setTasks((prev) =>
-        prev.map((t) => (t.id === taskId ? { ...t, status: "completed" } : t)),
+      const updated = await staffApi.updateTaskStatus(
+        taskId,
+        "completed",
+        versionOf(taskId),
       );
+      setTasks((prev) => prev.map((t) => (t.id === taskId ? updated : t)));
       Toast.show({
         type: "success",
         text1: "Task Completed",
@@ -136,7 +200,7 @@ export default function AssignedTasks() {
       Toast.show({
         type: "error",
         text1: "Error",
-        text2: "Failed to complete task",
+        text2: e instanceof Error ? e.message : "Failed to complete task",
       });
     }
   };
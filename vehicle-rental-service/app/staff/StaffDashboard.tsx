@@ -57,7 +57,7 @@ export default function StaffDashboard() {
   const fetchTasks = async () => {
     try {
       const [data, complaintsData] = await Promise.all([
-        staffApi.getAssignedTasks(),
+        staffApi.getAssignedTasks("all"),
         staffApi.getAssignedComplaints(),
       ]);
       const active = data.filter((t) => t.status !== "completed");
@@ -2,18 +2,24 @@ import { Bike, Car, Fuel, Settings2, Users } from "lucide-react-native";
 import React from "react";
 import { Image, StyleSheet, Text, TouchableOpacity, View } from "react-native";
 import { Vehicle } from "@/types";
+import { VehicleQuote } from "@/services/api";
 import { formatCurrency, getImageSource } from '@/lib/utils';
 
 interface VehicleCardProps {
   vehicle: Vehicle;
   onPress: () => void;
+  /** Price and availability for the rental window being browsed, from /api/quotes/. */
+  quote?: VehicleQuote;
+  quoteLabel?: string;
 }
 
-export const VehicleCard = ({ vehicle, onPress }: VehicleCardProps) => {
+export const VehicleCard = ({ vehicle, onPress, quote, quoteLabel }: VehicleCardProps) => {
   // Function to capitalize only the first letter
   const capitalize = (str: string) => 
     str ? str.charAt(0).toUpperCase() + str.slice(1).toLowerCase() : "";
 
+  const isAvailable = quote ? quote.available : vehicle.isAvailable;
+
   return (
     <TouchableOpacity onPress={onPress} activeOpacity={0.9} style={styles.card}>
       <View style={styles.imageContainer}>
@@ -40,16 +46,16 @@ export const VehicleCard = ({ vehicle, onPress }: VehicleCardProps) => {
           <View
             style={[
               styles.statusBadge,
-              vehicle.isAvailable ? styles.bgSuccessSubtle : styles.bgDestructiveSubtle,
+              isAvailable ? styles.bgSuccessSubtle : styles.bgDestructiveSubtle,
             ]}
           >
             <Text
               style={[
                 styles.statusText,
-                vehicle.isAvailable ? styles.textSuccess : styles.textDestructive,
+                isAvailable ? styles.textSuccess : styles.textDestructive,
               ]}
             >
-              {vehicle.isAvailable ? "Available" : "Booked"}
+              {isAvailable ? "Available" : "Booked"}
             </Text>
           </View>
         </View>
@@ -67,8 +73,17 @@ export const VehicleCard = ({ vehicle, onPress }: VehicleCardProps) => {
             </Text>
           </View>
           <View style={styles.priceContainer}>
-            <Text style={styles.price}>{formatCurrency(vehicle.pricePerHour)}</Text>
-            <Text style={styles.priceUnit}>/hr</Text>
+            {quote ? (
+              <>
+                <Text style={styles.price}>{formatCurrency(quote.totalPrice)}</Text>
+                <Text style={styles.priceUnit}>{quoteLabel ?? "total"}</Text>
+              </>
+            ) : (
+              <>
+                <Text style={styles.price}>{formatCurrency(vehicle.pricePerHour)}</Text>
+                <Text style={styles.priceUnit}>/hr</Text>
+              </>
+            )}
           </View>
         </View>
 
@@ -8,6 +8,10 @@ import React, {
 } from "react";
 import { AuthUser, mockUsers } from "../types/auth";
 import Constants from "expo-constants";
+import {
+  registerForPushNotifications,
+  unregisterFromPushNotifications,
+} from "../services/push";
 
 const getBaseUrl = () => {
   // Try to get the machine's IP from the Expo packager
@@ -90,6 +94,14 @@ export const AuthProvider = ({ children }: { children: React.ReactNode }) => {
     loadUser();
   }, []);
 
+  // Register for push notifications whenever someone is signed in
+  useEffect(() => {
+    if (!token) return;
+    registerForPushNotifications().catch((e) =>
+      console.warn("Push notification registration failed", e),
+    );
+  }, [token]);
+
   const login = useCallback(async (email: string, password: string) => {
     try {
       // Use dynamic base URL
@@ -171,6 +183,12 @@ export const AuthProvider = ({ children }: { children: React.ReactNode }) => {
   );
 
   const logout = useCallback(async () => {
+    try {
+      // Needs the auth token, so runs before it is removed
+      await unregisterFromPushNotifications();
+    } catch (e) {
+      console.warn("Failed to unregister push device", e);
+    }
     setUser(null);
     setToken(null);
     try {
@@ -0,0 +1,62 @@
+import * as Location from "expo-location";
+import { useEffect } from "react";
+import { staffApi } from "@/services/api";
+
+const SEND_INTERVAL_MS = 15000;
+// The server accepts at most 1000 points per request
+const MAX_BUFFERED_POINTS = 1000;
+
+type Point = Parameters<typeof staffApi.sendLocations>[0][number];
+
+/**
+ * While `active`, watch the device position and report the fixes to the
+ * backend in batches (staff on a delivery or pickup run), so customers can
+ * follow the run. Fixes that fail to send are retried with the next batch.
+ */
+export function useLocationReporting(active: boolean) {
+  useEffect(() => {
+    if (!active) return;
+
+    let cancelled = false;
+    let subscription: Location.LocationSubscription | null = null;
+    let buffer: Point[] = [];
+
+    const send = () => {
+      if (buffer.length === 0) return;
+      const points = buffer;
+      buffer = [];
+      staffApi.sendLocations(points).catch((e) => {
+        console.warn("Failed to send location", e);
+        buffer = [...points, ...buffer].slice(-MAX_BUFFERED_POINTS);
+      });
+    };
+
+    (async () => {
+      const { status } = await Location.requestForegroundPermissionsAsync();
+      if (status !== "granted" || cancelled) return;
+      subscription = await Location.watchPositionAsync(
+        { accuracy: Location.Accuracy.High, timeInterval: 5000, distanceInterval: 10 },
+        (location) => {
+          buffer.push({
+            latitude: location.coords.latitude,
+            longitude: location.coords.longitude,
+            timestamp: location.timestamp,
+            accuracy: location.coords.accuracy,
+            speed: location.coords.speed,
+            heading: location.coords.heading,
+          });
+          buffer = buffer.slice(-MAX_BUFFERED_POINTS);
+        },
+      );
+      if (cancelled) subscription.remove();
+    })();
+
+    const interval = setInterval(send, SEND_INTERVAL_MS);
+    return () => {
+      cancelled = true;
+      subscription?.remove();
+      clearInterval(interval);
+      send();
+    };
+  }, [active]);
+}
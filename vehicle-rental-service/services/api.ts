@@ -87,6 +87,9 @@ export const api = {
     duration: number;
     delivery_option: "self_pickup" | "pickup_service" | "home_delivery";
     delivery_address?: string;
+    saved_location_id?: string | number;
+    promo_code?: string;
+    hold_token?: string;
     payment_method: "card" | "upi" | "wallet";
   }): Promise<any> {
     const token = await getAuthToken();
@@ -129,6 +132,8 @@ export const api = {
       duration: number;
       delivery_option: "self_pickup" | "pickup_service" | "home_delivery";
       delivery_address?: string;
+      saved_location_id?: string | number;
+      promo_code?: string;
       payment_method: "card" | "upi" | "wallet";
     },
   ): Promise<any> {
@@ -221,6 +226,256 @@ export const api = {
       throw new Error(errorData.error || "Failed to request pickup");
     }
   },
+
+  /** Driver position and ETA for a home delivery / pickup service booking */
+  async getBookingTracking(id: string): Promise<BookingTracking> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const response = await fetch(`${API_BASE_URL}/bookings/${id}/tracking/`, {
+      headers: authHeaders(token),
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.error || "Failed to fetch tracking");
+    }
+    const data = await response.json();
+    return {
+      status: data.status,
+      taskType: data.task_type ?? null,
+      staffName: data.staff_name ?? null,
+      position: data.position
+        ? {
+            latitude: data.position.latitude,
+            longitude: data.position.longitude,
+            heading: data.position.heading,
+            recordedAt: data.position.recorded_at,
+          }
+        : null,
+      destination: data.destination ?? null,
+      distanceKm: data.distance_km ?? null,
+      etaMinutes: data.eta_minutes ?? null,
+    };
+  },
+
+  async getBookingQuote(bookingData: {
+    vehicle_id: string | number;
+    booking_type: "hour" | "day";
+    start_date: string;
+    duration: number;
+    delivery_option: "self_pickup" | "pickup_service" | "home_delivery";
+    delivery_address?: string;
+    saved_location_id?: string | number;
+    promo_code?: string;
+  }): Promise<BookingQuote> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const response = await fetch(`${API_BASE_URL}/bookings/quote/`, {
+      method: "POST",
+      headers: authHeaders(token),
+      body: JSON.stringify(bookingData),
+    });
+    const data = await response.json().catch(() => ({}));
+    if (!response.ok) {
+      const message = Object.values(data as Record<string, unknown>).flat().filter(Boolean)[0];
+      throw new Error(typeof message === "string" ? message : "Failed to fetch price");
+    }
+    return {
+      available: data.available,
+      basePrice: parseFloat(data.base_price),
+      adjustments: (data.adjustments ?? []).map((a: any) => ({
+        label: a.label,
+        kind: a.kind,
+        amount: parseFloat(a.amount),
+      })),
+      deliveryFee: parseFloat(data.delivery_fee),
+      serviceFee: parseFloat(data.service_fee),
+      totalPrice: parseFloat(data.total_price),
+      promoCode: data.promo_code ?? null,
+    };
+  },
+
+  async placeHold(hold: {
+    vehicle_id: string | number;
+    booking_type: "hour" | "day";
+    start_date: string;
+    duration: number;
+  }): Promise<BookingHold> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const response = await fetch(`${API_BASE_URL}/holds/`, {
+      method: "POST",
+      headers: authHeaders(token),
+      body: JSON.stringify(hold),
+    });
+    const data = await response.json().catch(() => ({}));
+    if (!response.ok) {
+      throw new Error(data.error || "Could not hold this vehicle");
+    }
+    return { token: data.token, expiresAt: data.expires_at };
+  },
+
+  async releaseHold(holdToken: string): Promise<void> {
+    const token = await getAuthToken();
+    if (!token) return;
+    await fetch(`${API_BASE_URL}/holds/${holdToken}/`, {
+      method: "DELETE",
+      headers: authHeaders(token),
+    }).catch(() => undefined);
+  },
+
+  async getQuotes(request: {
+    vehicleIds?: string[];
+    shopId?: string;
+    bookingType: "hour" | "day";
+    startDate: string;
+    duration: number;
+    deliveryOption?: "self_pickup" | "pickup_service" | "home_delivery";
+    savedLocationId?: string;
+    promoCode?: string;
+  }): Promise<VehicleQuote[]> {
+    const token = await getAuthToken();
+    const response = await fetch(`${API_BASE_URL}/quotes/`, {
+      method: "POST",
+      headers: token ? authHeaders(token) : { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        vehicle_ids: request.vehicleIds?.map((id) => parseInt(id, 10)),
+        shop_id: request.shopId ? parseInt(request.shopId, 10) : undefined,
+        booking_type: request.bookingType,
+        start_date: request.startDate,
+        duration: request.duration,
+        delivery_option: request.deliveryOption,
+        saved_location_id: request.savedLocationId,
+        promo_code: request.promoCode,
+      }),
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.error || "Failed to fetch quotes");
+    }
+    const data = await response.json();
+    return data.quotes.map((q: any) => ({
+      vehicleId: q.vehicle_id.toString(),
+      available: q.available,
+      deliverable: q.deliverable,
+      totalPrice: parseFloat(q.total_price),
+      basePrice: parseFloat(q.base_price),
+      adjustments: q.adjustments.map((a: any) => ({
+        label: a.label,
+        kind: a.kind,
+        amount: parseFloat(a.amount),
+      })),
+    }));
+  },
+
+  async getDeliveryQuote(
+    shopId: string,
+    location: { savedLocationId?: string; address?: string; latitude?: number; longitude?: number },
+  ): Promise<DeliveryQuote> {
+    const token = await getAuthToken();
+    const params = new URLSearchParams();
+    if (location.latitude != null && location.longitude != null) {
+      params.set("lat", String(location.latitude));
+      params.set("lng", String(location.longitude));
+    }
+    if (location.savedLocationId) params.set("saved_location", location.savedLocationId);
+    if (location.address) params.set("address", location.address);
+
+    const response = await fetch(`${API_BASE_URL}/shops/${shopId}/delivery-quote/?${params}`, {
+      headers: token ? authHeaders(token) : undefined,
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.error || "Failed to fetch delivery fee");
+    }
+    const data = await response.json();
+    return {
+      deliverable: data.deliverable,
+      deliveryFee: data.delivery_fee != null ? parseFloat(data.delivery_fee) : null,
+      zoneKm: data.zone_km ?? null,
+      distanceKm: data.distance_km ?? null,
+      located: data.located,
+    };
+  },
+};
+
+export interface BookingQuote {
+  available: boolean;
+  basePrice: number;
+  adjustments: { label: string; kind: string; amount: number }[];
+  deliveryFee: number;
+  serviceFee: number;
+  totalPrice: number;
+  promoCode: string | null;
+}
+
+export interface BookingHold {
+  token: string;
+  expiresAt: string;
+}
+
+export interface VehicleQuote {
+  vehicleId: string;
+  available: boolean;
+  deliverable: boolean;
+  totalPrice: number;
+  basePrice: number;
+  adjustments: { label: string; kind: string; amount: number }[];
+}
+
+export interface DeliveryQuote {
+  deliverable: boolean;
+  deliveryFee: number | null;
+  zoneKm: number | null;
+  distanceKm: number | null;
+  located: boolean;
+}
+
+export interface BookingTracking {
+  status: "unassigned" | "assigned" | "en_route";
+  taskType: "delivery" | "pickup" | null;
+  staffName: string | null;
+  position: { latitude: number; longitude: number; heading: number | null; recordedAt: string } | null;
+  destination: { latitude: number; longitude: number } | null;
+  distanceKm: number | null;
+  etaMinutes: number | null;
+}
+
+// ── Routing API ───────────────────────────────────────────────────────────────
+
+export interface RoadRoute {
+  distanceKm: number;
+  durationSeconds: number;
+  /** GeoJSON LineString, [lng, lat] pairs */
+  geometry: { type: "LineString"; coordinates: [number, number][] };
+  /** "graph" for a road route, "haversine" for a straight-line estimate */
+  source: "graph" | "haversine";
+}
+
+export const routingApi = {
+  /** Fastest road route between two points, computed by the backend */
+  async getRoute(
+    from: { latitude: number; longitude: number },
+    to: { latitude: number; longitude: number },
+  ): Promise<RoadRoute> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const query = `from=${from.latitude},${from.longitude}&to=${to.latitude},${to.longitude}`;
+    const response = await fetch(`${API_BASE_URL}/route/?${query}`, {
+      headers: authHeaders(token),
+    });
+    if (!response.ok) throw new Error("Failed to fetch route");
+    const data = await response.json();
+    return {
+      distanceKm: data.distance_km,
+      durationSeconds: data.duration_s,
+      geometry: data.geometry,
+      source: data.source,
+    };
+  },
 };
 
 // ── Review Types & API ────────────────────────────────────────────────────────
@@ -1043,12 +1298,12 @@ export interface Notification {
 }
 
 export const notificationsApi = {
-  /** Get all notifications for the current user */
+  /** Get the most recent notifications for the current user (first page) */
   async getNotifications(): Promise<Notification[]> {
     const token = await getAuthToken();
     if (!token) throw new Error("No authentication token found");
 
-    const url = `${API_BASE_URL}/notifications/`;
+    const url = `${API_BASE_URL}/notifications/?page_size=50`;
 
     const response = await fetch(url, {
       headers: authHeaders(token),
@@ -1058,8 +1313,8 @@ export const notificationsApi = {
     }
     const data = await response.json();
 
-    // Map backend data to frontend format
-    const mappedData = data.map((notification: any) => ({
+    // Map backend data to frontend format (the list is cursor-paginated)
+    const mappedData = data.results.map((notification: any) => ({
       id: notification.id.toString(),
       title: notification.title,
       message: notification.message,
@@ -1090,16 +1345,11 @@ export const notificationsApi = {
     const token = await getAuthToken();
     if (!token) throw new Error("No authentication token found");
 
-    // First get all unread notifications
-    const notifications = await this.getNotifications();
-    const unreadNotifications = notifications.filter((n) => !n.is_read);
-
-    // Mark each as read (bulk operation)
-    const promises = unreadNotifications.map((notification) =>
-      this.markNotificationRead(notification.id),
-    );
-
-    await Promise.all(promises);
+    const response = await fetch(`${API_BASE_URL}/notifications/mark-all-read/`, {
+      method: "POST",
+      headers: authHeaders(token),
+    });
+    if (!response.ok) throw new Error("Failed to mark notifications as read");
   },
 
   /** Delete a notification */
@@ -1118,6 +1368,32 @@ export const notificationsApi = {
       throw new Error("Failed to delete notification");
     }
   },
+
+  /** Register this device's Expo push token for the current user */
+  async registerPushDevice(pushToken: string, platform: "ios" | "android" | "web"): Promise<void> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const response = await fetch(`${API_BASE_URL}/push/devices/`, {
+      method: "POST",
+      headers: authHeaders(token),
+      body: JSON.stringify({ token: pushToken, provider: "expo", platform }),
+    });
+    if (!response.ok) throw new Error("Failed to register push device");
+  },
+
+  /** Stop push notifications to this device (call before logging out) */
+  async unregisterPushDevice(pushToken: string): Promise<void> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const response = await fetch(`${API_BASE_URL}/push/devices/`, {
+      method: "DELETE",
+      headers: authHeaders(token),
+      body: JSON.stringify({ token: pushToken }),
+    });
+    if (!response.ok) throw new Error("Failed to unregister push device");
+  },
 };
 
 // ── Staff API ───────────────────────────────────────────────────────────
@@ -1139,8 +1415,31 @@ export interface StaffTask {
   deliveryOptionLabel?: string;
   bookingStartDisplay?: string;
   bookingEndDisplay?: string;
+  /** Position in the staff member's run for the day (auto-assign) */
+  route_order?: number | null;
+  /** Bumped on every status change; send back when updating */
+  version?: number;
+  updated_at?: string;
+}
+
+/** Result of an incremental task poll (GET /staff/tasks/?updated_since=) */
+export interface StaffTaskChanges {
+  /** Tasks changed since the previous poll, in any status */
+  tasks: StaffTask[];
+  /** Ids of every open task; open tasks not listed were reassigned */
+  openIds: string[];
+  /** Send as `since` on the next poll */
+  nextSince: string;
+  /** Send as `etag` on the next poll to get nothing back when unchanged */
+  etag: string | null;
 }
 
+const mapStaffTask = (task: any): StaffTask => ({
+  ...task,
+  id: task.id != null ? String(task.id) : "",
+  bookingId: task.booking_id != null ? String(task.booking_id) : "",
+});
+
 export interface StaffComplaint {
   id: string;
   subject: string;
@@ -1153,33 +1452,133 @@ export interface StaffComplaint {
 }
 
 export const staffApi = {
-  async getAssignedTasks(): Promise<StaffTask[]> {
+  /** Assigned tasks: open ones by default, or "all" to include completed */
+  async getAssignedTasks(status: "open" | "all" = "open"): Promise<StaffTask[]> {
     const token = await getAuthToken();
     if (!token) throw new Error("No authentication token found");
 
-    const response = await fetch(`${API_BASE_URL}/staff/tasks/`, {
+    const response = await fetch(`${API_BASE_URL}/staff/tasks/?status=${status}`, {
       headers: authHeaders(token),
     });
     if (!response.ok) throw new Error("Failed to fetch assigned tasks");
     const tasks = await response.json();
-    return tasks.map((task: any) => ({
-      ...task,
-      id: task.id != null ? String(task.id) : "",
-      bookingId: task.booking_id != null ? String(task.booking_id) : "",
-    }));
+    return tasks.map(mapStaffTask);
+  },
+
+  /**
+   * Tasks in one status plus the `since` to poll getTaskChanges from
+   * (open tasks by default)
+   */
+  async getTaskSnapshot(
+    status: "open" | "completed" = "open",
+  ): Promise<{ tasks: StaffTask[]; nextSince: string }> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const response = await fetch(`${API_BASE_URL}/staff/tasks/?status=${status}`, {
+      headers: authHeaders(token),
+    });
+    if (!response.ok) throw new Error("Failed to fetch assigned tasks");
+    const tasks = await response.json();
+    return {
+      tasks: tasks.map(mapStaffTask),
+      nextSince: response.headers.get("X-Next-Since") ?? new Date().toISOString(),
+    };
   },
 
-  async updateTaskStatus(taskId: string, status: string): Promise<StaffTask> {
+  /**
+   * Tasks changed since `since` (the `nextSince` of getTaskSnapshot or of the
+   * previous poll). Returns null when nothing changed since the poll that
+   * returned `etag`.
+   */
+  async getTaskChanges(since: string, etag: string | null): Promise<StaffTaskChanges | null> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const headers: Record<string, string> = authHeaders(token);
+    if (etag) headers["If-None-Match"] = etag;
+    const response = await fetch(
+      `${API_BASE_URL}/staff/tasks/?updated_since=${encodeURIComponent(since)}`,
+      { headers },
+    );
+    if (response.status === 304) return null;
+    if (!response.ok) throw new Error("Failed to fetch assigned tasks");
+    const data = await response.json();
+    return {
+      tasks: data.results.map(mapStaffTask),
+      openIds: data.open_ids.map(String),
+      nextSince: data.next_since,
+      etag: response.headers.get("ETag"),
+    };
+  },
+
+  /**
+   * Move a task to `status`. Pass the task's `version` so the change is
+   * rejected (409) if someone else changed the task in the meantime.
+   */
+  async updateTaskStatus(taskId: string, status: string, version?: number): Promise<StaffTask> {
     const token = await getAuthToken();
     if (!token) throw new Error("No authentication token found");
 
     const response = await fetch(`${API_BASE_URL}/staff/tasks/${taskId}/`, {
       method: "PATCH",
       headers: authHeaders(token),
-      body: JSON.stringify({ status }),
+      body: JSON.stringify(version != null ? { status, version } : { status }),
     });
-    if (!response.ok) throw new Error("Failed to update task status");
-    return await response.json();
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.error || "Failed to update task status");
+    }
+    return mapStaffTask(await response.json());
+  },
+
+  /** Change several tasks in one request (all or nothing), e.g. completing a multi-stop run */
+  async updateTaskStatuses(
+    changes: { id: string; status: string; version?: number }[],
+  ): Promise<StaffTask[]> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const response = await fetch(`${API_BASE_URL}/staff/tasks/bulk-status/`, {
+      method: "POST",
+      headers: authHeaders(token),
+      body: JSON.stringify({ tasks: changes }),
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.error || "Failed to update tasks");
+    }
+    const tasks = await response.json();
+    return tasks.map(mapStaffTask);
+  },
+
+  /**
+   * Report buffered GPS fixes (e.g. from expo-location's `LocationObject`s) in
+   * one request. Send batches rather than single fixes.
+   */
+  async sendLocations(
+    points: {
+      latitude: number;
+      longitude: number;
+      timestamp: number;
+      accuracy?: number | null;
+      speed?: number | null;
+      heading?: number | null;
+    }[],
+  ): Promise<{ accepted: number }> {
+    const token = await getAuthToken();
+    if (!token) throw new Error("No authentication token found");
+
+    const response = await fetch(`${API_BASE_URL}/staff/location/`, {
+      method: "POST",
+      headers: authHeaders(token),
+      body: JSON.stringify({ points }),
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.error || "Failed to send location");
+    }
+    return response.json();
   },
 
   async getAssignedComplaints(): Promise<StaffComplaint[]> {
@@ -0,0 +1,37 @@
+import AsyncStorage from "@react-native-async-storage/async-storage";
+import Constants from "expo-constants";
+import * as Notifications from "expo-notifications";
+import { Platform } from "react-native";
+import { notificationsApi } from "./api";
+
+const PUSH_TOKEN_KEY = "push_token";
+
+/**
+ * Ask for notification permission and register this device's Expo push token
+ * with the backend for the signed-in user. Safe to call on every sign-in.
+ */
+export async function registerForPushNotifications(): Promise<void> {
+  if (Platform.OS === "web") return;
+
+  let { status } = await Notifications.getPermissionsAsync();
+  if (status !== "granted") {
+    ({ status } = await Notifications.requestPermissionsAsync());
+  }
+  if (status !== "granted") return;
+
+  const projectId =
+    Constants.expoConfig?.extra?.eas?.projectId ?? Constants.easConfig?.projectId;
+  const { data: pushToken } = await Notifications.getExpoPushTokenAsync(
+    projectId ? { projectId } : undefined,
+  );
+  await notificationsApi.registerPushDevice(pushToken, Platform.OS as "ios" | "android");
+  await AsyncStorage.setItem(PUSH_TOKEN_KEY, pushToken);
+}
+
+/** Stop pushes to this device; call while the auth token is still stored. */
+export async function unregisterFromPushNotifications(): Promise<void> {
+  const pushToken = await AsyncStorage.getItem(PUSH_TOKEN_KEY);
+  if (!pushToken) return;
+  await notificationsApi.unregisterPushDevice(pushToken);
+  await AsyncStorage.removeItem(PUSH_TOKEN_KEY);
+}